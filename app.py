@@ -2,7 +2,8 @@ import streamlit as st
 from dotenv import load_dotenv
 import os
 from ui import render_sidebar, render_main_panel
-from config import DEFAULT_PROMPT
+from config import DEFAULT_PROMPT, TRACE_FILE_ENV_VAR
+from tracing import JsonlFileExporter, get_exporter, set_exporter
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -15,6 +16,10 @@ st.set_page_config(
 # --- Load Environment Variables ---
 load_dotenv()
 
+# --- Tracing ---
+if os.getenv(TRACE_FILE_ENV_VAR) and get_exporter() is None:
+    set_exporter(JsonlFileExporter(os.getenv(TRACE_FILE_ENV_VAR)))
+
 # --- Session State Initialization ---
 def init_session_state():
     """Initialize session state variables if they don't exist."""
@@ -23,6 +28,7 @@ def init_session_state():
         "graph_layout": {},
         "last_generated_text": "",
         "generation_error": None,
+        "generation_job": None,
         "api_key": os.getenv("OPENAI_API_KEY") or "",
         "DEFAULT_PROMPT": DEFAULT_PROMPT
     }
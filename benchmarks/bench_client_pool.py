@@ -0,0 +1,113 @@
+"""
+Benchmark: a fresh OpenAI client per call versus the pooled client from `llm_client.get_client`.
+
+Starts a local stub of the chat completions endpoint so the numbers reflect
+client construction and connection setup rather than model latency. Over real
+TLS the gap is larger, because each fresh client also pays a TLS handshake.
+
+Usage:
+    python -m benchmarks.bench_client_pool --calls 200
+"""
+import argparse
+import json
+import logging
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from llm_client import close_clients, get_client
+
+STUB_COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []}),
+            },
+        }
+    ],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+}
+
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections can be reused
+    disable_nagle_algorithm = True  # avoid a 40ms delayed-ACK stall between headers and body
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(STUB_COMPLETION).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCompletionsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _call(client: OpenAI) -> None:
+    client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}])
+
+
+def time_calls(calls: int, make_client, release_client) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client = make_client()
+        _call(client)
+        release_client(client)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name: str, timings: list[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:<14} mean {statistics.mean(timings) * 1000:7.2f} ms   "
+          f"median {statistics.median(timings) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and pooled OpenAI client latency.")
+    parser.add_argument("--calls", type=int, default=100, help="Number of calls per mode.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # keep per-request HTTP logs out of the report
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    try:
+        fresh = time_calls(
+            args.calls,
+            lambda: OpenAI(api_key="stub", base_url=base_url),
+            lambda client: client.close(),
+        )
+        _call(get_client("stub", base_url))  # warm the pool once, as a long-running app would
+        pooled = time_calls(args.calls, lambda: get_client("stub", base_url), lambda client: None)
+    finally:
+        close_clients()
+        server.shutdown()
+
+    summarize("fresh client", fresh)
+    summarize("pooled client", pooled)
+    print(f"speedup (mean): {statistics.mean(fresh) / statistics.mean(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
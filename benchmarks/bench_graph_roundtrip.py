@@ -0,0 +1,69 @@
+"""
+Microbenchmark: validate, dump and render round trips for Graph versus ValidatedGraph.
+
+For each size it times:
+  validate  - Graph.validate_large on a plain dict (what _coerce_graph used to do on every render)
+  dump      - Graph.model_dump versus ValidatedGraph.to_dict
+  render    - create_graphviz_chart from a session-state dict versus from a trusted ValidatedGraph
+
+The render cache is cleared before every render so the numbers reflect a cold build.
+
+Usage:
+    python -m benchmarks.bench_graph_roundtrip --sizes 100 1000 10000
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.synthetic import branching_graph
+from graph_schema import MAX_NODES, Graph, ValidatedGraph
+from ui.graph_renderer import create_graphviz_chart, render_cache
+
+STYLE = ("box", "#f0f0f0", "Arial", "dot")
+
+
+def best_of(repeats: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def render_cold(graph_data) -> None:
+    render_cache.clear()
+    create_graphviz_chart(graph_data, *STYLE)
+
+
+def run(size: int, repeats: int) -> dict:
+    data = branching_graph(size)
+    graph = Graph.validate_large(data)
+    compact = ValidatedGraph.from_graph(graph)
+    return {
+        "validate (pydantic)": best_of(repeats, lambda: Graph.validate_large(data)),
+        "validate (trusted)": best_of(repeats, lambda: ValidatedGraph.validate(compact)),
+        "dump (model_dump)": best_of(repeats, graph.model_dump),
+        "dump (to_dict)": best_of(repeats, compact.to_dict),
+        # The renderer validates plain dicts with the default node cap, so this only runs within it.
+        "render (dict)": best_of(repeats, lambda: render_cold(data)) if size <= MAX_NODES else None,
+        "render (trusted)": best_of(repeats, lambda: render_cold(compact)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Graph and ValidatedGraph round-trip costs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for size in args.sizes:
+        print(f"\n{size} nodes")
+        for name, seconds in run(size, args.repeats).items():
+            value = "n/a (over default node cap)" if seconds is None else f"{seconds * 1000:9.3f} ms"
+            print(f"  {name:<22} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+A stand-in for the OpenAI client that replays recorded responses.
+
+Lets benchmarks measure the generation pipeline (parsing, validation, repair
+prompts, retries) without any network or model latency.
+"""
+import json
+import os
+from types import SimpleNamespace
+
+RECORDED_RESPONSES_PATH = os.path.join(os.path.dirname(__file__), "recorded_responses.json")
+
+
+def load_recorded_responses(path: str = RECORDED_RESPONSES_PATH) -> dict[str, str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _completion(content: str):
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, finish_reason="stop", message=message)],
+        usage=SimpleNamespace(total_tokens=len(content) // 4),
+    )
+
+
+class StubOpenAI:
+    """
+    Returns `script` responses in order, one per `chat.completions.create` call,
+    starting over after the last one. Each entry is a recorded response name or raw text.
+    """
+
+    def __init__(self, script: list[str], recorded: dict[str, str] | None = None):
+        recorded = recorded if recorded is not None else load_recorded_responses()
+        self._contents = [recorded.get(entry, entry) for entry in script]
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        content = self._contents[self.calls % len(self._contents)]
+        self.calls += 1
+        return _completion(content)
@@ -0,0 +1,197 @@
+"""
+Benchmark suite for generation, validation, rendering and export.
+
+Cases:
+  generate.*   - llm_client against a stub client replaying recorded responses,
+                 so only parsing, validation and repair overhead is measured
+  validate.*   - Graph.validate_large on synthetic graphs of increasing size
+  chart.*      - create_graphviz_chart (DOT source build) per layout algorithm
+  layout.*     - the built-in layered layout used by export_cli, on growing graphs
+                 and on a long chain with edges looping back across it
+  export.*     - render_graph_export to SVG per layout algorithm (needs Graphviz)
+  convert.*    - utils.export SVG to PNG/PDF, separately and from one parse (needs Cairo)
+
+Cases whose system dependency is missing are reported as skipped.
+
+Usage:
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from unittest.mock import patch
+
+import graphviz
+
+from benchmarks.stub_openai import StubOpenAI
+from benchmarks.synthetic import branching_graph, looping_graph
+from config import LAYOUT_ALGORITHM_OPTIONS
+from graph_schema import MAX_NODES, Graph
+from llm_client import generate_graph_from_text
+from ui.graph_renderer import create_graphviz_chart, render_cache, render_graph_export
+from utils.layered_layout import layered_layout
+
+STYLE = ("box", "#f0f0f0", "Arial")
+VALIDATE_SIZES = (10, 100, 1000, 10000)
+LAYOUT_SIZES = (100, 1000, 5000)
+LOOPING_LAYOUT_SIZE = 3000
+RENDER_SIZE = 50
+
+
+class SkipCase(Exception):
+    """Raised by a case whose system dependency is unavailable."""
+
+
+def _generate(script: list[str], max_retries: int) -> Callable[[], None]:
+    client = StubOpenAI(script)
+
+    def run():
+        with patch("llm_client.get_client", return_value=client), patch("llm_client.time.sleep"):
+            generate_graph_from_text("stub", "benchmark", max_retries=max_retries)
+    return run
+
+
+def _render_export(graph_data: dict, algorithm: str) -> Callable[[], None]:
+    def run():
+        render_cache.clear()
+        try:
+            render_graph_export(graph_data, *STYLE, algorithm, "svg")
+        except graphviz.ExecutableNotFound as e:
+            raise SkipCase("Graphviz executables not found") from e
+    return run
+
+
+def _convert(convert: Callable[[object, str], object]) -> Callable[[], None]:
+    """`convert(export_module, svg)` is the timed call; the module is imported here so a missing Cairo skips it."""
+    try:
+        from utils import export
+    except (ImportError, OSError) as e:  # cairosvg raises OSError when libcairo is missing
+        reason = f"Cairo unavailable: {str(e).splitlines()[0]}"
+
+        def unavailable():
+            raise SkipCase(reason)
+        return unavailable
+
+    svg = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="800" height="600">'
+        + "".join(f'<rect x="{i * 7 % 760}" y="{i * 13 % 560}" width="40" height="30" fill="#e6f7ff"/>' for i in range(200))
+        + "</svg>"
+    )
+    return lambda: convert(export, svg)
+
+
+def _png_and_pdf(export, svg: str) -> None:
+    document = export.SvgDocument(svg)  # one parse for both, as in the app's export bundle
+    document.render("png")
+    document.render("pdf")
+
+
+def build_cases() -> dict[str, Callable[[], None]]:
+    cases = {
+        "generate.first_try": _generate(["valid"], max_retries=0),
+        "generate.json_repair": _generate(["invalid_json", "valid"], max_retries=1),
+        "generate.schema_repair": _generate(["invalid_schema", "valid"], max_retries=1),
+        "generate.schema_patch": _generate(["invalid_schema", "schema_patch"], max_retries=1),
+        "generate.local_repair": _generate(["locally_repairable"], max_retries=0),
+    }
+    for size in VALIDATE_SIZES:
+        data = branching_graph(size)
+        cases[f"validate.{size}"] = lambda data=data: Graph.validate_large(data)
+
+    for size in LAYOUT_SIZES:
+        graph = Graph.validate_large(branching_graph(size))
+        cases[f"layout.layered.{size}"] = lambda graph=graph: layered_layout(graph)
+    looping = Graph.validate_large(looping_graph(LOOPING_LAYOUT_SIZE))  # long back edges across thousands of layers
+    cases[f"layout.looping.{LOOPING_LAYOUT_SIZE}"] = lambda: layered_layout(looping)
+
+    render_data = branching_graph(min(RENDER_SIZE, MAX_NODES))
+    for algorithm in LAYOUT_ALGORITHM_OPTIONS:
+        def chart(algorithm=algorithm):
+            render_cache.clear()
+            create_graphviz_chart(render_data, *STYLE, algorithm)
+        cases[f"chart.{algorithm}"] = chart
+        cases[f"export.{algorithm}.svg"] = _render_export(render_data, algorithm)
+
+    cases["convert.png"] = _convert(lambda export, svg: export.svg_to_png(svg))
+    cases["convert.pdf"] = _convert(lambda export, svg: export.svg_to_pdf(svg))
+    cases["convert.png+pdf"] = _convert(_png_and_pdf)
+    return cases
+
+
+def measure(func: Callable[[], None], repeats: int, warmup: int = 1) -> float:
+    """Median wall time of `repeats` runs after `warmup` untimed runs."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_suite(cases: dict[str, Callable[[], None]], repeats: int) -> tuple[dict[str, float], dict[str, str]]:
+    """Return (median seconds by case, skip reason by case)."""
+    results, skipped = {}, {}
+    for name, func in cases.items():
+        try:
+            results[name] = measure(func, repeats)
+        except SkipCase as e:
+            skipped[name] = str(e)
+    return results, skipped
+
+
+def compare_to_baseline(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Describe every case that got more than `threshold` (a fraction) slower than the baseline."""
+    regressions = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * (1 + threshold):
+            regressions.append(
+                f"{name}: {seconds * 1000:.3f} ms vs baseline {reference * 1000:.3f} ms ({(seconds / reference - 1) * 100:+.0f}%)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the performance benchmark suite.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text.")
+    parser.add_argument("--baseline", help="Compare against this results file and fail on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown versus the baseline (0.25 = 25%%).")
+    parser.add_argument("--save-baseline", help="Write these results to a file for later comparison.")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.ERROR)  # the repair cases log an expected warning on every run
+
+    cases = {name: func for name, func in build_cases().items() if args.filter in name}
+    results, skipped = run_suite(cases, args.repeats)
+
+    for name in cases:
+        value = f"skipped ({skipped[name]})" if name in skipped else f"{results[name] * 1000:10.3f} ms"
+        print(f"{name:<26} {value}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
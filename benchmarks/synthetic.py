@@ -0,0 +1,56 @@
+"""
+Synthetic graphs of any size for benchmarks.
+
+Every generator returns a plain dict in the GRAPH JSON shape, so it can be fed
+to `Graph.validate_large`, the renderer, or a stubbed LLM response.
+"""
+import random
+
+
+def _node(i: int, decision: bool) -> dict:
+    return {
+        "id": f"n{i}",
+        "label": f"Step {i}",
+        "group": "decision" if decision else "process",
+        "shape": "diamond" if decision else "box",
+    }
+
+
+def chain_graph(node_count: int) -> dict:
+    """A straight line of process steps."""
+    nodes = [_node(i, False) for i in range(node_count)]
+    edges = [{"source": f"n{i}", "target": f"n{i + 1}", "label": None} for i in range(node_count - 1)]
+    return {"nodes": nodes, "edges": edges, "layout": {"direction": "TB"}}
+
+
+def branching_graph(node_count: int) -> dict:
+    """A chain with a decision branch every tenth node, like a typical generated flowchart."""
+    data = chain_graph(node_count)
+    for i in range(0, node_count - 1, 10):
+        data["nodes"][i] = _node(i, True)
+        data["edges"].append({"source": f"n{i}", "target": f"n{min(i + 5, node_count - 1)}", "label": "no"})
+    return data
+
+
+def dense_graph(node_count: int, fan_out: int = 4) -> dict:
+    """Every node links to the next `fan_out` nodes, so edges grow as nodes times fan-out."""
+    nodes = [_node(i, False) for i in range(node_count)]
+    edges = [
+        {"source": f"n{i}", "target": f"n{j}", "label": None}
+        for i in range(node_count)
+        for j in range(i + 1, min(i + 1 + fan_out, node_count))
+    ]
+    return {"nodes": nodes, "edges": edges, "layout": {"direction": "LR"}}
+
+
+def looping_graph(node_count: int) -> dict:
+    """A chain plus one edge per ten nodes between two random steps, so many edges loop back across long spans."""
+    data = chain_graph(node_count)
+    rng = random.Random(node_count)  # the same graph on every run
+    for _ in range(node_count // 10):
+        source, target = rng.sample(range(node_count), 2)
+        data["edges"].append({"source": f"n{source}", "target": f"n{target}", "label": None})
+    return data
+
+
+GENERATORS = {"chain": chain_graph, "branching": branching_graph, "dense": dense_graph, "looping": looping_graph}
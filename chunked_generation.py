@@ -0,0 +1,202 @@
+"""
+Map-reduce generation for long process descriptions.
+
+A long description is split into sections at paragraph boundaries. Each section
+is generated as its own subgraph, all in parallel (still bounded by the shared
+rate limiter), and the subgraphs are merged into one Graph:
+  - node IDs are namespaced per section (`s2_B`), so sections cannot collide;
+  - a node that repeats a step from an earlier section (same label) is merged
+    into that step, which resolves references such as "return to the login page";
+  - each section's end nodes are linked to the next section's start node.
+
+Latency is roughly that of the slowest section instead of the whole document.
+"""
+import logging
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections.abc import Callable
+
+from config import (
+    CHUNK_MAX_CHARS,
+    CHUNK_MAX_PARALLEL,
+    CHUNKED_GENERATION_MIN_CHARS,
+    DEFAULT_MODEL,
+    DEFAULT_TEMPERATURE,
+    MAX_RETRIES,
+)
+from graph_cache import GraphCache
+from graph_schema import LARGE_GRAPH_MAX_NODES, Graph
+from llm_client import (
+    GenerationCancelled,
+    GenerationStats,
+    GraphGenerationError,
+    generate_graph_from_text,
+)
+from prompts import SECTION_NOTE_TEMPLATE
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def should_chunk(text: str, min_chars: int = CHUNKED_GENERATION_MIN_CHARS) -> bool:
+    return len(text) > min_chars
+
+
+def _split_oversized(paragraph: str, max_chars: int) -> list[str]:
+    """Split one paragraph that is too long by lines, then sentences, then hard cuts."""
+    pieces = []
+    for line in paragraph.splitlines():
+        for sentence in _SENTENCE_END.split(line) if len(line) > max_chars else [line]:
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence.strip():
+                pieces.append(sentence)
+    return pieces
+
+
+def split_sections(text: str, max_chars: int = CHUNK_MAX_CHARS) -> list[str]:
+    """Pack paragraphs (or lines, if there are no blank lines) into sections of at most `max_chars`."""
+    paragraphs = [part.strip() for part in re.split(r"\n\s*\n", text.strip()) if part.strip()]
+    if len(paragraphs) == 1:
+        paragraphs = [line.strip() for line in text.strip().splitlines() if line.strip()]
+
+    pieces = []
+    for paragraph in paragraphs:
+        pieces.extend([paragraph] if len(paragraph) <= max_chars else _split_oversized(paragraph, max_chars))
+
+    sections, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) + 2 > max_chars:
+            sections.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
+def _label_key(label: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", "", label.lower()).split())
+
+
+def merge_graphs(graphs: list[Graph]) -> Graph:
+    """Merge per-section subgraphs, in order, into one validated Graph."""
+    nodes, edges = [], []
+    seen_edges = set()
+    steps_by_label: dict[str, str] = {}  # label key -> merged node ID of the first section that had it
+    previous_exits: list[str] = []
+
+    def add_edge(source, target, label):
+        if source != target and (source, target, label) not in seen_edges:
+            seen_edges.add((source, target, label))
+            edges.append({"source": source, "target": target, "label": label})
+
+    for section, graph in enumerate(graphs, start=1):
+        index = graph.index
+        entries = {graph.nodes[i].id for i, degree in enumerate(index.in_degree) if degree == 0} or {graph.nodes[0].id}
+        exits = {graph.nodes[i].id for i, degree in enumerate(index.out_degree) if degree == 0} or {graph.nodes[-1].id}
+
+        ids = {}
+        section_steps = {}  # only earlier sections are matched, so same-label steps within a section stay apart
+        for node in graph.nodes:
+            key = _label_key(node.label)
+            # Start and end steps are linked rather than merged, so sections stay in sequence.
+            if key in steps_by_label and node.id not in entries and node.id not in exits:
+                ids[node.id] = steps_by_label[key]
+                continue
+            ids[node.id] = f"s{section}_{node.id}"
+            section_steps.setdefault(key, ids[node.id])
+            nodes.append({**node.model_dump(), "id": ids[node.id]})
+        for key, node_id in section_steps.items():
+            steps_by_label.setdefault(key, node_id)
+
+        for edge in graph.edges:
+            add_edge(ids[edge.source], ids[edge.target], edge.label)
+
+        first_entry = next(ids[node.id] for node in graph.nodes if node.id in entries)
+        for exit_id in previous_exits:
+            add_edge(exit_id, first_entry, None)
+        previous_exits = [ids[node.id] for node in graph.nodes if node.id in exits]
+
+    data = {"nodes": nodes, "edges": edges, "layout": graphs[0].layout.model_dump()}
+    return Graph.validate_large(data, max_nodes=LARGE_GRAPH_MAX_NODES)
+
+
+def generate_graph_chunked(
+    api_key: str,
+    text: str,
+    model: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_retries: int = MAX_RETRIES,
+    status_callback: Callable[[str], None] | None = None,
+    cache: GraphCache | None = None,
+    stream: bool = False,
+    stats: GenerationStats | None = None,
+    base_url: str | None = None,
+    cancel_event: threading.Event | None = None,
+    max_chars: int = CHUNK_MAX_CHARS,
+    max_parallel: int = CHUNK_MAX_PARALLEL,
+) -> Graph:
+    """
+    Generate a graph section by section and merge the results.
+
+    Takes the same arguments as `generate_graph_from_text`, which it calls once
+    per section; a description that fits in one section is generated directly.
+    Stats from every section are added into `stats`.
+
+    Raises:
+        GraphGenerationError: If any section fails; the remaining sections are cancelled.
+    """
+    update_status = status_callback or (lambda message: None)
+    stats = stats if stats is not None else GenerationStats()
+    sections = split_sections(text, max_chars)
+    common = dict(model=model, temperature=temperature, max_retries=max_retries, cache=cache,
+                  stream=stream, base_url=base_url)
+    if len(sections) == 1:
+        return generate_graph_from_text(api_key, text, status_callback=status_callback, stats=stats,
+                                        cancel_event=cancel_event, **common)
+
+    logging.info("Generating %d sections of a %d-character description.", len(sections), len(text))
+    update_status(f"🧩 Splitting the description into {len(sections)} sections...")
+    stop = threading.Event()  # set to stop the sections still running
+    section_stats = [GenerationStats() for _ in sections]
+    results: list[Graph | None] = [None] * len(sections)
+
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(sections)), thread_name_prefix="section") as executor:
+        futures = {
+            executor.submit(
+                generate_graph_from_text, api_key,
+                SECTION_NOTE_TEMPLATE.format(index=index + 1, count=len(sections), section=section),
+                stats=section_stats[index], cancel_event=stop, **common,
+            ): index
+            for index, section in enumerate(sections)
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("Generation was cancelled.")
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except GraphGenerationError as e:
+                        raise GraphGenerationError(f"Section {index + 1} of {len(sections)} failed: {e}") from e
+                if done:
+                    update_status(f"🧩 {len(sections) - len(pending)} of {len(sections)} sections ready...")
+        finally:
+            stop.set()
+            for section in section_stats:
+                stats.attempts += section.attempts
+                stats.total_tokens += section.total_tokens
+                stats.local_repairs += section.local_repairs
+                stats.retries_avoided += section.retries_avoided
+            stats.cache_hit = all(section.cache_hit for section in section_stats)
+
+    update_status("🔗 Merging sections...")
+    graph = merge_graphs(results)
+    update_status("✅ Graph validation successful!")
+    return graph
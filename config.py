@@ -6,8 +6,25 @@ Centralized configuration for the Natural Language to Flowchart application.
 DEFAULT_MODEL = "gpt-4-turbo"
 DEFAULT_TEMPERATURE = 0.2
 MAX_RETRIES = 2
+ASYNC_MAX_CONCURRENCY = 8
+GENERATION_WORKERS = 8  # background generations shared by all UI sessions
 MODEL_OPTIONS = ["gpt-5-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"]
 
+# --- Rate Limiting ---
+# Client-side limits shared by every call in the process; set them to your account's tier.
+RATE_LIMIT_REQUESTS_PER_MINUTE = 500
+RATE_LIMIT_TOKENS_PER_MINUTE = 200_000
+RATE_LIMIT_MIN_CONCURRENCY = 1
+RATE_LIMIT_INITIAL_CONCURRENCY = 8
+RATE_LIMIT_MAX_CONCURRENCY = 32
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# --- HTTP Connection Pool ---
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+
 # --- UI Configuration ---
 DEFAULT_NODE_SHAPE = "box"
 DEFAULT_NODE_COLOR = "#f0f0f0"
@@ -18,6 +35,42 @@ NODE_SHAPE_OPTIONS = ["box", "ellipse", "diamond", "circle"]
 FONT_OPTIONS = ["Arial", "Helvetica", "Times New Roman"]
 LAYOUT_ALGORITHM_OPTIONS = ["dot", "neato", "fdp", "sfdp", "twopi", "circo"]
 
+GENERATION_POLL_INTERVAL_SECONDS = 0.5
+
+# --- Chunked Generation ---
+# Descriptions longer than this are split into sections that are generated in parallel and merged.
+CHUNKED_GENERATION_MIN_CHARS = 6000
+CHUNK_MAX_CHARS = 3000
+CHUNK_MAX_PARALLEL = 8
+
+# --- Render Cache ---
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# --- Raster Export ---
+EXPORT_DPI = 96  # pixels per inch for PNG output
+EXPORT_SCALE = 1.0
+
+# --- Layout Scheduling ---
+# Layouts predicted to take longer than this use cheaper settings; server-side layouts that overrun it are killed.
+LAYOUT_TIME_BUDGET_SECONDS = 5.0
+# Faster algorithm to fall back to when an algorithm is over budget even with polyline edges.
+LAYOUT_FALLBACKS = {"circo": "twopi", "twopi": "sfdp", "neato": "sfdp", "fdp": "sfdp"}
+
+# --- Graph Editing ---
+EDIT_HISTORY_LIMIT = 100  # undoable edits kept per graph
+
+# --- Incremental Layout ---
+# Stored node positions are pinned on re-render when at least this share of the graph's nodes still has one.
+INCREMENTAL_LAYOUT_MIN_PINNED = 0.5
+
+# --- Graphviz Worker Pool ---
+# Graphviz processes are kept running and reused across renders (see graphviz_pool.py).
+GRAPHVIZ_WORKERS_PER_COMMAND = 2  # per engine, flags and output format
+GRAPHVIZ_MAX_PENDING = 32  # renders waiting or running; more are rejected
+GRAPHVIZ_TIMEOUT_SECONDS = 30.0  # a layout running longer is killed
+GRAPHVIZ_HEALTH_CHECK_SECONDS = 60.0  # idle workers older than this are pinged before reuse
+GRAPHVIZ_HEALTH_CHECK_TIMEOUT_SECONDS = 5.0
+
 # --- Default Prompt ---
 DEFAULT_PROMPT = """
 Process: User Authentication Flow
@@ -28,3 +81,18 @@ Process: User Authentication Flow
 5. If they are invalid, an error message "Invalid credentials" is shown.
 6. From the dashboard, the user can log out.
 """
+
+# --- Response Cache ---
+GRAPH_CACHE_DIR = ".graph_cache"
+GRAPH_CACHE_MAX_ENTRIES = 500
+GRAPH_CACHE_MAX_BYTES = 50 * 1024 * 1024
+GRAPH_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# --- Metrics Store ---
+METRICS_DB_PATH = "metrics.db"
+METRICS_LEGACY_JSON_PATH = "metrics.json"
+METRICS_LATENCY_BUCKETS_SECONDS = (1, 2, 5, 10, 20, 30, 60, 120)
+
+# --- Tracing ---
+# Set this environment variable to a file path to append one JSON line per pipeline span.
+TRACE_FILE_ENV_VAR = "FLOWCHART_TRACE_FILE"
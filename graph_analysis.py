@@ -0,0 +1,220 @@
+"""
+Structural analysis of validated graphs.
+
+Builds a CSR (compressed sparse row) adjacency index once per graph and answers
+structural questions from it in linear time: unreachable nodes, cycles,
+decision nodes without two outgoing branches, and the longest path.
+"""
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+
+from graph_schema import LARGE_GRAPH_MAX_NODES, Graph, GraphIndex, ValidatedGraph
+
+DECISION_SHAPE = "diamond"
+
+
+class CSRAdjacency:
+    """Successor lists packed into two flat integer arrays, indexed by node position."""
+    __slots__ = ("node_ids", "offsets", "targets", "in_degree")
+
+    def __init__(self, index: GraphIndex):
+        self.node_ids = index.node_ids
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        for successors in index.successors:
+            self.targets.extend(successors)
+            self.offsets.append(len(self.targets))
+        self.in_degree = index.in_degree
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def successors(self, node: int):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def out_degree(self, node: int) -> int:
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def reachable_from(self, roots) -> bytearray:
+        seen = bytearray(len(self))
+        queue = deque(roots)
+        for root in roots:
+            seen[root] = 1
+        while queue:
+            node = queue.popleft()
+            for successor in self.successors(node):
+                if not seen[successor]:
+                    seen[successor] = 1
+                    queue.append(successor)
+        return seen
+
+    def strongly_connected_components(self) -> list[int]:
+        """Return the component number of every node (iterative Tarjan)."""
+        count = len(self)
+        order = [-1] * count
+        low = [0] * count
+        component = [-1] * count
+        on_stack = bytearray(count)
+        stack = []
+        next_order = 0
+        next_component = 0
+
+        for start in range(count):
+            if order[start] != -1:
+                continue
+            work = [(start, 0)]
+            while work:
+                node, child_index = work.pop()
+                if child_index == 0:
+                    order[node] = low[node] = next_order
+                    next_order += 1
+                    stack.append(node)
+                    on_stack[node] = 1
+                successors = self.successors(node)
+                if child_index < len(successors):
+                    work.append((node, child_index + 1))
+                    successor = successors[child_index]
+                    if order[successor] == -1:
+                        work.append((successor, 0))
+                    elif on_stack[successor]:
+                        low[node] = min(low[node], order[successor])
+                    continue
+                if low[node] == order[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = next_component
+                        if member == node:
+                            break
+                    next_component += 1
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return component
+
+
+@dataclass
+class GraphReport:
+    """Findings about one graph; `issues()` lists the ones worth showing a user."""
+    unreachable: list[str] = field(default_factory=list)
+    cycles: list[list[str]] = field(default_factory=list)
+    weak_decisions: list[str] = field(default_factory=list)
+    longest_path: list[str] = field(default_factory=list)
+
+    def issues(self) -> list[str]:
+        issues = []
+        if self.unreachable:
+            issues.append(f"Unreachable from any start node: {', '.join(self.unreachable)}")
+        for cycle in self.cycles:
+            issues.append(f"Cycle: {' → '.join(cycle)}")
+        if self.weak_decisions:
+            issues.append(f"Decision node(s) with fewer than two outgoing edges: {', '.join(self.weak_decisions)}")
+        return issues
+
+
+def build_adjacency(graph: Graph | ValidatedGraph) -> CSRAdjacency:
+    """Build the CSR index for a Graph or ValidatedGraph."""
+    if isinstance(graph, Graph):
+        return CSRAdjacency(graph.index)
+    graph = ValidatedGraph.validate(graph, max_nodes=LARGE_GRAPH_MAX_NODES)
+    return CSRAdjacency(GraphIndex(graph.node_ids, zip(graph.edge_sources, graph.edge_targets)))
+
+
+def unreachable_nodes(adjacency: CSRAdjacency) -> list[int]:
+    """Nodes that cannot be reached from any node without incoming edges (or the first node if none)."""
+    roots = [node for node in range(len(adjacency)) if adjacency.in_degree[node] == 0] or [0]
+    seen = adjacency.reachable_from(roots)
+    return [node for node in range(len(adjacency)) if not seen[node]]
+
+
+def find_cycles(adjacency: CSRAdjacency, component: list[int] | None = None) -> list[list[int]]:
+    """Every strongly connected component that contains a cycle, including self-loops."""
+    component = component if component is not None else adjacency.strongly_connected_components()
+    members: dict[int, list[int]] = {}
+    for node, number in enumerate(component):
+        members.setdefault(number, []).append(node)
+    cycles = []
+    for nodes in members.values():
+        if len(nodes) > 1 or nodes[0] in adjacency.successors(nodes[0]):
+            cycles.append(nodes)
+    return cycles
+
+
+def _path_within(adjacency: CSRAdjacency, component: list[int], entry: int, exit_node: int) -> list[int]:
+    """Shortest path from `entry` to `exit_node` using only edges inside their component (BFS)."""
+    parent = {entry: entry}
+    queue = deque([entry])
+    while exit_node not in parent:
+        node = queue.popleft()
+        for successor in adjacency.successors(node):
+            if component[successor] == component[entry] and successor not in parent:
+                parent[successor] = node
+                queue.append(successor)
+    path = [exit_node]
+    while path[-1] != entry:
+        path.append(parent[path[-1]])
+    return path[::-1]
+
+
+def longest_path(adjacency: CSRAdjacency, component: list[int] | None = None) -> list[int]:
+    """
+    Longest path over the condensation, counting each cycle as a single step.
+
+    Tarjan numbers components in reverse topological order, so walking them from
+    the highest number down relaxes every cross-component edge exactly once.
+    Within a cycle the returned path follows its shortest route from the node
+    the path enters by to the node it leaves by, so every consecutive pair of
+    nodes is an edge of the graph.
+    """
+    if not len(adjacency):
+        return []
+    component = component if component is not None else adjacency.strongly_connected_components()
+    component_count = max(component) + 1
+    members: list[list[int]] = [[] for _ in range(component_count)]
+    for node, number in enumerate(component):
+        members[number].append(node)
+
+    steps = [1] * component_count
+    via: list[tuple[int, int, int] | None] = [None] * component_count  # (previous component, exit node, entry node)
+    for number in range(component_count - 1, -1, -1):
+        for node in members[number]:
+            for successor in adjacency.successors(node):
+                target = component[successor]
+                if target != number and steps[number] + 1 > steps[target]:
+                    steps[target] = steps[number] + 1
+                    via[target] = (number, node, successor)
+
+    number = max(range(component_count), key=steps.__getitem__)
+    crossings = []  # (entry node, exit node) per component, from the last one back
+    exit_node = None
+    while via[number] is not None:
+        previous, source, entry = via[number]
+        crossings.append((entry, entry if exit_node is None else exit_node))
+        exit_node = source
+        number = previous
+    first = members[number][0] if exit_node is None else exit_node
+    crossings.append((first, first))
+    return [node for entry, exit_node in reversed(crossings)
+            for node in _path_within(adjacency, component, entry, exit_node)]
+
+
+def analyze_graph(graph: Graph | ValidatedGraph) -> GraphReport:
+    """Run every structural check on a Graph or ValidatedGraph."""
+    if isinstance(graph, Graph):
+        shapes = [node.shape for node in graph.nodes]
+    else:
+        graph = ValidatedGraph.validate(graph, max_nodes=LARGE_GRAPH_MAX_NODES)
+        shapes = graph.node_shapes
+    adjacency = build_adjacency(graph)
+    component = adjacency.strongly_connected_components()
+    ids = adjacency.node_ids
+    return GraphReport(
+        unreachable=[ids[node] for node in unreachable_nodes(adjacency)],
+        cycles=[[ids[node] for node in cycle] for cycle in find_cycles(adjacency, component)],
+        weak_decisions=[
+            ids[node] for node in range(len(adjacency))
+            if shapes[node] == DECISION_SHAPE and adjacency.out_degree(node) < 2
+        ],
+        longest_path=[ids[node] for node in longest_path(adjacency, component)],
+    )
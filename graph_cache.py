@@ -0,0 +1,166 @@
+"""
+Persistent, content-addressed cache for validated graphs returned by the LLM.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+from graph_schema import Graph
+from prompts import PROMPT_TEMPLATE_VERSION
+from config import (
+    GRAPH_CACHE_DIR,
+    GRAPH_CACHE_MAX_BYTES,
+    GRAPH_CACHE_MAX_ENTRIES,
+    GRAPH_CACHE_TTL_SECONDS,
+)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse insignificant whitespace so trivially different inputs share a cache entry."""
+    lines = (" ".join(line.split()) for line in text.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(text: str, model: str, temperature: float) -> str:
+    """Return a stable hash of everything that determines the generated graph."""
+    payload = json.dumps(
+        {
+            "text": normalize_text(text),
+            "model": model,
+            "temperature": f"{float(temperature):.4f}",
+            "prompt_version": PROMPT_TEMPLATE_VERSION,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GraphCache:
+    """
+    Stores validated graphs on disk, one JSON file per key.
+
+    Entries expire after `ttl_seconds`. When the cache grows past `max_entries`
+    or `max_bytes`, the least recently used entries (by file mtime, which is
+    refreshed on every hit) are evicted first.
+    """
+
+    def __init__(
+        self,
+        directory: str = GRAPH_CACHE_DIR,
+        max_entries: int = GRAPH_CACHE_MAX_ENTRIES,
+        max_bytes: int = GRAPH_CACHE_MAX_BYTES,
+        ttl_seconds: float = GRAPH_CACHE_TTL_SECONDS,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Graph | None:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                if time.time() - entry["created_at"] > self.ttl_seconds:
+                    os.remove(path)
+                    self.evictions += 1
+                    raise LookupError("expired")
+                graph = Graph.model_validate(entry["graph"])
+            except (FileNotFoundError, LookupError):
+                self.misses += 1
+                return None
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.warning("Discarding unreadable cache entry %s: %s", path, e)
+                self._remove(path)
+                self.misses += 1
+                return None
+
+            os.utime(path)
+            self.hits += 1
+            return graph
+
+    def put(self, key: str, graph: Graph) -> None:
+        entry = {"created_at": time.time(), "graph": graph.model_dump()}
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logging.warning("Could not write cache entry %s: %s", key, e)
+                self._remove(tmp_path)
+                return
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._remove(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+            }
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        """Return (path, size, mtime) for every entry, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        now = time.time()
+        while entries and (
+            len(entries) > self.max_entries
+            or total_bytes > self.max_bytes
+            or now - entries[0][2] > self.ttl_seconds
+        ):
+            path, size, _ = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+            self.evictions += 1
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=1)
+def get_default_cache() -> GraphCache:
+    """Return the process-wide cache configured from `config`."""
+    return GraphCache()
@@ -0,0 +1,89 @@
+"""
+Undoable editing of one graph.
+
+GraphEditor wraps the incremental edit methods of `Graph`: each edit validates
+only the elements it touches, and its inverse steps are pushed onto an undo log,
+so undo and redo replay small deltas instead of storing copies of the graph.
+`current` is the edited graph as a ValidatedGraph, rebuilt from the already
+valid elements without running pydantic validation again.
+"""
+from collections import deque
+from dataclasses import dataclass
+
+from config import EDIT_HISTORY_LIMIT
+from graph_schema import EditStep, Graph, ValidatedGraph
+
+
+@dataclass
+class Edit:
+    description: str
+    steps: list[EditStep]  # applying these reverses the edit
+
+
+class GraphEditor:
+    def __init__(self, graph: Graph | ValidatedGraph, history_limit: int = EDIT_HISTORY_LIMIT):
+        self.graph = graph.to_graph() if isinstance(graph, ValidatedGraph) else graph.model_copy(deep=True)
+        self._undo: deque[Edit] = deque(maxlen=history_limit)
+        self._redo: list[Edit] = []
+        self.current = ValidatedGraph.from_graph(self.graph)
+
+    def _record(self, description: str, undo_steps: list[EditStep]) -> ValidatedGraph:
+        self._undo.append(Edit(description, undo_steps))
+        self._redo.clear()
+        self.current = ValidatedGraph.from_graph(self.graph)
+        return self.current
+
+    # --- Edits ---
+    # Each returns the edited graph and raises ValueError (leaving it unchanged) if the edit is invalid.
+
+    def add_node(self, node_id: str, label: str, group: str = "default", shape: str = "box") -> ValidatedGraph:
+        return self._record(f"Add node {node_id}", self.graph.add_node(node_id, label, group, shape))
+
+    def remove_node(self, node_id: str) -> ValidatedGraph:
+        return self._record(f"Remove node {node_id}", self.graph.remove_node(node_id))
+
+    def relabel_node(self, node_id: str, label: str) -> ValidatedGraph:
+        return self._record(f"Relabel node {node_id}", self.graph.relabel_node(node_id, label))
+
+    def add_edge(self, source: str, target: str, label: str | None = None) -> ValidatedGraph:
+        return self._record(f"Add edge {source} → {target}", self.graph.add_edge(source, target, label))
+
+    def remove_edge(self, edge_index: int) -> ValidatedGraph:
+        edge = self.graph.edges[edge_index] if 0 <= edge_index < len(self.graph.edges) else None
+        description = f"Remove edge {edge.source} → {edge.target}" if edge else "Remove edge"
+        return self._record(description, self.graph.remove_edge(edge_index))
+
+    def relabel_edge(self, edge_index: int, label: str | None) -> ValidatedGraph:
+        return self._record("Relabel edge", self.graph.relabel_edge(edge_index, label))
+
+    # --- History ---
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def undo_description(self) -> str | None:
+        return self._undo[-1].description if self._undo else None
+
+    @property
+    def redo_description(self) -> str | None:
+        return self._redo[-1].description if self._redo else None
+
+    def undo(self) -> ValidatedGraph:
+        """Reverse the latest edit; raises IndexError if there is nothing to undo."""
+        edit = self._undo.pop()
+        self._redo.append(Edit(edit.description, self.graph.apply_steps(edit.steps)))
+        self.current = ValidatedGraph.from_graph(self.graph)
+        return self.current
+
+    def redo(self) -> ValidatedGraph:
+        """Re-apply the latest undone edit; raises IndexError if there is nothing to redo."""
+        edit = self._redo.pop()
+        self._undo.append(Edit(edit.description, self.graph.apply_steps(edit.steps)))
+        self.current = ValidatedGraph.from_graph(self.graph)
+        return self.current
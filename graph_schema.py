@@ -1,17 +1,109 @@
-from pydantic import BaseModel, Field, field_validator, model_validator, conlist
-from typing import Literal, List
+from pydantic import BaseModel, Field, PrivateAttr, ValidationInfo, field_validator, model_validator, conlist
+from typing import Iterable, Literal, List
+import hashlib
+import json
 import logging
 
 # --- Constants ---
 ALLOWED_SHAPES = ["box", "ellipse", "diamond", "circle"]
 ALLOWED_DIRECTIONS = ["LR", "TB"]
+MAX_NODES = 100  # default cap, sized for LLM output
+LARGE_GRAPH_MAX_NODES = 100_000
+MAX_REPORTED_ISSUES = 50
+NODE_LABEL_MAX_LENGTH = 100
+EDGE_LABEL_MAX_LENGTH = 50
+
+# --- Integrity Index ---
+
+class GraphIndex:
+    """
+    Node-ID index, integrity report and adjacency for a graph, built in one pass.
+
+    Unlike a fail-fast check, every duplicate ID and every dangling edge endpoint
+    is collected, so a single validation run reports all of them. Adjacency and
+    degrees are indexed by node position and only include edges whose endpoints
+    both exist.
+    """
+    __slots__ = ("node_ids", "position", "duplicate_ids", "dangling_edges", "successors", "in_degree", "out_degree")
+
+    def __init__(self, node_ids: Iterable[str], edges: Iterable[tuple[str, str]]):
+        self.node_ids = list(node_ids)
+        self.position: dict[str, int] = {}
+        duplicates = set()
+        for index, node_id in enumerate(self.node_ids):
+            if node_id in self.position:
+                duplicates.add(node_id)
+            else:
+                self.position[node_id] = index
+        self.duplicate_ids = sorted(duplicates)
+
+        node_count = len(self.node_ids)
+        self.successors: list[list[int]] = [[] for _ in range(node_count)]
+        self.in_degree = [0] * node_count
+        self.out_degree = [0] * node_count
+        self.dangling_edges: list[tuple[int, str, str]] = []  # (edge index, "source"/"target", missing ID)
+
+        position = self.position
+        for edge_index, (source, target) in enumerate(edges):
+            source_index = position.get(source)
+            target_index = position.get(target)
+            if source_index is None:
+                self.dangling_edges.append((edge_index, "source", source))
+            if target_index is None:
+                self.dangling_edges.append((edge_index, "target", target))
+            if source_index is not None and target_index is not None:
+                self.successors[source_index].append(target_index)
+                self.out_degree[source_index] += 1
+                self.in_degree[target_index] += 1
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.duplicate_ids and not self.dangling_edges
+
+    def append_node(self, node_id: str) -> None:
+        """Index a node added at the end of the graph."""
+        self.position[node_id] = len(self.node_ids)
+        self.node_ids.append(node_id)
+        self.successors.append([])
+        self.in_degree.append(0)
+        self.out_degree.append(0)
+
+    def append_edge(self, source: str, target: str) -> None:
+        """Index an edge, between existing nodes, added at the end of the graph."""
+        source_index, target_index = self.position[source], self.position[target]
+        self.successors[source_index].append(target_index)
+        self.out_degree[source_index] += 1
+        self.in_degree[target_index] += 1
+
+    def issues(self) -> list[str]:
+        """Human-readable description of every integrity problem."""
+        issues = []
+        if self.duplicate_ids:
+            issues.append(f"Duplicate node ID(s): {', '.join(self.duplicate_ids)}")
+        for _, endpoint, node_id in self.dangling_edges:
+            issues.append(f"Edge {endpoint} '{node_id}' does not match any node ID.")
+        return issues
+
+    def error_message(self) -> str:
+        issues = self.issues()
+        message = "; ".join(issues[:MAX_REPORTED_ISSUES])
+        if len(issues) > MAX_REPORTED_ISSUES:
+            message += f"; ... and {len(issues) - MAX_REPORTED_ISSUES} more issue(s)"
+        return message
+
+class GraphEditError(ValueError):
+    """Raised when an edit would leave the graph invalid; the graph is not changed."""
+
+# An edit step is ("insert_node" | "delete_node" | "replace_node" | "insert_edge" | "delete_edge" |
+# "replace_edge", index[, element]). Applying a step returns the step that undoes it.
+EditStep = tuple
 
 # --- Pydantic Models for Graph Schema Validation ---
 
 class Node(BaseModel):
     """Represents a single node in the graph."""
     id: str = Field(..., description="A short, unique identifier for the node (e.g., 'A', 'B', 'Start').")
-    label: str = Field(..., max_length=100, description="The text label displayed on the node (max 6 words recommended).")
+    label: str = Field(..., max_length=NODE_LABEL_MAX_LENGTH, description="The text label displayed on the node (max 6 words recommended).")
     group: str = Field(default="default", description="A group name for styling or filtering.")
     shape: Literal[*ALLOWED_SHAPES] = Field(default="box", description="The shape of the node.")
 
@@ -25,35 +117,264 @@ class Edge(BaseModel):
     """Represents a directed edge (connection) between two nodes."""
     source: str = Field(..., description="The ID of the source node.")
     target: str = Field(..., description="The ID of the target node.")
-    label: str | None = Field(default=None, max_length=50, description="An optional label for the edge.")
+    label: str | None = Field(default=None, max_length=EDGE_LABEL_MAX_LENGTH, description="An optional label for the edge.")
 
 class Layout(BaseModel):
     """Defines the overall layout direction of the graph."""
     direction: Literal[*ALLOWED_DIRECTIONS] = Field(default="TB", description="The direction of the graph layout (Top-to-Bottom or Left-to-Right).")
 
 class Graph(BaseModel):
-    """The root model for the entire graph structure."""
-    nodes: conlist(Node, min_length=1, max_length=100) = Field(..., description="A list of all nodes in the graph.")
+    """
+    The root model for the entire graph structure.
+
+    Graphs are capped at MAX_NODES nodes by default. Pass a larger limit through
+    the validation context, or use `Graph.validate_large`, for large-graph mode:
+    `Graph.model_validate(data, context={"max_nodes": 5000})`.
+    """
+    nodes: conlist(Node, min_length=1) = Field(..., description="A list of all nodes in the graph.")
     edges: List[Edge] = Field(default=[], description="A list of all edges connecting the nodes.")
     layout: Layout = Field(default_factory=Layout, description="Graph layout configuration.")
 
+    _index: GraphIndex | None = PrivateAttr(default=None)
+
+    @classmethod
+    def validate_large(cls, data, max_nodes: int = LARGE_GRAPH_MAX_NODES) -> 'Graph':
+        """Validate a graph in large-graph mode, allowing up to `max_nodes` nodes."""
+        return cls.model_validate(data, context={"max_nodes": max_nodes})
+
+    @field_validator('nodes')
+    def check_node_limit(cls, v, info: ValidationInfo):
+        max_nodes = (info.context or {}).get("max_nodes", MAX_NODES)
+        if len(v) > max_nodes:
+            raise ValueError(f"Graph has {len(v)} nodes, more than the limit of {max_nodes}.")
+        return v
+
     @model_validator(mode='after')
     def check_edge_node_ids_exist(self) -> 'Graph':
-        """Ensures that every edge connects to valid nodes."""
-        node_ids = set()
-        duplicate_ids = set()
-        for node in self.nodes:
-            if node.id in node_ids:
-                duplicate_ids.add(node.id)
-            node_ids.add(node.id)
-
-        if duplicate_ids:
-            formatted_ids = ", ".join(sorted(duplicate_ids))
-            raise ValueError(f"Duplicate node ID(s): {formatted_ids}")
-
-        for edge in self.edges:
-            if edge.source not in node_ids:
-                raise ValueError(f"Edge source '{edge.source}' does not match any node ID.")
-            if edge.target not in node_ids:
-                raise ValueError(f"Edge target '{edge.target}' does not match any node ID.")
+        """Ensures that node IDs are unique and every edge connects to valid nodes."""
+        index = GraphIndex(
+            (node.id for node in self.nodes),
+            ((edge.source, edge.target) for edge in self.edges),
+        )
+        if not index.is_valid:
+            raise ValueError(index.error_message())
+        self._index = index
         return self
+
+    def __eq__(self, other) -> bool:
+        # The derived index is not part of a graph's identity, so compare fields only.
+        if not isinstance(other, Graph):
+            return NotImplemented
+        return self.nodes == other.nodes and self.edges == other.edges and self.layout == other.layout
+
+    @property
+    def index(self) -> GraphIndex:
+        """Integrity and adjacency index, built during validation (or on first use)."""
+        if self._index is None:
+            self._index = GraphIndex(
+                (node.id for node in self.nodes),
+                ((edge.source, edge.target) for edge in self.edges),
+            )
+        return self._index
+
+    # --- Incremental Editing ---
+    # Each edit validates only the elements it creates and checks node IDs against
+    # the index, then changes the graph in place and returns the steps that undo it.
+    # Appends update the index; removals drop it, to be rebuilt (without pydantic) on next use.
+
+    def add_node(self, node_id: str, label: str, group: str = "default", shape: str = "box",
+                 max_nodes: int = LARGE_GRAPH_MAX_NODES) -> list[EditStep]:
+        if node_id in self.index.position:
+            raise GraphEditError(f"Node ID '{node_id}' already exists.")
+        if len(self.nodes) >= max_nodes:
+            raise GraphEditError(f"Graph already has the maximum of {max_nodes} nodes.")
+        node = Node(id=node_id, label=label, group=group, shape=shape)
+        return self.apply_steps([("insert_node", len(self.nodes), node)])
+
+    def remove_node(self, node_id: str) -> list[EditStep]:
+        """Remove a node and every edge that touches it."""
+        position = self._node_position(node_id)
+        if len(self.nodes) == 1:
+            raise GraphEditError("A graph must keep at least one node.")
+        steps = [
+            ("delete_edge", index) for index in reversed(range(len(self.edges)))
+            if node_id in (self.edges[index].source, self.edges[index].target)
+        ]
+        steps.append(("delete_node", position))
+        return self.apply_steps(steps)
+
+    def relabel_node(self, node_id: str, label: str) -> list[EditStep]:
+        position = self._node_position(node_id)
+        node = self.nodes[position]
+        return self.apply_steps([("replace_node", position, Node(id=node.id, label=label, group=node.group, shape=node.shape))])
+
+    def add_edge(self, source: str, target: str, label: str | None = None) -> list[EditStep]:
+        self._node_position(source)
+        self._node_position(target)
+        edge = Edge(source=source, target=target, label=label)
+        return self.apply_steps([("insert_edge", len(self.edges), edge)])
+
+    def remove_edge(self, edge_index: int) -> list[EditStep]:
+        self._edge(edge_index)
+        return self.apply_steps([("delete_edge", edge_index)])
+
+    def relabel_edge(self, edge_index: int, label: str | None) -> list[EditStep]:
+        edge = self._edge(edge_index)
+        return self.apply_steps([("replace_edge", edge_index, Edge(source=edge.source, target=edge.target, label=label))])
+
+    def apply_steps(self, steps: list[EditStep]) -> list[EditStep]:
+        """Apply already validated steps in order; returns the steps that undo them, in the order to apply them."""
+        inverse = [self._apply_step(step) for step in steps]
+        inverse.reverse()
+        return inverse
+
+    def _apply_step(self, step: EditStep) -> EditStep:
+        kind, index, *element = step
+        is_node = kind.endswith("_node")
+        items = self.nodes if is_node else self.edges
+        if kind.startswith("insert"):
+            items.insert(index, element[0])
+            if self._index is not None and index == len(items) - 1:
+                if is_node:
+                    self._index.append_node(element[0].id)
+                else:
+                    self._index.append_edge(element[0].source, element[0].target)
+            else:
+                self._index = None
+            return (kind.replace("insert", "delete"), index)
+        if kind.startswith("delete"):
+            removed = items.pop(index)
+            self._index = None  # later positions shift
+            return (kind.replace("delete", "insert"), index, removed)
+        previous = items[index]
+        items[index] = element[0]
+        if is_node:
+            moved = previous.id != element[0].id
+        else:
+            moved = (previous.source, previous.target) != (element[0].source, element[0].target)
+        if moved:
+            self._index = None
+        return (kind, index, previous)
+
+    def _node_position(self, node_id: str) -> int:
+        position = self.index.position.get(node_id)
+        if position is None:
+            raise GraphEditError(f"No node with ID '{node_id}'.")
+        return position
+
+    def _edge(self, edge_index: int) -> Edge:
+        if not 0 <= edge_index < len(self.edges):
+            raise GraphEditError(f"No edge at index {edge_index}.")
+        return self.edges[edge_index]
+
+# --- Validated Graph Fast Path ---
+# Only the constructors below hold this token, so any ValidatedGraph that carries
+# it was built from data that passed Graph validation and can be trusted as-is.
+_VALIDATION_TOKEN = object()
+
+class ValidatedGraph:
+    """
+    Immutable, column-oriented form of a Graph that is known to be valid.
+
+    Node and edge fields are stored as parallel tuples instead of one pydantic
+    model per element, so holding, hashing and rendering a validated graph
+    never touches pydantic again.
+    """
+    __slots__ = (
+        "node_ids", "node_labels", "node_groups", "node_shapes",
+        "edge_sources", "edge_targets", "edge_labels",
+        "direction", "_token", "_fingerprint",
+    )
+
+    def __init__(self, node_columns, edge_columns, direction, token):
+        if token is not _VALIDATION_TOKEN:
+            raise TypeError("Use ValidatedGraph.validate() or ValidatedGraph.from_graph() to create a ValidatedGraph.")
+        self.node_ids, self.node_labels, self.node_groups, self.node_shapes = node_columns
+        self.edge_sources, self.edge_targets, self.edge_labels = edge_columns
+        self.direction = direction
+        self._token = token
+        self._fingerprint = None
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'ValidatedGraph':
+        """Wrap an already validated Graph model."""
+        nodes = graph.nodes
+        edges = graph.edges
+        return cls(
+            (
+                tuple(node.id for node in nodes),
+                tuple(node.label for node in nodes),
+                tuple(node.group for node in nodes),
+                tuple(node.shape for node in nodes),
+            ),
+            (
+                tuple(edge.source for edge in edges),
+                tuple(edge.target for edge in edges),
+                tuple(edge.label for edge in edges),
+            ),
+            graph.layout.direction,
+            _VALIDATION_TOKEN,
+        )
+
+    @classmethod
+    def validate(cls, data, max_nodes: int = MAX_NODES) -> 'ValidatedGraph':
+        """Validate raw graph data (or pass a trusted graph through untouched)."""
+        if isinstance(data, ValidatedGraph) and data.is_trusted:
+            return data
+        if isinstance(data, Graph):
+            return cls.from_graph(data)
+        return cls.from_graph(Graph.model_validate(data, context={"max_nodes": max_nodes}))
+
+    @property
+    def is_trusted(self) -> bool:
+        return self._token is _VALIDATION_TOKEN
+
+    @property
+    def fingerprint(self) -> str:
+        """SHA-256 of the canonical JSON form, computed once."""
+        if self._fingerprint is None:
+            payload = json.dumps(self.to_dict(), sort_keys=True)
+            self._fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    def to_dict(self) -> dict:
+        """Return the same structure as Graph.model_dump()."""
+        return {
+            "nodes": [
+                {"id": node_id, "label": label, "group": group, "shape": shape}
+                for node_id, label, group, shape in zip(self.node_ids, self.node_labels, self.node_groups, self.node_shapes)
+            ],
+            "edges": [
+                {"source": source, "target": target, "label": label}
+                for source, target, label in zip(self.edge_sources, self.edge_targets, self.edge_labels)
+            ],
+            "layout": {"direction": self.direction},
+        }
+
+    def to_graph(self) -> Graph:
+        """Rebuild the pydantic model without re-running validation."""
+        return Graph.model_construct(
+            nodes=[
+                Node.model_construct(id=node_id, label=label, group=group, shape=shape)
+                for node_id, label, group, shape in zip(self.node_ids, self.node_labels, self.node_groups, self.node_shapes)
+            ],
+            edges=[
+                Edge.model_construct(source=source, target=target, label=label)
+                for source, target, label in zip(self.edge_sources, self.edge_targets, self.edge_labels)
+            ],
+            layout=Layout.model_construct(direction=self.direction),
+        )
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ValidatedGraph):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    def __repr__(self) -> str:
+        return f"ValidatedGraph(nodes={len(self.node_ids)}, edges={len(self.edge_sources)}, direction={self.direction!r})"
@@ -0,0 +1,140 @@
+"""
+Incremental parsing of a streamed GRAPH JSON response.
+
+The parser consumes text chunks as they arrive and validates every complete
+node and edge object against `graph_schema` as soon as its closing brace is
+seen, so a response that is already known to be invalid can be abandoned
+before the model finishes writing it.
+
+With `local_repair=True` the parser only aborts on problems that the local
+repair pass (see `repair.repair_locally`) cannot fix after the stream ends:
+over-long labels and unknown shapes are repaired before each element is
+checked, and duplicate IDs and dangling edges are left to that pass (edges it
+cannot resolve then fail validation and go to the patch repair).
+"""
+import json
+
+from pydantic import ValidationError
+
+from graph_schema import Edge, Node
+from repair import repair_edge, repair_node
+
+
+class StreamValidationError(ValueError):
+    """Raised when a partially streamed graph can no longer become valid."""
+
+    def __init__(self, message: str, partial_text: str):
+        super().__init__(message)
+        self.partial_text = partial_text
+
+
+class GraphStreamParser:
+    """
+    Scans streamed JSON once, character by character, tracking just enough
+    state (nesting depth, string/escape state, and the key of the array being
+    filled) to cut out each element of the top-level "nodes" and "edges" arrays.
+    """
+
+    def __init__(self, local_repair: bool = False):
+        self.local_repair = local_repair
+        self.node_ids: set[str] = set()
+        self.edge_count = 0
+        self._chunks: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._last_key_chars: list[str] = []
+        self._last_key = None
+        self._array_key = None
+        self._element: list[str] | None = None
+        self._nodes_closed = False
+        self._pending_edges: list[Edge] = []
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def text(self) -> str:
+        """All text received so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next chunk, raising StreamValidationError on the first invalid element."""
+        self._chunks.append(chunk)
+        for char in chunk:
+            if self._element is not None:
+                self._element.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = "".join(self._last_key_chars)
+                elif self._depth == 1:
+                    self._last_key_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._last_key_chars = []
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2 and char == "[":
+                    self._array_key = self._last_key
+                elif self._depth == 3 and self._array_key in ("nodes", "edges"):
+                    self._element = [char]
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._element is not None:
+                    element_text = "".join(self._element)
+                    self._element = None
+                    self._check_element(element_text)
+                elif self._depth == 1 and char == "]":
+                    if self._array_key == "nodes":
+                        self._close_nodes()
+                    self._array_key = None
+
+    def _check_element(self, element_text: str) -> None:
+        try:
+            data = json.loads(element_text)
+            if self._array_key == "nodes":
+                if self.local_repair and isinstance(data, dict):
+                    data = repair_node(data, [])
+                node = Node.model_validate(data)
+                if node.id in self.node_ids and not self.local_repair:
+                    raise ValueError(f"Duplicate node ID(s): {node.id}")
+                self.node_ids.add(node.id)
+            else:
+                if self.local_repair and isinstance(data, dict):
+                    data = repair_edge(data, [])
+                edge = Edge.model_validate(data)
+                self.edge_count += 1
+                if self.local_repair:
+                    return  # endpoints are resolved after the stream ends; the rest fail validation
+                if self._nodes_closed:
+                    self._check_edge(edge)
+                else:
+                    self._pending_edges.append(edge)
+        except StreamValidationError:
+            raise
+        except (json.JSONDecodeError, ValidationError, ValueError) as e:
+            raise StreamValidationError(f"Invalid {self._array_key[:-1]} {element_text}: {e}", self.text) from e
+
+    def _close_nodes(self) -> None:
+        self._nodes_closed = True
+        pending, self._pending_edges = self._pending_edges, []
+        for edge in pending:
+            self._check_edge(edge)
+
+    def _check_edge(self, edge: Edge) -> None:
+        for endpoint, node_id in (("source", edge.source), ("target", edge.target)):
+            if node_id not in self.node_ids:
+                raise StreamValidationError(
+                    f"Edge {endpoint} '{node_id}' does not match any node ID.", self.text
+                )
@@ -0,0 +1,297 @@
+"""
+Pool of long-lived Graphviz processes.
+
+A Graphviz engine reads graphs from stdin one after another and writes each
+result as soon as that graph is complete, so one process can serve many
+renders. The pool keeps up to `workers_per_command` processes per command line
+(engine, flags and output format) and frames each result by the end marker of
+its format: `</svg>`, the PNG IEND chunk, the PDF `%%EOF`, or the closing brace
+of DOT output.
+
+  - Timeouts: a render that runs past its timeout kills its worker, which stops
+    a runaway sfdp or circo layout, and raises GraphvizTimeout.
+  - Health checks: a new worker, and one idle for longer than
+    `health_check_interval`, must render an empty graph promptly. A Graphviz
+    build that does not answer while its stdin stays open fails this check, and
+    the pool then falls back to one process per render for that command.
+  - Bounded queue: at most `max_pending` renders wait or run at once; more
+    raise GraphvizBusy instead of piling up.
+  - Closing: `close()` stops idle workers at once and busy ones as their
+    render returns; renders started after it raise GraphvizClosed.
+"""
+import atexit
+import logging
+import queue
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+import graphviz
+
+from config import (
+    GRAPHVIZ_HEALTH_CHECK_SECONDS,
+    GRAPHVIZ_HEALTH_CHECK_TIMEOUT_SECONDS,
+    GRAPHVIZ_MAX_PENDING,
+    GRAPHVIZ_TIMEOUT_SECONDS,
+    GRAPHVIZ_WORKERS_PER_COMMAND,
+)
+
+# Bytes that end one result in each format a worker can serve; other formats run one process per render.
+TERMINATORS = {
+    "svg": b"</svg>\n",
+    "png": b"IEND\xaeB`\x82",
+    "pdf": b"%%EOF\n",
+    "dot": b"\n}\n",
+    "xdot": b"\n}\n",
+}
+PING_SOURCE = b"digraph {}"
+
+
+class GraphvizTimeout(TimeoutError):
+    """Raised when a render does not finish within its timeout."""
+
+
+class GraphvizBusy(RuntimeError):
+    """Raised when the pool's queue is full or no worker frees up in time."""
+
+
+class GraphvizClosed(RuntimeError):
+    """Raised when rendering with a pool that has been closed."""
+
+
+class _Worker:
+    """One Graphviz process plus the threads that drain its stdout and stderr into an event queue."""
+
+    def __init__(self, command: tuple[str, ...]):
+        self.command = command
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.last_used = time.monotonic()
+        self._events: queue.Queue = queue.Queue()
+        threading.Thread(target=self._pump, args=("out", self.process.stdout), daemon=True).start()
+        threading.Thread(target=self._pump, args=("err", self.process.stderr), daemon=True).start()
+
+    def _pump(self, kind: str, stream) -> None:
+        read = stream.read1 if kind == "out" else stream.readline
+        try:
+            while chunk := read(65536):
+                self._events.put((kind, chunk))
+        except (OSError, ValueError):
+            pass  # closed by close()
+        self._events.put(("eof", kind))
+
+    def render(self, source: bytes, terminator: bytes, timeout: float) -> bytes:
+        deadline = time.monotonic() + timeout
+        try:
+            self.process.stdin.write(source + b"\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise subprocess.CalledProcessError(self.process.poll() or 1, self.command, stderr=str(e)) from e
+
+        output = bytearray()
+        while not output.endswith(terminator):
+            try:
+                kind, payload = self._events.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise GraphvizTimeout(f"{self.command[0]} did not finish within {timeout:.1f}s") from None
+            if kind == "out":
+                output += payload
+            elif kind == "err" and payload.startswith(b"Error"):
+                raise subprocess.CalledProcessError(1, self.command, output=bytes(output), stderr=payload)
+            elif kind == "eof":
+                raise subprocess.CalledProcessError(self.process.wait(), self.command, output=bytes(output))
+        self.last_used = time.monotonic()
+        return bytes(output)
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class GraphvizPool:
+    """Thread-safe; one instance is normally shared by the whole process (see `get_graphviz_pool`)."""
+
+    def __init__(
+        self,
+        workers_per_command: int = GRAPHVIZ_WORKERS_PER_COMMAND,
+        max_pending: int = GRAPHVIZ_MAX_PENDING,
+        timeout: float = GRAPHVIZ_TIMEOUT_SECONDS,
+        health_check_interval: float = GRAPHVIZ_HEALTH_CHECK_SECONDS,
+        health_check_timeout: float = GRAPHVIZ_HEALTH_CHECK_TIMEOUT_SECONDS,
+    ):
+        self.workers_per_command = workers_per_command
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._idle: dict[tuple, list[_Worker]] = defaultdict(list)
+        self._workers: dict[tuple, int] = defaultdict(int)
+        self._one_shot: set[tuple] = set()  # commands whose process does not answer until stdin closes
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._closed = False
+        self.renders = 0
+        self.spawned = 0
+        self.timeouts = 0
+        self.failed_health_checks = 0
+
+    def render(self, engine: str, output_format: str, source: bytes, args: tuple[str, ...] = (),
+               timeout: float | None = None) -> bytes:
+        """
+        Run `engine` with `args` on DOT `source` and return the `output_format` output.
+
+        Raises:
+            GraphvizTimeout: If the render takes longer than `timeout` (default: the pool's).
+            GraphvizBusy: If too many renders are already pending.
+            GraphvizClosed: If the pool has been closed.
+            subprocess.CalledProcessError: If Graphviz reports an error.
+            graphviz.ExecutableNotFound: If the engine is not installed.
+        """
+        timeout = timeout or self.timeout
+        command = (engine, *args, f"-T{output_format}")
+        if not self._pending.acquire(blocking=False):
+            raise GraphvizBusy("Too many Graphviz renders are already pending.")
+        try:
+            with self._lock:
+                if self._closed:
+                    raise GraphvizClosed("The Graphviz pool has been closed.")
+                self.renders += 1
+            worker = None
+            if output_format in TERMINATORS and command not in self._one_shot:
+                worker = self._checkout(command, time.monotonic() + timeout)
+            if worker is None:
+                return self._run_once(command, source, timeout)
+            try:
+                output = worker.render(source, TERMINATORS[output_format], timeout)
+            except BaseException as e:
+                if isinstance(e, GraphvizTimeout):
+                    with self._lock:
+                        self.timeouts += 1
+                self._discard(command, worker)
+                raise
+            self._checkin(command, worker)
+            return output
+        finally:
+            self._pending.release()
+
+    # --- Workers ---
+    def _checkout(self, command: tuple, deadline: float) -> _Worker | None:
+        """Return an idle or new healthy worker, or None if `command` must run one process per render."""
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise GraphvizClosed("The Graphviz pool has been closed.")
+                if command in self._one_shot:
+                    return None
+                if self._idle[command]:
+                    worker = self._idle[command].pop()
+                    break
+                if self._workers[command] < self.workers_per_command:
+                    self._workers[command] += 1
+                    worker = None
+                    break
+                if not self._released.wait(max(deadline - time.monotonic(), 0)):
+                    raise GraphvizBusy(f"No {command[0]} worker became free in time.")
+
+        if worker is not None and time.monotonic() - worker.last_used > self.health_check_interval:
+            if self._healthy(worker):
+                return worker
+            worker.close()
+        elif worker is not None:
+            return worker
+
+        try:
+            worker = self._spawn(command)
+        except BaseException:
+            self._discard(command, None)
+            raise
+        if worker is None:
+            self._discard(command, None)
+        return worker
+
+    def _spawn(self, command: tuple) -> _Worker | None:
+        try:
+            worker = _Worker(command)
+        except FileNotFoundError as e:
+            raise graphviz.ExecutableNotFound(list(command)) from e
+        with self._lock:
+            self.spawned += 1
+        if self._healthy(worker):
+            return worker
+        worker.close()
+        logging.warning("%s does not answer on an open stdin; running one process per render.", command[0])
+        with self._lock:
+            self._one_shot.add(command)
+            self._released.notify_all()
+        return None
+
+    def _healthy(self, worker: _Worker) -> bool:
+        terminator = TERMINATORS[worker.command[-1][2:]]
+        try:
+            worker.render(PING_SOURCE, terminator, self.health_check_timeout)
+            return True
+        except (GraphvizTimeout, subprocess.CalledProcessError):
+            with self._lock:
+                self.failed_health_checks += 1
+            return False
+
+    def _checkin(self, command: tuple, worker: _Worker) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle[command].append(worker)
+                self._released.notify()
+                return
+        self._discard(command, worker)
+
+    def _discard(self, command: tuple, worker: _Worker | None) -> None:
+        if worker is not None:
+            worker.close()
+        with self._lock:
+            self._workers[command] -= 1
+            self._released.notify()
+
+    @staticmethod
+    def _run_once(command: tuple, source: bytes, timeout: float) -> bytes:
+        try:
+            return subprocess.run(command, input=source, capture_output=True, timeout=timeout, check=True).stdout
+        except FileNotFoundError as e:
+            raise graphviz.ExecutableNotFound(list(command)) from e
+        except subprocess.TimeoutExpired:
+            raise GraphvizTimeout(f"{command[0]} did not finish within {timeout:.1f}s") from None
+
+    def close(self) -> None:
+        """Stop every idle worker; workers still rendering are stopped when they are returned."""
+        with self._lock:
+            self._closed = True
+            idle = [(command, worker) for command, workers in self._idle.items() for worker in workers]
+            self._idle.clear()
+            self._released.notify_all()
+        for command, worker in idle:
+            self._discard(command, worker)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "spawned": self.spawned,
+                "timeouts": self.timeouts,
+                "failed_health_checks": self.failed_health_checks,
+                "workers": sum(self._workers.values()),
+                "idle": sum(len(workers) for workers in self._idle.values()),
+                "one_shot_commands": len(self._one_shot),
+            }
+
+
+@lru_cache(maxsize=1)
+def get_graphviz_pool() -> GraphvizPool:
+    """Return the process-wide pool configured from `config`; its workers are stopped at exit."""
+    pool = GraphvizPool()
+    atexit.register(pool.close)
+    return pool
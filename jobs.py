@@ -0,0 +1,129 @@
+"""
+Background graph generation shared by every Streamlit session.
+
+`submit_generation` runs `generate_graph_from_text` (or `generate_graph_chunked`
+for long descriptions) on a process-wide thread pool and returns a GenerationJob
+straight away, so the UI script thread never waits on the LLM or on retry
+backoff. The handle exposes the latest progress message and the result, and can
+cancel the job whether it is queued or running.
+"""
+import atexit
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from functools import lru_cache
+
+from config import GENERATION_WORKERS
+from graph_schema import Graph
+from chunked_generation import generate_graph_chunked, should_chunk
+from llm_client import GenerationCancelled, GenerationStats, generate_graph_from_text
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class GenerationJob:
+    """Handle for one background generation. Safe to read from any thread."""
+
+    def __init__(self, text: str):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.stats = GenerationStats()
+        self.cancel_event = threading.Event()
+        self.submitted_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._progress = "⏳ Waiting for a free worker..."
+        self._future: Future | None = None
+
+    # --- Called from the worker thread ---
+    def report(self, message: str) -> None:
+        """Status callback for the generation."""
+        self._progress = message
+
+    def _run(self, **generate_kwargs) -> Graph:
+        if self.cancel_event.is_set():
+            raise GenerationCancelled("Generation was cancelled.")
+        self.started_at = time.time()
+        generate = generate_graph_chunked if should_chunk(self.text) else generate_graph_from_text
+        try:
+            return generate(
+                text=self.text, status_callback=self.report, stats=self.stats,
+                cancel_event=self.cancel_event, **generate_kwargs,
+            )
+        finally:
+            self.finished_at = time.time()
+
+    # --- Called from the UI ---
+    @property
+    def progress(self) -> str:
+        return self._progress
+
+    @property
+    def status(self) -> str:
+        if self._future is None or not self._future.done():
+            return RUNNING if self.started_at is not None else QUEUED
+        if self._future.cancelled() or isinstance(self._future.exception(), GenerationCancelled):
+            return CANCELLED
+        return FAILED if self._future.exception() is not None else DONE
+
+    @property
+    def elapsed(self) -> float:
+        start = self.started_at or self.submitted_at
+        return (self.finished_at or time.time()) - start
+
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def cancel(self) -> None:
+        """Stop the job: a queued job never starts, a running one stops at its next checkpoint."""
+        self.cancel_event.set()
+        if self._future is not None:
+            self._future.cancel()
+
+    def result(self, timeout: float | None = None) -> Graph:
+        """Return the graph, or raise the generation's exception (GenerationCancelled if cancelled)."""
+        try:
+            return self._future.result(timeout)
+        except CancelledError as e:
+            raise GenerationCancelled("Generation was cancelled.") from e
+
+    @property
+    def error(self) -> BaseException | None:
+        if not self.done():
+            return None
+        if self._future.cancelled():
+            return GenerationCancelled("Generation was cancelled.")
+        return self._future.exception()
+
+
+class GenerationExecutor:
+    """A bounded thread pool for generations; the queue is shared by all sessions."""
+
+    def __init__(self, max_workers: int = GENERATION_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+
+    def submit(self, api_key: str, text: str, **generate_kwargs) -> GenerationJob:
+        """Queue a generation; keyword arguments are passed to `generate_graph_from_text`."""
+        job = GenerationJob(text)
+        job._future = self._executor.submit(job._run, api_key=api_key, **generate_kwargs)
+        return job
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=1)
+def get_generation_executor() -> GenerationExecutor:
+    """Return the process-wide executor configured from `config`."""
+    executor = GenerationExecutor()
+    atexit.register(executor.shutdown)
+    return executor
+
+
+def submit_generation(api_key: str, text: str, **generate_kwargs) -> GenerationJob:
+    return get_generation_executor().submit(api_key, text, **generate_kwargs)
@@ -1,21 +1,52 @@
+import asyncio
+import atexit
+import hashlib
 import json
 import logging
+import threading
 from collections.abc import Callable
+from dataclasses import dataclass
 
+import httpx
 from openai import (
     APIConnectionError,
     APIError,
     APITimeoutError,
+    AsyncOpenAI,
     AuthenticationError,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
     OpenAI,
     RateLimitError,
 )
 from pydantic import ValidationError
 import time
 
+from graph_cache import GraphCache, cache_key
 from graph_schema import Graph
-from prompts import MAIN_PROMPT_TEMPLATE, REPAIR_PROMPT_TEMPLATE
-from config import DEFAULT_MODEL, DEFAULT_TEMPERATURE, MAX_RETRIES
+from graph_stream import GraphStreamParser, StreamValidationError
+from prompts import MAIN_PROMPT_TEMPLATE
+from repair import (
+    RepairRequest,
+    apply_patch,
+    can_patch,
+    compact_json,
+    full_repair_request,
+    patch_repair_request,
+    repair_locally,
+)
+from rate_limiter import backoff_delay, get_rate_limiter, retry_after_seconds
+from single_flight import SingleFlight
+from tracing import span
+from config import (
+    ASYNC_MAX_CONCURRENCY,
+    DEFAULT_MODEL,
+    DEFAULT_TEMPERATURE,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    MAX_RETRIES,
+)
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,6 +56,67 @@ class GraphGenerationError(Exception):
     """Custom exception for errors during graph generation."""
     pass
 
+class GenerationCancelled(GraphGenerationError):
+    """Raised when a generation is cancelled through its cancel event."""
+    pass
+
+def _check_cancelled(cancel_event: threading.Event | None) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise GenerationCancelled("Generation was cancelled.")
+
+@dataclass
+class GenerationStats:
+    """Filled in by a generation call so callers can see what it took and cost."""
+    attempts: int = 0
+    total_tokens: int = 0
+    cache_hit: bool = False
+    coalesced: bool = False  # the graph came from an identical request that was already in flight
+    local_repairs: int = 0  # fixes applied by the local repair pass
+    retries_avoided: int = 0  # responses that only became valid through local repair
+
+    @property
+    def retries(self) -> int:
+        return max(self.attempts - 1, 0)
+
+# --- Client Registry ---
+# One OpenAI client (and therefore one keep-alive connection pool) per API key and
+# endpoint, shared by every generation in the process, including Streamlit reruns.
+# Clients never retry on their own: every 429 must reach the retry loop and the
+# shared RateLimiter, which counts it and honours its Retry-After.
+_clients: dict[tuple[str, str | None], OpenAI] = {}
+_clients_lock = threading.Lock()
+
+def _http_limits(min_connections: int = 0) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max(HTTP_MAX_CONNECTIONS, min_connections),
+        max_keepalive_connections=max(HTTP_MAX_KEEPALIVE_CONNECTIONS, min_connections),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+def get_client(api_key: str, base_url: str | None = None) -> OpenAI:
+    """Return the shared client for this API key and endpoint, creating it on first use."""
+    key = (api_key, base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client = DefaultHttpxClient(limits=_http_limits())
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+            _clients[key] = client
+        return client
+
+def close_clients() -> None:
+    """Close every pooled client and its connections. Safe to call more than once."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logging.warning("Error while closing OpenAI client: %s", e)
+
+atexit.register(close_clients)
+
 def _extract_response_text(response) -> str:
     """Return the first response message, or raise a user-facing generation error."""
     choices = getattr(response, "choices", None) or []
@@ -39,7 +131,212 @@ def _extract_response_text(response) -> str:
 
 def _total_tokens(response) -> int | None:
     usage = getattr(response, "usage", None)
-    return getattr(usage, "total_tokens", None)
+    total_tokens = getattr(usage, "total_tokens", None)
+    return total_tokens if isinstance(total_tokens, int) else None
+
+# --- Shared Generation Pipeline ---
+# The sync and async entry points differ only in how they call the API and sleep;
+# everything that decides what to send and how to judge a response lives here.
+
+def _completion_kwargs(model: str, temperature: float, prompt: str) -> dict:
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "top_p": 1.0,
+        "max_tokens": 2048,
+        "response_format": {"type": "json_object"},
+    }
+
+def _estimated_tokens(kwargs: dict) -> int:
+    """Upper bound on a request's token usage, reserved from the rate limiter until the real count is known."""
+    prompt_chars = sum(len(message["content"]) for message in kwargs["messages"])
+    return prompt_chars // 4 + kwargs["max_tokens"]
+
+def _status_updater(status_callback: Callable[[str], None] | None) -> Callable[[str], None]:
+    def update_status(message: str) -> None:
+        if status_callback:
+            status_callback(message)
+    return update_status
+
+def _cached_graph(cache: GraphCache | None, key: str | None, update_status, stats: GenerationStats) -> Graph | None:
+    if not cache:
+        return None
+    with span("cache.lookup") as lookup:
+        cached_graph = cache.get(key)
+        lookup.set_attribute("hit", cached_graph is not None)
+    if cached_graph is not None:
+        logging.info("Cache hit for generation request %s.", key[:12])
+        update_status("⚡ Loaded graph from cache.")
+        stats.cache_hit = True
+    return cached_graph
+
+def _process_response(
+    response, text: str, attempt: int, elapsed: float, update_status, stats: GenerationStats,
+    base_data: dict | None = None,
+) -> tuple[Graph | None, RepairRequest | None]:
+    """
+    Parse and validate one LLM response.
+
+    When `base_data` is given the response is a repair patch for that graph,
+    which is applied before validation.
+
+    Returns:
+        (graph, None) when the response is a valid graph, or (None, repair_request)
+        when it should be retried with the given repair request.
+    """
+    return _process_response_text(
+        _extract_response_text(response), _total_tokens(response), text, attempt, elapsed, update_status, stats,
+        base_data,
+    )
+
+def _process_response_text(
+    raw_response_text: str,
+    total_tokens: int | None,
+    text: str,
+    attempt: int,
+    elapsed: float,
+    update_status,
+    stats: GenerationStats,
+    base_data: dict | None = None,
+) -> tuple[Graph | None, RepairRequest | None]:
+    stats.total_tokens += total_tokens or 0
+    logging.info(
+        "LLM call successful. Time: %.2fs, Tokens: %s",
+        elapsed,
+        total_tokens if total_tokens is not None else "unknown",
+    )
+    update_status("✅ LLM response received. Parsing and validating...")
+
+    # 1. Parse the JSON (and apply it as a patch when repairing)
+    try:
+        with span("json.parse", chars=len(raw_response_text)):
+            json_data = json.loads(raw_response_text)
+        if base_data is not None:
+            with span("patch.apply"):
+                json_data = apply_patch(base_data, json_data)
+    except ValueError as e:  # json.JSONDecodeError, or a patch that cannot be applied
+        logging.warning(f"Attempt {attempt + 1}: Failed to parse JSON. Error: {e}")
+        update_status(f"⚠️ Attempt {attempt + 1}: Invalid JSON received. Retrying...")
+        with span("prompt.repair", reason="json"):
+            if base_data is not None:
+                # The patch was unusable; fall back to asking for the whole graph.
+                return None, full_repair_request(
+                    text, compact_json(base_data), f"The previous repair patch could not be applied: {e}"
+                )
+            return None, full_repair_request(
+                text, raw_response_text,
+                "The response was not valid JSON. Please provide only a single, well-formed JSON object.",
+            )
+
+    # 2. Fix what can be fixed without the LLM
+    with span("repair.local") as local:
+        json_data, changes = repair_locally(json_data)
+        local.set_attribute("changes", len(changes))
+    if changes:
+        logging.info("Attempt %d: repaired locally: %s", attempt + 1, "; ".join(changes))
+        stats.local_repairs += len(changes)
+
+    # 3. Validate with Pydantic
+    try:
+        update_status("🔍 Validating graph schema...")
+        with span("schema.validate"):
+            graph = Graph.model_validate(json_data)
+    except ValidationError as e:
+        logging.warning(f"Attempt {attempt + 1}: Graph validation failed. Errors: {e.errors()}")
+        update_status(f"⚠️ Attempt {attempt + 1}: Schema validation failed. Retrying...")
+        with span("prompt.repair", reason="schema"):
+            if can_patch(json_data):
+                return None, patch_repair_request(json_data, e)
+            return None, full_repair_request(text, compact_json(json_data), str(e))
+
+    if changes:
+        stats.retries_avoided += 1
+        update_status(f"🩹 Fixed {len(changes)} problem(s) locally instead of retrying.")
+    logging.info("Graph validation successful.")
+    update_status("✅ Graph validation successful!")
+    return graph, None
+
+def _stream_response(
+    client, kwargs: dict, text: str, attempt: int, update_status, stats: GenerationStats,
+    cancel_event: threading.Event | None = None,
+) -> tuple[Graph | None, RepairRequest | None]:
+    """
+    Stream one completion, validating nodes and edges as they arrive.
+
+    Stops reading (and closes the connection, which ends generation server-side)
+    as soon as an element fails validation, and returns the repair request for it.
+    """
+    start_time = time.time()
+    with span("llm.request", stream=True):
+        stream = client.chat.completions.create(**kwargs, stream=True, stream_options={"include_usage": True})
+    parser = GraphStreamParser(local_repair=True)
+    total_tokens = None
+    reported = (0, 0)
+
+    try:
+        with span("llm.stream") as receiving:
+            for chunk in stream:
+                _check_cancelled(cancel_event)
+                chunk_tokens = _total_tokens(chunk)  # only the final chunk carries usage, and only if the server sends it
+                if chunk_tokens is not None:
+                    total_tokens = chunk_tokens
+                for choice in getattr(chunk, "choices", None) or []:
+                    content = getattr(choice.delta, "content", None)
+                    if content:
+                        parser.feed(content)
+                progress = (parser.node_count, parser.edge_count)
+                if progress != reported:
+                    reported = progress
+                    update_status(f"📥 Attempt {attempt + 1}: Received {progress[0]} nodes and {progress[1]} edges...")
+            receiving.set_attribute("nodes", parser.node_count)
+            receiving.set_attribute("edges", parser.edge_count)
+    except StreamValidationError as e:
+        logging.warning(f"Attempt {attempt + 1}: Aborted stream after {time.time() - start_time:.2f}s. Error: {e}")
+        update_status(f"⚠️ Attempt {attempt + 1}: Invalid element streamed. Stopping early and retrying...")
+        with span("prompt.repair", reason="stream"):
+            return None, full_repair_request(
+                text, e.partial_text, f"{e} Generation was stopped at this point; produce the complete graph again."
+            )
+    finally:
+        # Also on cancellation or any other error: an open stream keeps the model generating server-side.
+        stream.close()
+
+    raw_response_text = parser.text
+    if not raw_response_text.strip():
+        raise GraphGenerationError("The model returned an empty response.")
+    return _process_response_text(
+        raw_response_text, total_tokens, text, attempt, time.time() - start_time, update_status, stats
+    )
+
+def _handle_request_error(e: Exception, attempt: int, max_retries: int, update_status) -> float:
+    """Translate an exception from one attempt into a backoff delay, or raise GraphGenerationError."""
+    if isinstance(e, AuthenticationError):
+        logging.error("Authentication failed: %s", e)
+        raise GraphGenerationError("Invalid OpenAI API key. Please check your key and try again.") from e
+    if isinstance(e, (RateLimitError, APITimeoutError, APIConnectionError, APIError)):
+        logging.error(f"API Error on attempt {attempt + 1}: {e}")
+        if attempt < max_retries:
+            # Jittered exponential backoff, or the server's retry hint when it sent one.
+            delay = backoff_delay(attempt, retry_after_seconds(e) if isinstance(e, RateLimitError) else None)
+            if isinstance(e, RateLimitError):
+                update_status(f"⏳ Rate limited. Retrying in {delay:.1f}s...")
+            else:
+                update_status("🔥 API error. Retrying in a moment...")
+            return delay
+        update_status("🔥 API error. Retrying in a moment...")
+        raise GraphGenerationError(f"API error after multiple retries: {e}") from e
+    logging.error(f"An unexpected error occurred on attempt {attempt + 1}: {e}")
+    raise GraphGenerationError(f"An unexpected error occurred: {e}") from e
+
+# --- Request Coalescing ---
+# Identical generations running at the same time (same credentials, endpoint, text,
+# model and temperature) share one LLM call; see `single_flight`.
+in_flight_generations = SingleFlight()
+
+def _flight_key(api_key: str, base_url: str | None, text: str, model: str, temperature: float) -> str:
+    credentials = hashlib.sha256(f"{api_key}\0{base_url or ''}".encode("utf-8")).hexdigest()
+    return f"{credentials}:{cache_key(text, model, temperature)}"
 
 # --- Main Client Function ---
 def generate_graph_from_text(
@@ -49,6 +346,11 @@ def generate_graph_from_text(
     temperature: float = DEFAULT_TEMPERATURE,
     max_retries: int = MAX_RETRIES,
     status_callback: Callable[[str], None] | None = None,
+    cache: GraphCache | None = None,
+    stream: bool = False,
+    stats: GenerationStats | None = None,
+    base_url: str | None = None,
+    cancel_event: threading.Event | None = None,
 ) -> Graph:
     """
     Generates a graph from natural language text using an LLM, with validation and retries.
@@ -60,90 +362,230 @@ def generate_graph_from_text(
         temperature: The generation temperature.
         max_retries: The maximum number of times to retry on validation failure.
         status_callback: A function to call with status updates.
+        cache: Optional response cache; a hit skips the LLM call entirely.
+        stream: Stream the response and validate elements as they arrive, so an
+            invalid response is abandoned early and repaired sooner.
+        stats: Optional GenerationStats to fill in with attempts and token usage.
+            `stats.coalesced` is set when the graph was shared from an identical
+            request already in flight.
+        base_url: Optional OpenAI-compatible endpoint (e.g. a local stub for testing).
+        cancel_event: Optional event that stops the generation when set, including
+            during a streamed response or a retry backoff.
 
     Returns:
         A validated Graph object.
 
     Raises:
         GraphGenerationError: If generation and validation fail after all retries.
+        GenerationCancelled: If `cancel_event` is set before a graph is returned.
     """
-    client = OpenAI(api_key=api_key)
-    prompt = MAIN_PROMPT_TEMPLATE.format(user_text=text)
-    
-    def update_status(message: str) -> None:
-        if status_callback:
-            status_callback(message)
+    update_status = _status_updater(status_callback)
+    stats = stats if stats is not None else GenerationStats()
+    flight_key = _flight_key(api_key, base_url, text, model, temperature)
+    waiting_reported = False
+
+    def on_wait():
+        nonlocal waiting_reported
+        if not waiting_reported:
+            waiting_reported = True
+            logging.info("Joining an identical in-flight generation.")
+            update_status("⏳ An identical request is already running. Sharing its result...")
+        _check_cancelled(cancel_event)
+
+    with span("generate_graph", model=model, stream=stream) as root:
+        try:
+            while True:
+                try:
+                    graph, stats.coalesced = in_flight_generations.do(
+                        flight_key,
+                        lambda: _generate_with_retries(
+                            api_key, text, model, temperature, max_retries, update_status, cache, stream, stats,
+                            base_url, cancel_event,
+                        ),
+                        on_wait,
+                    )
+                    return graph
+                except GenerationCancelled:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise
+                    # The call we were sharing was cancelled by its own caller; run our own.
+                    logging.info("Shared generation was cancelled; retrying independently.")
+        finally:
+            root.set_attribute("attempts", stats.attempts)
+            root.set_attribute("total_tokens", stats.total_tokens)
+            root.set_attribute("cache_hit", stats.cache_hit)
+            root.set_attribute("coalesced", stats.coalesced)
+            root.set_attribute("retries_avoided", stats.retries_avoided)
+
+def _generate_with_retries(
+    api_key, text, model, temperature, max_retries, update_status, cache, stream, stats, base_url, cancel_event
+) -> Graph:
+    key = cache_key(text, model, temperature) if cache else None
+    cached_graph = _cached_graph(cache, key, update_status, stats)
+    if cached_graph is not None:
+        return cached_graph
+
+    client = get_client(api_key, base_url)
+    with span("prompt.format"):
+        prompt = MAIN_PROMPT_TEMPLATE.format(user_text=text)
+    base_data = None  # set while the next reply is a repair patch
 
     for attempt in range(max_retries + 1):
+        _check_cancelled(cancel_event)
         logging.info(f"Generation attempt {attempt + 1}...")
         update_status(f"🧠 Attempt {attempt + 1}: Contacting LLM...")
-        
-        try:
-            start_time = time.time()
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=1.0,
-                max_tokens=2048,
-                response_format={"type": "json_object"},
-            )
-            
-            end_time = time.time()
-            
-            raw_response_text = _extract_response_text(response)
-            total_tokens = _total_tokens(response)
-            
-            logging.info(
-                "LLM call successful. Time: %.2fs, Tokens: %s",
-                end_time - start_time,
-                total_tokens if total_tokens is not None else "unknown",
-            )
-            update_status("✅ LLM response received. Parsing and validating...")
+        stats.attempts += 1
 
-            # 1. Parse the JSON
+        with span("llm.attempt", attempt=attempt + 1, repair=attempt > 0):
             try:
-                json_data = json.loads(raw_response_text)
-            except json.JSONDecodeError as e:
-                logging.warning(f"Attempt {attempt + 1}: Failed to parse JSON. Error: {e}")
-                update_status(f"⚠️ Attempt {attempt + 1}: Invalid JSON received. Retrying...")
-                prompt = REPAIR_PROMPT_TEMPLATE.format(
-                    user_text=text,
-                    invalid_json=raw_response_text,
-                    error_message="The response was not valid JSON. Please provide only a single, well-formed JSON object."
-                )
+                kwargs = _completion_kwargs(model, temperature, prompt)
+                tokens_before = stats.total_tokens
+                with span("rate_limit.wait"):
+                    permit = get_rate_limiter().acquire(_estimated_tokens(kwargs), cancel_event)
+                if permit is None:
+                    _check_cancelled(cancel_event)
+                with permit:
+                    if stream and base_data is None:  # patches are small and not graphs; no streaming
+                        graph, repair = _stream_response(
+                            client, kwargs, text, attempt, update_status, stats, cancel_event
+                        )
+                    else:
+                        start_time = time.time()
+                        with span("llm.request", stream=False):
+                            response = client.chat.completions.create(**kwargs)
+                        graph, repair = _process_response(
+                            response, text, attempt, time.time() - start_time, update_status, stats, base_data
+                        )
+                    permit.tokens_used = stats.total_tokens - tokens_before or None
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                delay = _handle_request_error(e, attempt, max_retries, update_status)
+                with span("backoff", seconds=delay):
+                    if cancel_event is None:
+                        time.sleep(delay)
+                    elif cancel_event.wait(delay):
+                        _check_cancelled(cancel_event)
                 continue
 
-            # 2. Validate with Pydantic
+        if graph is not None:
+            if cache:
+                cache.put(key, graph)
+            return graph
+        prompt, base_data = repair.prompt, repair.base_data
+
+    raise GraphGenerationError("Failed to generate a valid graph after multiple attempts.")
+
+# --- Async Client Functions ---
+async def agenerate_graph_from_text(
+    api_key: str,
+    text: str,
+    model: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_retries: int = MAX_RETRIES,
+    status_callback: Callable[[str], None] | None = None,
+    cache: GraphCache | None = None,
+    client: AsyncOpenAI | None = None,
+    stats: GenerationStats | None = None,
+) -> Graph:
+    """
+    Async counterpart of `generate_graph_from_text` with the same parse, validate and repair pipeline.
+
+    Backoff between retries uses `asyncio.sleep`, so other generations keep running.
+    Pass `client` to share one connection pool across many calls; otherwise a
+    client is created for this call and closed afterwards.
+    """
+    if client is None:
+        async with AsyncOpenAI(api_key=api_key, max_retries=0) as owned_client:
+            return await agenerate_graph_from_text(
+                api_key, text, model, temperature, max_retries, status_callback, cache, owned_client, stats
+            )
+
+    update_status = _status_updater(status_callback)
+    stats = stats if stats is not None else GenerationStats()
+    with span("generate_graph", model=model, stream=False) as root:
+        try:
+            return await _agenerate_with_retries(
+                client, text, model, temperature, max_retries, update_status, cache, stats
+            )
+        finally:
+            root.set_attribute("attempts", stats.attempts)
+            root.set_attribute("total_tokens", stats.total_tokens)
+            root.set_attribute("cache_hit", stats.cache_hit)
+            root.set_attribute("retries_avoided", stats.retries_avoided)
+
+async def _agenerate_with_retries(
+    client: AsyncOpenAI, text, model, temperature, max_retries, update_status, cache, stats
+) -> Graph:
+    key = cache_key(text, model, temperature) if cache else None
+    cached_graph = _cached_graph(cache, key, update_status, stats)
+    if cached_graph is not None:
+        return cached_graph
+
+    with span("prompt.format"):
+        prompt = MAIN_PROMPT_TEMPLATE.format(user_text=text)
+    base_data = None
+
+    for attempt in range(max_retries + 1):
+        logging.info(f"Generation attempt {attempt + 1}...")
+        update_status(f"🧠 Attempt {attempt + 1}: Contacting LLM...")
+        stats.attempts += 1
+
+        with span("llm.attempt", attempt=attempt + 1, repair=attempt > 0):
             try:
-                update_status("🔍 Validating graph schema...")
-                graph = Graph.model_validate(json_data)
-                logging.info("Graph validation successful.")
-                update_status("✅ Graph validation successful!")
-                return graph
-            except ValidationError as e:
-                logging.warning(f"Attempt {attempt + 1}: Graph validation failed. Errors: {e.errors()}")
-                update_status(f"⚠️ Attempt {attempt + 1}: Schema validation failed. Retrying...")
-                prompt = REPAIR_PROMPT_TEMPLATE.format(
-                    user_text=text,
-                    invalid_json=json.dumps(json_data, indent=2),
-                    error_message=str(e)
-                )
+                kwargs = _completion_kwargs(model, temperature, prompt)
+                tokens_before = stats.total_tokens
+                with span("rate_limit.wait"):
+                    permit = await get_rate_limiter().aacquire(_estimated_tokens(kwargs))
+                with permit:
+                    start_time = time.time()
+                    with span("llm.request", stream=False):
+                        response = await client.chat.completions.create(**kwargs)
+                    graph, repair = _process_response(
+                        response, text, attempt, time.time() - start_time, update_status, stats, base_data
+                    )
+                    permit.tokens_used = stats.total_tokens - tokens_before or None
+            except Exception as e:
+                delay = _handle_request_error(e, attempt, max_retries, update_status)
+                with span("backoff", seconds=delay):
+                    await asyncio.sleep(delay)
                 continue
 
-        except AuthenticationError as e:
-            logging.error("Authentication failed: %s", e)
-            raise GraphGenerationError("Invalid OpenAI API key. Please check your key and try again.") from e
-        except (RateLimitError, APITimeoutError, APIConnectionError, APIError) as e:
-            logging.error(f"API Error on attempt {attempt + 1}: {e}")
-            update_status("🔥 API error. Retrying in a moment...")
-            if attempt < max_retries:
-                time.sleep(2 ** attempt) # Exponential backoff
-            else:
-                raise GraphGenerationError(f"API error after multiple retries: {e}") from e
-        except Exception as e:
-            logging.error(f"An unexpected error occurred on attempt {attempt + 1}: {e}")
-            raise GraphGenerationError(f"An unexpected error occurred: {e}") from e
+        if graph is not None:
+            if cache:
+                cache.put(key, graph)
+            return graph
+        prompt, base_data = repair.prompt, repair.base_data
 
     raise GraphGenerationError("Failed to generate a valid graph after multiple attempts.")
+
+async def generate_many(
+    api_key: str,
+    texts: list[str],
+    model: str = DEFAULT_MODEL,
+    temperature: float = DEFAULT_TEMPERATURE,
+    max_retries: int = MAX_RETRIES,
+    concurrency: int = ASYNC_MAX_CONCURRENCY,
+    cache: GraphCache | None = None,
+) -> list[Graph | GraphGenerationError]:
+    """
+    Generate graphs for many descriptions concurrently, at most `concurrency` in flight.
+
+    Results are returned in input order. A description that fails produces its
+    GraphGenerationError in place of a graph rather than cancelling the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    http_client = DefaultAsyncHttpxClient(limits=_http_limits(concurrency))
+
+    async with AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0) as client:
+        async def run(index: int, text: str) -> Graph | GraphGenerationError:
+            async with semaphore:
+                logging.info("Starting batch item %d of %d.", index + 1, len(texts))
+                try:
+                    return await agenerate_graph_from_text(
+                        api_key, text, model, temperature, max_retries, cache=cache, client=client
+                    )
+                except GraphGenerationError as e:
+                    return e
+
+        return await asyncio.gather(*(run(index, text) for index, text in enumerate(texts)))
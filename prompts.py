@@ -1,3 +1,6 @@
+# Bump whenever either template changes so cached graphs from older prompts are not reused.
+PROMPT_TEMPLATE_VERSION = 2
+
 # --- Main Prompt Template ---
 MAIN_PROMPT_TEMPLATE = '''
 You are an expert system that converts natural language descriptions of processes into a structured GRAPH JSON format.
@@ -55,3 +58,32 @@ And here is the validation error message:
 
 Please analyze the error and the original request, then generate a new, valid GRAPH JSON that fixes the problem.
 '''
+
+# --- Patch Repair Prompt Template ---
+# Used when the response parsed but failed schema validation: only the offending
+# elements are sent, and the reply is a patch applied to the parsed graph (see `repair`).
+PATCH_REPAIR_PROMPT_TEMPLATE = '''
+Your GRAPH JSON failed validation. Do not resend the graph; reply with a JSON patch that fixes only the errors below.
+Your response MUST be a single, valid JSON object and nothing else. Do not include any explanatory text, markdown, or comments.
+
+Patch format (omit keys you do not need; null deletes an element):
+{{"replace_nodes": {{"<index>": <node or null>}}, "replace_edges": {{"<index>": <edge or null>}}, "add_nodes": [<node>], "add_edges": [<edge>], "layout": {{"direction": "TB" or "LR"}}}}
+
+A node is {{"id", "label", "group", "shape"}}: unique id, label of at most 100 characters, shape one of "box", "ellipse", "diamond", "circle".
+An edge is {{"source", "target", "label"}}: source and target must be node IDs, label of at most 50 characters.
+
+Node IDs in the graph: {node_ids}
+
+Errors (location and message):
+{errors}
+
+Offending elements, by index:
+{items}
+'''
+
+# --- Section Note ---
+# Prepended to each section's text in chunked generation; the main template is unchanged.
+SECTION_NOTE_TEMPLATE = (
+    "(This is part {index} of {count} of a longer process description. "
+    "Model only the steps described in this part, in order.)\n\n{section}"
+)
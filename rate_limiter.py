@@ -0,0 +1,251 @@
+"""
+Client-side rate limiting and adaptive concurrency for OpenAI calls.
+
+One RateLimiter is shared by the whole process. Before each request a caller
+takes a permit, which needs:
+  - a request from the requests-per-minute token bucket,
+  - its estimated tokens from the tokens-per-minute bucket (corrected to the
+    real usage when the permit is released), and
+  - a concurrency slot. The slot limit adapts AIMD-style: it grows by about one
+    per window of successful calls and halves when the server answers 429.
+
+A 429 that carries a retry hint (`Retry-After`, `retry-after-ms` or
+`x-ratelimit-reset-*`) pauses every caller until the hint expires, instead of
+each one retrying on its own schedule.
+"""
+import asyncio
+import email.utils
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+
+from config import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    RATE_LIMIT_INITIAL_CONCURRENCY,
+    RATE_LIMIT_MAX_CONCURRENCY,
+    RATE_LIMIT_MIN_CONCURRENCY,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class TokenBucket:
+    """Holds up to `capacity` units and refills at `rate_per_minute`. Not thread-safe on its own."""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now). Amounts over capacity are capped."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.available
+        return max(missing, 0) / self.rate_per_second
+
+    def take(self, amount: float) -> None:
+        """Remove `amount`; may go negative, which delays later callers (used for under-estimates)."""
+        self.available -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.available = min(self.capacity, self.available + amount)
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse '1.5', '20ms', '1s' or '6m0s' into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after_seconds(error) -> float | None:
+    """Return the server's retry hint from an API error's response headers, if it sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+
+    def header(name: str) -> str | None:
+        try:
+            value = headers.get(name)
+        except (AttributeError, TypeError):
+            return None
+        return value if isinstance(value, str) else None  # ignore anything that is not a real header value
+
+    retry_after_ms = header("retry-after-ms")
+    if retry_after_ms is not None:
+        seconds = _parse_duration(retry_after_ms)
+        if seconds is not None:
+            return seconds / 1000
+
+    retry_after = header("retry-after")
+    if retry_after is not None:
+        seconds = _parse_duration(retry_after)
+        if seconds is None:
+            try:
+                seconds = email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+
+    resets = [_parse_duration(value) for value in (header("x-ratelimit-reset-requests"), header("x-ratelimit-reset-tokens")) if value]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None,
+                  base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_MAX_SECONDS) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    With a server hint, wait at least that long plus up to 10% jitter. Otherwise
+    use exponential backoff with equal jitter: half the step fixed, half random,
+    so clients that failed together do not retry together.
+    """
+    if retry_after is not None:
+        return min(retry_after + random.uniform(0, max(retry_after * 0.1, 0.05)), max(cap, retry_after))
+    step = min(cap, base * 2 ** attempt)
+    return step / 2 + random.uniform(0, step / 2)
+
+
+class Permit:
+    """
+    Reservation for one request. Use it as a context manager around the request;
+    set `tokens_used` inside it so the token bucket is corrected to real usage.
+    An exception leaving the block is inspected for a 429.
+    """
+
+    def __init__(self, limiter: "RateLimiter", estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.tokens_used: int | None = None
+        self._limiter = limiter
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._limiter._release(self, exc)
+        return False
+
+
+class RateLimiter:
+    """Thread-safe; also usable from asyncio through `aacquire`."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = RATE_LIMIT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = RATE_LIMIT_TOKENS_PER_MINUTE,
+        min_concurrency: int = RATE_LIMIT_MIN_CONCURRENCY,
+        max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+        initial_concurrency: int = RATE_LIMIT_INITIAL_CONCURRENCY,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency_limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.total_requests = 0
+        self.rate_limited = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    # --- Acquiring ---
+    def _try_acquire(self, estimated_tokens: int) -> float:
+        """Take a permit's resources and return 0, or return how long to wait before trying again."""
+        now = time.monotonic()
+        with self._lock:
+            wait = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(estimated_tokens, now),
+            )
+            if wait > 0:
+                return wait
+            if self.in_flight >= int(self.concurrency_limit):
+                return 0.05  # woken earlier by a release when waiting synchronously
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.total_requests += 1
+            return 0.0
+
+    def acquire(self, estimated_tokens: int, cancel_event: threading.Event | None = None) -> Permit | None:
+        """Block until a permit is available; return None if `cancel_event` is set first."""
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            wait = self._try_acquire(estimated_tokens)
+            if wait == 0:
+                return Permit(self, estimated_tokens)
+            with self._released:
+                self._released.wait(min(wait, 0.25) if cancel_event is not None else wait)
+
+    async def aacquire(self, estimated_tokens: int) -> Permit:
+        """Async counterpart of `acquire`; waits with asyncio.sleep instead of blocking the loop."""
+        while (wait := self._try_acquire(estimated_tokens)) > 0:
+            await asyncio.sleep(wait)
+        return Permit(self, estimated_tokens)
+
+    # --- Releasing and adapting ---
+    def _release(self, permit: Permit, error: BaseException | None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if permit.tokens_used is not None:
+                difference = permit.estimated_tokens - permit.tokens_used
+                if difference > 0:
+                    self.tokens.give_back(difference)
+                else:
+                    self.tokens.take(-difference)
+            if getattr(error, "status_code", None) == 429:
+                self._on_rate_limited(retry_after_seconds(error))
+            elif error is None:
+                # Additive increase: roughly +1 slot per `concurrency_limit` successful calls.
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            self._released.notify_all()
+
+    def _on_rate_limited(self, retry_after: float | None) -> None:
+        now = time.monotonic()
+        self.rate_limited += 1
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        # Multiplicative decrease, at most once per second so one burst of 429s halves the limit once.
+        if now - self._last_decrease >= 1.0:
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            self._last_decrease = now
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency_limit": int(self.concurrency_limit),
+                "in_flight": self.in_flight,
+                "requests": self.total_requests,
+                "rate_limited": self.rate_limited,
+                "rate_limited_ratio": self.rate_limited / self.total_requests if self.total_requests else 0.0,
+                "paused_for": max(self.paused_until - time.monotonic(), 0.0),
+            }
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter configured from `config`."""
+    return RateLimiter()
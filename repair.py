@@ -0,0 +1,314 @@
+"""
+Repair of graphs that fail schema validation, locally first and then by the LLM.
+
+`repair_locally` runs on every parsed response before validation and fixes
+mechanical problems without another round trip: duplicate node IDs, edge
+endpoints that use the wrong case or a node's label, over-long labels, unknown
+shapes and a malformed layout. Each fix is described in the returned list of
+changes. Edges to nodes that do not exist are left for the patch repair.
+
+For what is left, instead of sending the whole invalid graph back to the model,
+the repair prompt lists only the offending nodes and edges (compact JSON, keyed
+by their index) together with structured error locations. The model answers
+with a small patch, which is applied locally to the graph that was already
+parsed:
+
+    {"replace_nodes": {"3": {...} | null}, "replace_edges": {"7": {...} | null},
+     "add_nodes": [...], "add_edges": [...], "layout": {...}}
+
+A `null` replacement deletes the element. A reply that is a complete graph (it
+has a "nodes" key) replaces the graph instead, so a model that ignores the patch
+format still makes progress.
+"""
+import json
+from dataclasses import dataclass
+
+from pydantic import ValidationError
+
+from graph_schema import (
+    ALLOWED_DIRECTIONS,
+    ALLOWED_SHAPES,
+    EDGE_LABEL_MAX_LENGTH,
+    MAX_REPORTED_ISSUES,
+    NODE_LABEL_MAX_LENGTH,
+    GraphIndex,
+)
+from prompts import PATCH_REPAIR_PROMPT_TEMPLATE, REPAIR_PROMPT_TEMPLATE
+
+_PATCH_KEYS = {"replace_nodes", "replace_edges", "add_nodes", "add_edges", "layout"}
+SHAPE_ALIASES = {
+    "rectangle": "box", "rect": "box", "square": "box", "process": "box", "rounded": "box",
+    "oval": "ellipse", "stadium": "ellipse", "terminator": "ellipse", "start": "ellipse", "end": "ellipse",
+    "rhombus": "diamond", "decision": "diamond",
+    "round": "circle", "doublecircle": "circle",
+}
+DIRECTION_ALIASES = {"TD": "TB", "BT": "TB", "RL": "LR"}
+
+
+@dataclass
+class RepairRequest:
+    """The prompt for the next attempt; `base_data` is set when its reply is a patch to that graph."""
+    prompt: str
+    base_data: dict | None = None
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _format_loc(loc: tuple) -> str:
+    path = ""
+    for part in loc:
+        path += f"[{part}]" if isinstance(part, int) else f".{part}" if path else str(part)
+    return path or "graph"
+
+
+def _raw_index(data: dict) -> GraphIndex:
+    """GraphIndex over unvalidated data; malformed entries get None IDs but keep their positions."""
+    def field(item, name):
+        return item.get(name) if isinstance(item, dict) else None
+
+    nodes = data.get("nodes") if isinstance(data.get("nodes"), list) else []
+    edges = data.get("edges") if isinstance(data.get("edges"), list) else []
+    return GraphIndex(
+        (field(node, "id") for node in nodes),
+        ((field(edge, "source"), field(edge, "target")) for edge in edges),
+    )
+
+
+def collect_errors(data: dict, error: ValidationError) -> tuple[list[dict], list[int], list[int]]:
+    """
+    Return (errors, offending node indexes, offending edge indexes) for a failed validation.
+
+    Field errors keep their pydantic location. The graph-level integrity error is
+    replaced by one located error per duplicate ID and dangling edge endpoint.
+    """
+    errors, bad_nodes, bad_edges = [], set(), set()
+    for item in error.errors():
+        loc = item["loc"]
+        if not loc:
+            continue  # integrity errors; located from the raw index below
+        if len(loc) >= 2 and loc[0] in ("nodes", "edges") and isinstance(loc[1], int):
+            (bad_nodes if loc[0] == "nodes" else bad_edges).add(loc[1])
+        errors.append({"loc": _format_loc(loc), "msg": item["msg"]})
+
+    index = _raw_index(data)
+    for node_id in index.duplicate_ids:
+        positions = [i for i, candidate in enumerate(index.node_ids) if candidate == node_id]
+        bad_nodes.update(positions)
+        errors.append({"loc": ", ".join(f"nodes[{i}].id" for i in positions), "msg": f"Duplicate node ID '{node_id}'."})
+    for edge_index, endpoint, node_id in index.dangling_edges:
+        bad_edges.add(edge_index)
+        errors.append({"loc": f"edges[{edge_index}].{endpoint}", "msg": f"'{node_id}' does not match any node ID."})
+
+    return errors[:MAX_REPORTED_ISSUES], sorted(bad_nodes), sorted(bad_edges)
+
+
+def can_patch(data) -> bool:
+    """True if the parsed response has node and edge lists that a patch can be applied to."""
+    return (
+        isinstance(data, dict)
+        and isinstance(data.get("nodes"), list)
+        and isinstance(data.get("edges", []), list)
+    )
+
+
+def patch_repair_request(data: dict, error: ValidationError) -> RepairRequest:
+    """Build a targeted repair request for parsed graph data that failed validation."""
+    errors, bad_nodes, bad_edges = collect_errors(data, error)
+    nodes, edges = data["nodes"], data.get("edges", [])
+    items = {}
+    if bad_nodes:
+        items["nodes"] = {str(i): nodes[i] for i in bad_nodes}
+    if bad_edges:
+        items["edges"] = {str(i): edges[i] for i in bad_edges}
+    node_ids = [node.get("id") for node in nodes if isinstance(node, dict) and isinstance(node.get("id"), str)]
+    prompt = PATCH_REPAIR_PROMPT_TEMPLATE.format(
+        node_ids=compact_json(node_ids),
+        errors=compact_json(errors),
+        items=compact_json(items) if items else "(none; the errors are not tied to single nodes or edges)",
+    )
+    return RepairRequest(prompt, base_data=data)
+
+
+def full_repair_request(text: str, invalid_json: str, error_message: str) -> RepairRequest:
+    """Build a repair request that asks for the whole graph again."""
+    return RepairRequest(REPAIR_PROMPT_TEMPLATE.format(
+        user_text=text, invalid_json=invalid_json, error_message=error_message,
+    ))
+
+
+def _replace(items: list, replacements, kind: str) -> list:
+    if not isinstance(replacements, dict):
+        raise ValueError(f"'replace_{kind}' must be an object keyed by {kind[:-1]} index.")
+    items = list(items)
+    for key, replacement in replacements.items():
+        try:
+            position = int(key)
+        except ValueError:
+            raise ValueError(f"'{key}' is not a {kind[:-1]} index.") from None
+        if not 0 <= position < len(items):
+            raise ValueError(f"There is no {kind[:-1]} at index {position}.")
+        items[position] = replacement
+    return items
+
+
+def apply_patch(data: dict, patch) -> dict:
+    """
+    Apply a repair patch to parsed graph data and return the patched copy.
+
+    Replacements are applied by original index before deletions, so indexes in
+    one patch never shift under each other.
+
+    Raises:
+        ValueError: If the patch is not a patch object or references missing indexes.
+    """
+    if isinstance(patch, dict) and "nodes" in patch:
+        return patch  # a complete graph
+    if not isinstance(patch, dict) or not patch.keys() & _PATCH_KEYS:
+        raise ValueError("The response is neither a patch nor a complete graph.")
+
+    nodes = _replace(data["nodes"], patch.get("replace_nodes", {}), "nodes")
+    edges = _replace(data.get("edges", []), patch.get("replace_edges", {}), "edges")
+    for kind in ("add_nodes", "add_edges"):
+        if not isinstance(patch.get(kind, []), list):
+            raise ValueError(f"'{kind}' must be a list.")
+
+    patched = dict(data)
+    patched["nodes"] = [node for node in nodes if node is not None] + patch.get("add_nodes", [])
+    patched["edges"] = [edge for edge in edges if edge is not None] + patch.get("add_edges", [])
+    if "layout" in patch:
+        patched["layout"] = patch["layout"]
+    return patched
+
+
+# --- Local Repair ---
+
+def _truncate(label: str, limit: int) -> str:
+    return label[:limit - 1].rstrip() + "…"
+
+
+def repair_node(node: dict, changes: list[str], where: str = "node") -> dict:
+    """Return `node` with an over-long label shortened and an unknown shape replaced."""
+    fixed = node
+    label = node.get("label")
+    if isinstance(label, str) and len(label) > NODE_LABEL_MAX_LENGTH:
+        fixed = {**fixed, "label": _truncate(label, NODE_LABEL_MAX_LENGTH)}
+        changes.append(f"{where}: shortened label to {NODE_LABEL_MAX_LENGTH} characters")
+    shape = node.get("shape", "box")
+    if shape not in ALLOWED_SHAPES:
+        key = shape.strip().lower() if isinstance(shape, str) else ""
+        replacement = key if key in ALLOWED_SHAPES else SHAPE_ALIASES.get(key, "box")
+        fixed = {**fixed, "shape": replacement}
+        changes.append(f"{where}: replaced shape {shape!r} with '{replacement}'")
+    return fixed
+
+
+def repair_edge(edge: dict, changes: list[str], where: str = "edge") -> dict:
+    """Return `edge` with an over-long label shortened."""
+    label = edge.get("label")
+    if isinstance(label, str) and len(label) > EDGE_LABEL_MAX_LENGTH:
+        changes.append(f"{where}: shortened label to {EDGE_LABEL_MAX_LENGTH} characters")
+        return {**edge, "label": _truncate(label, EDGE_LABEL_MAX_LENGTH)}
+    return edge
+
+
+def _rename_duplicates(nodes: list, changes: list[str]) -> list:
+    """Give every repeated node ID after the first a fresh suffix; edges keep pointing at the first."""
+    taken = {node["id"] for node in nodes if isinstance(node, dict) and isinstance(node.get("id"), str)}
+    seen = set()
+    renamed = []
+    for position, node in enumerate(nodes):
+        node_id = node.get("id") if isinstance(node, dict) else None
+        if isinstance(node_id, str) and node_id in seen:
+            suffix = 2
+            while f"{node_id}_{suffix}" in taken:
+                suffix += 1
+            new_id = f"{node_id}_{suffix}"
+            taken.add(new_id)
+            changes.append(f"nodes[{position}]: renamed duplicate ID '{node_id}' to '{new_id}'")
+            node = {**node, "id": new_id}
+        elif isinstance(node_id, str):
+            seen.add(node_id)
+        renamed.append(node)
+    return renamed
+
+
+def _resolve_endpoints(nodes: list, edges: list, changes: list[str]) -> list:
+    """
+    Point dangling edge endpoints at the node they most likely meant (same ID
+    ignoring case, or a node whose label was used as the ID). Edges that still
+    dangle are kept, so validation reports them and the patch repair asks the
+    model which node was meant instead of silently losing the connection.
+    """
+    ids = {node["id"] for node in nodes}
+    by_folded_id = {}
+    by_label = {}
+    for node in nodes:
+        by_folded_id.setdefault(node["id"].strip().lower(), node["id"])
+        if isinstance(node.get("label"), str):
+            by_label.setdefault(node["label"].strip().lower(), node["id"])
+
+    resolved = []
+    for position, edge in enumerate(edges):
+        if not isinstance(edge, dict):
+            resolved.append(edge)
+            continue
+        for endpoint in ("source", "target"):
+            node_id = edge.get(endpoint)
+            if not isinstance(node_id, str) or node_id in ids:
+                continue
+            match = by_folded_id.get(node_id.strip().lower()) or by_label.get(node_id.strip().lower())
+            if match is not None:
+                changes.append(f"edges[{position}]: {endpoint} '{node_id}' resolved to node '{match}'")
+                edge = {**edge, endpoint: match}
+        resolved.append(edge)
+    return resolved
+
+
+def _repair_layout(layout, changes: list[str]):
+    if not isinstance(layout, dict):
+        changes.append("layout: replaced invalid layout with the default")
+        return {}
+    direction = layout.get("direction", "TB")
+    if direction in ALLOWED_DIRECTIONS:
+        return layout
+    key = direction.strip().upper() if isinstance(direction, str) else ""
+    replacement = key if key in ALLOWED_DIRECTIONS else DIRECTION_ALIASES.get(key, "TB")
+    changes.append(f"layout: replaced direction {direction!r} with '{replacement}'")
+    return {**layout, "direction": replacement}
+
+
+def repair_locally(data) -> tuple[object, list[str]]:
+    """
+    Fix mechanical validation problems in parsed graph data without calling the LLM.
+
+    Returns (data, changes). `data` is returned unchanged (the same object) when
+    there is nothing to fix or it is not shaped like a graph; otherwise a repaired
+    copy is returned. Problems that need the model, such as missing labels or too
+    many nodes, are left for validation to report.
+    """
+    if not can_patch(data):
+        return data, []
+
+    changes: list[str] = []
+    nodes = [
+        repair_node(node, changes, f"nodes[{i}]") if isinstance(node, dict) else node
+        for i, node in enumerate(data["nodes"])
+    ]
+    edges = [
+        repair_edge(edge, changes, f"edges[{i}]") if isinstance(edge, dict) else edge
+        for i, edge in enumerate(data.get("edges", []))
+    ]
+    nodes = _rename_duplicates(nodes, changes)
+    # Endpoints can only be judged once every node has a usable ID.
+    if all(isinstance(node, dict) and isinstance(node.get("id"), str) for node in nodes):
+        edges = _resolve_endpoints(nodes, edges, changes)
+    layout = _repair_layout(data["layout"], changes) if "layout" in data else None
+
+    if not changes:
+        return data, []
+    repaired = {**data, "nodes": nodes, "edges": edges}
+    if layout is not None:
+        repaired["layout"] = layout
+    return repaired, changes
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chunked_generation import generate_graph_chunked, should_chunk
+from graph_cache import GraphCache
+from llm_client import GenerationStats, GraphGenerationError, generate_graph_from_text
+from config import DEFAULT_MODEL, DEFAULT_TEMPERATURE, EXPORT_DPI, EXPORT_SCALE, MAX_RETRIES
+from scripts.export_cli import render_graph_to_svg
+from tracing import JsonlFileExporter, set_exporter
+from utils.export import SvgDocument
+
+MANIFEST_NAME = "manifest.jsonl"
+EXPORT_FORMATS = ("svg", "png", "pdf")
+TEXT_EXTENSIONS = (".txt", ".md")
+
+
+def load_items(input_path: str) -> list[tuple[str, str]]:
+    """Return (item_id, text) pairs from a directory of text files or a JSONL file."""
+    if os.path.isdir(input_path):
+        names = [name for name in sorted(os.listdir(input_path)) if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS]
+        stems = Counter(os.path.splitext(name)[0] for name in names)
+        items = []
+        for name in names:
+            stem = os.path.splitext(name)[0]
+            with open(os.path.join(input_path, name), "r", encoding="utf-8") as f:
+                # a.txt and a.md would share outputs under the stem, so keep the extension for them
+                items.append((stem if stems[stem] == 1 else name, f.read()))
+        return items
+
+    items = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            items.append((str(record.get("id", line_number)), record["text"]))
+    return items
+
+
+def find_duplicate_ids(items: list[tuple[str, str]]) -> list[str]:
+    """Return IDs whose output files would collide with another item's."""
+    counts = Counter(safe_filename(item_id) for item_id, _ in items)
+    return sorted({item_id for item_id, _ in items if counts[safe_filename(item_id)] > 1})
+
+
+def load_completed_ids(manifest_path: str) -> set[str]:
+    """Return the IDs of items that already succeeded in a previous run."""
+    completed = set()
+    if not os.path.exists(manifest_path):
+        return completed
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if entry.get("status") == "ok":
+                completed.add(entry["id"])
+    return completed
+
+
+def safe_filename(item_id: str) -> str:
+    return re.sub(r"[^\w.-]", "_", item_id)
+
+
+def write_exports(graph, output_dir: str, item_id: str, formats: list[str],
+                  dpi: float = EXPORT_DPI, scale: float = EXPORT_SCALE) -> list[str]:
+    base_path = os.path.join(output_dir, safe_filename(item_id))
+    with open(f"{base_path}.json", "w", encoding="utf-8") as f:
+        json.dump(graph.model_dump(), f, indent=2)
+    outputs = [f"{base_path}.json"]
+
+    svg_content = render_graph_to_svg(graph)
+    document = None  # parsed on the first raster format, then shared by the others
+    for export_format in formats:
+        path = f"{base_path}.{export_format}"
+        if export_format == "svg":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(svg_content)
+        else:
+            document = document or SvgDocument(svg_content, dpi, scale)
+            with open(path, "wb") as f:
+                document.write(export_format, f)
+        outputs.append(path)
+    return outputs
+
+
+def process_item(item_id: str, text: str, args, cache: GraphCache | None) -> dict:
+    stats = GenerationStats()
+    start_time = time.time()
+    entry = {"id": item_id}
+    generate = generate_graph_chunked if should_chunk(text) else generate_graph_from_text
+    try:
+        graph = generate(
+            api_key=args.api_key,
+            text=text,
+            model=args.model,
+            temperature=args.temperature,
+            max_retries=args.max_retries,
+            cache=cache,
+            stats=stats,
+            base_url=args.base_url,
+        )
+        entry["outputs"] = write_exports(graph, args.output_dir, item_id, args.formats, args.dpi, args.scale)
+        entry["status"] = "ok"
+    except (GraphGenerationError, OSError, ValueError) as e:
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    except Exception as e:  # an unexpected failure is recorded for this item instead of aborting the batch
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+
+    entry.update({
+        "latency_s": round(time.time() - start_time, 3),
+        "total_tokens": stats.total_tokens,
+        "attempts": stats.attempts,
+        "retries": stats.retries,
+        "cache_hit": stats.cache_hit,
+        "coalesced": stats.coalesced,
+        "retries_avoided": stats.retries_avoided,
+    })
+    return entry
+
+
+def parse_formats(value: str) -> list[str]:
+    formats = [part.strip().lower() for part in value.split(",") if part.strip()]
+    unsupported = [part for part in formats if part not in EXPORT_FORMATS]
+    if unsupported:
+        raise argparse.ArgumentTypeError(f"Unsupported format(s): {', '.join(unsupported)}")
+    return formats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate flowcharts in bulk from process descriptions.")
+    parser.add_argument("input", help="A directory of .txt/.md files, or a JSONL file with 'id' and 'text' fields.")
+    parser.add_argument("output_dir", help="Directory for the generated graphs, exports and manifest.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of descriptions generated concurrently.")
+    parser.add_argument("--formats", type=parse_formats, default=["svg"], help="Comma-separated export formats: svg,png,pdf.")
+    parser.add_argument("--dpi", type=float, default=EXPORT_DPI, help="Resolution of PNG exports.")
+    parser.add_argument("--scale", type=float, default=EXPORT_SCALE, help="Scale factor for PNG and PDF exports.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY"), help="Defaults to $OPENAI_API_KEY.")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint, e.g. a local fake server.")
+    parser.add_argument("--cache-dir", default=None, help="Reuse graphs from this response cache directory.")
+    parser.add_argument("--no-resume", action="store_true", help="Regenerate items that already succeeded.")
+    parser.add_argument("--trace-file", default=None, help="Append per-stage timing spans to this JSONL file.")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        print("Error: No API key. Set OPENAI_API_KEY or pass --api-key.")
+        return 1
+    if not os.path.exists(args.input):
+        print(f"Error: Input not found at {args.input}")
+        return 1
+
+    all_items = load_items(args.input)
+    duplicates = find_duplicate_ids(all_items)
+    if duplicates:
+        print(f"Error: These item IDs would overwrite each other's outputs: {', '.join(duplicates)}")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    completed = set() if args.no_resume else load_completed_ids(manifest_path)
+    items = [(item_id, text) for item_id, text in all_items if item_id not in completed]
+    if completed:
+        print(f"Resuming: skipping {len(completed)} item(s) already in {manifest_path}")
+
+    cache = GraphCache(args.cache_dir) if args.cache_dir else None
+    if args.trace_file:
+        set_exporter(JsonlFileExporter(args.trace_file))
+    failures = 0
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_item, item_id, text, args, cache): item_id for item_id, text in items}
+        for future in as_completed(futures):
+            entry = future.result()
+            failures += entry["status"] != "ok"
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()  # each finished item survives an interruption
+            print(f"[{entry['status']}] {entry['id']} in {entry['latency_s']:.2f}s "
+                  f"({entry['total_tokens']} tokens, {entry['retries']} retries)")
+
+    print(f"Processed {len(items)} item(s), {failures} failed. Manifest: {manifest_path}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,52 +2,62 @@ import argparse
 import html
 import json
 import os
+from config import EXPORT_DPI, EXPORT_SCALE
 from graph_schema import Graph
 from utils.export import svg_to_pdf, svg_to_png
+from utils.layered_layout import NodeBox, layered_layout
 
-# A simple SVG template for CLI export
-SVG_TEMPLATE = '''<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
+CSS_PIXELS_PER_INCH = 96
+
+# A simple SVG template for CLI export. Layout coordinates are CSS pixels; the size is
+# written in inches (96 px each) so CairoSVG scales PNG output with --dpi.
+SVG_TEMPLATE = '''<svg width="{width_in:.4f}in" height="{height_in:.4f}in" viewBox="0 0 {width:.0f} {height:.0f}" xmlns="http://www.w3.org/2000/svg">
     <style>
         .node {{ fill: #97C2FC; stroke: #2B7CE9; stroke-width: 2px; }}
-        .label {{ font-family: sans-serif; font-size: 14px; text-anchor: middle; }}
+        .edge {{ fill: none; stroke: #848484; stroke-width: 2px; }}
+        .label {{ font-family: sans-serif; font-size: 14px; text-anchor: middle; dominant-baseline: central; }}
+        .edge-label {{ font-family: sans-serif; font-size: 12px; text-anchor: middle; fill: #444; }}
     </style>
     {elements}
 </svg>'''
 
+def _node_element(box: NodeBox) -> str:
+    if box.shape == "ellipse" or box.shape == "circle":
+        return f'<ellipse cx="{box.x:.1f}" cy="{box.y:.1f}" rx="{box.width / 2:.1f}" ry="{box.height / 2:.1f}" class="node" />'
+    if box.shape == "diamond":
+        points = (f"{box.x:.1f},{box.y - box.height / 2:.1f} {box.x + box.width / 2:.1f},{box.y:.1f} "
+                  f"{box.x:.1f},{box.y + box.height / 2:.1f} {box.x - box.width / 2:.1f},{box.y:.1f}")
+        return f'<polygon points="{points}" class="node" />'
+    return (f'<rect x="{box.x - box.width / 2:.1f}" y="{box.y - box.height / 2:.1f}" '
+            f'width="{box.width:.1f}" height="{box.height:.1f}" rx="5" class="node" />')
+
 def render_graph_to_svg(graph: Graph) -> str:
-    """A very basic SVG renderer for the CLI tool."""
-    elements = []
-    width, height = 800, 600 # default size
-    positions = {}
-    
-    # Simple grid layout
-    x, y, col_count = 50, 50, 4
-    for i, node in enumerate(graph.nodes):
-        positions[node.id] = (x, y)
-        label = html.escape(node.label)
-        elements.append(f'<rect x="{x-40}" y="{y-20}" width="80" height="40" rx="5" class="node" />')
-        elements.append(f'<text x="{x}" y="{y+5}" class="label">{label}</text>')
-        x += 150
-        if (i + 1) % col_count == 0:
-            x = 50
-            y += 100
+    """Render a graph to SVG with the built-in layered layout (no Graphviz needed)."""
+    layout = layered_layout(graph)
+    # Define arrowhead marker
+    elements = ['<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" markerHeight="6" orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="#848484" /></marker></defs>']
 
-    for edge in graph.edges:
-        start_pos = positions.get(edge.source)
-        end_pos = positions.get(edge.target)
-        if start_pos and end_pos:
-            elements.append(f'<line x1="{start_pos[0]}" y1="{start_pos[1]}" x2="{end_pos[0]}" y2="{end_pos[1]}" stroke="#848484" stroke-width="2" marker-end="url(#arrow)" />')
+    for edge, route in zip(graph.edges, layout.edges):
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in route)
+        elements.append(f'<polyline points="{points}" class="edge" marker-end="url(#arrow)" />')
+        if edge.label:
+            (x1, y1), (x2, y2) = route[(len(route) - 1) // 2], route[(len(route) - 1) // 2 + 1]
+            elements.append(f'<text x="{(x1 + x2) / 2:.1f}" y="{(y1 + y2) / 2 - 4:.1f}" class="edge-label">{html.escape(edge.label)}</text>')
 
-    # Define arrowhead marker
-    marker = '<defs><marker id="arrow" viewBox="0 0 10 10" refX="5" refY="5" markerWidth="6" markerHeight="6" orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" /></marker></defs>'
-    elements.insert(0, marker)
+    for node in graph.nodes:
+        box = layout.nodes[node.id]
+        elements.append(_node_element(box))
+        elements.append(f'<text x="{box.x:.1f}" y="{box.y:.1f}" class="label">{html.escape(node.label)}</text>')
 
-    return SVG_TEMPLATE.format(width=width, height=y+50, elements="\n".join(elements))
+    return SVG_TEMPLATE.format(width=layout.width, height=layout.height, width_in=layout.width / CSS_PIXELS_PER_INCH,
+                               height_in=layout.height / CSS_PIXELS_PER_INCH, elements="\n    ".join(elements))
 
 def main():
     parser = argparse.ArgumentParser(description="Convert GRAPH JSON to an image or PDF.")
     parser.add_argument("input_file", help="Path to the input GRAPH JSON file.")
     parser.add_argument("output_file", help="Path to the output file (e.g., output.svg, output.pdf, output.png).")
+    parser.add_argument("--dpi", type=float, default=EXPORT_DPI, help="Resolution of PNG output.")
+    parser.add_argument("--scale", type=float, default=EXPORT_SCALE, help="Scale factor for PNG and PDF output.")
     args = parser.parse_args()
 
     if not os.path.exists(args.input_file):
@@ -61,7 +71,7 @@ def main():
     with open(args.input_file, 'r') as f:
         try:
             data = json.load(f)
-            graph = Graph.model_validate(data)
+            graph = Graph.validate_large(data)  # the layered layout handles thousands of nodes
         except (json.JSONDecodeError, Exception) as e:
             print(f"Error: Invalid GRAPH JSON file. {e}")
             return
@@ -74,12 +84,12 @@ def main():
             f.write(svg_content)
         print(f"Successfully exported to {args.output_file}")
     elif output_ext == ".pdf":
-        pdf_bytes = svg_to_pdf(svg_content)
+        pdf_bytes = svg_to_pdf(svg_content, args.dpi, args.scale)
         with open(args.output_file, "wb") as f:
             f.write(pdf_bytes)
         print(f"Successfully exported to {args.output_file}")
     elif output_ext == ".png":
-        png_bytes = svg_to_png(svg_content)
+        png_bytes = svg_to_png(svg_content, args.dpi, args.scale)
         with open(args.output_file, "wb") as f:
             f.write(png_bytes)
         print(f"Successfully exported to {args.output_file}")
@@ -0,0 +1,74 @@
+"""
+Single-flight deduplication of concurrent identical calls.
+
+While a call for a key is running, further calls for the same key wait for it
+and receive its result (or its exception) instead of doing the work again.
+"""
+import threading
+from collections.abc import Callable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe; one instance is normally shared by the whole process."""
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], object], on_wait: Callable[[], None] | None = None,
+           poll_interval: float = 0.1) -> tuple[object, bool]:
+        """
+        Run `func` unless a call for `key` is already in flight, in which case wait for that one.
+
+        Returns (result, shared), where `shared` is True if the result came from
+        another caller's call. The in-flight call's exception is raised in every
+        waiting caller. `on_wait` is called once before waiting and then every
+        `poll_interval` seconds while waiting; it may raise to stop waiting.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            while True:
+                if on_wait is not None:
+                    on_wait()
+                if call.done.wait(poll_interval if on_wait is not None else None):
+                    break
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
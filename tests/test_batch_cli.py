@@ -0,0 +1,157 @@
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from unittest.mock import patch
+
+from llm_client import close_clients
+from scripts import batch_cli
+from scripts.batch_cli import main
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with a one-node graph labelled after the request."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][0]["content"]
+        FakeOpenAIHandler.requests.append(prompt)
+        label = "Broken" if "broken" in prompt else "Step"
+        content = "not json" if label == "Broken" else json.dumps({"nodes": [{"id": "A", "label": label}], "edges": []})
+        body = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 7, "total_tokens": 12},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai_url():
+    FakeOpenAIHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    close_clients()
+    server.shutdown()
+
+
+def read_manifest(output_dir):
+    with open(output_dir / "manifest.jsonl") as f:
+        return {entry["id"]: entry for entry in map(json.loads, f)}
+
+
+def run_batch(input_path, output_dir, base_url, *extra):
+    return main([str(input_path), str(output_dir), "--base-url", base_url, "--api-key", "test", "--workers", "2", *extra])
+
+
+def test_batch_generates_exports_and_manifest(tmp_path, fake_openai_url):
+    input_path = tmp_path / "items.jsonl"
+    input_path.write_text("\n".join(json.dumps({"id": f"item-{i}", "text": f"process {i}"}) for i in range(3)))
+    output_dir = tmp_path / "out"
+
+    exit_code = run_batch(input_path, output_dir, fake_openai_url)
+
+    manifest = read_manifest(output_dir)
+    assert exit_code == 0
+    assert set(manifest) == {"item-0", "item-1", "item-2"}
+    assert manifest["item-0"]["total_tokens"] == 12
+    assert manifest["item-0"]["retries"] == 0
+    assert (output_dir / "item-1.svg").read_text().startswith("<svg")
+    assert json.loads((output_dir / "item-2.json").read_text())["nodes"][0]["label"] == "Step"
+
+
+def test_batch_reads_text_files_from_directory(tmp_path, fake_openai_url):
+    input_dir = tmp_path / "docs"
+    input_dir.mkdir()
+    (input_dir / "onboarding.txt").write_text("process one")
+    (input_dir / "notes.csv").write_text("ignored")
+    output_dir = tmp_path / "out"
+
+    run_batch(input_dir, output_dir, fake_openai_url)
+
+    assert set(read_manifest(output_dir)) == {"onboarding"}
+
+
+def test_batch_keeps_extensions_for_files_sharing_a_stem(tmp_path, fake_openai_url):
+    input_dir = tmp_path / "docs"
+    input_dir.mkdir()
+    (input_dir / "a.txt").write_text("process one")
+    (input_dir / "a.md").write_text("process two")
+    output_dir = tmp_path / "out"
+
+    run_batch(input_dir, output_dir, fake_openai_url)
+
+    assert set(read_manifest(output_dir)) == {"a.txt", "a.md"}
+    assert (output_dir / "a.txt.svg").exists() and (output_dir / "a.md.svg").exists()
+
+
+def test_batch_rejects_ids_whose_outputs_would_collide(tmp_path, fake_openai_url, capsys):
+    input_path = tmp_path / "items.jsonl"
+    input_path.write_text(json.dumps({"id": "a b", "text": "one"}) + "\n" + json.dumps({"id": "a_b", "text": "two"}))
+    output_dir = tmp_path / "out"
+
+    assert run_batch(input_path, output_dir, fake_openai_url) == 1
+    assert "a b, a_b" in capsys.readouterr().out
+    assert not output_dir.exists()
+
+
+def test_batch_records_unexpected_errors_and_continues(tmp_path, fake_openai_url):
+    input_path = tmp_path / "items.jsonl"
+    input_path.write_text(json.dumps({"id": "good", "text": "fine"}) + "\n" + json.dumps({"id": "crash", "text": "crash"}))
+    output_dir = tmp_path / "out"
+    real_write_exports = batch_cli.write_exports
+
+    def write_exports(graph, output_dir, item_id, *args):
+        if item_id == "crash":
+            raise RuntimeError("renderer exploded")
+        return real_write_exports(graph, output_dir, item_id, *args)
+
+    with patch.object(batch_cli, "write_exports", write_exports):
+        assert run_batch(input_path, output_dir, fake_openai_url) == 1
+
+    manifest = read_manifest(output_dir)
+    assert manifest["good"]["status"] == "ok"
+    assert manifest["crash"] == {**manifest["crash"], "status": "error", "error": "RuntimeError: renderer exploded"}
+
+
+def test_batch_resumes_and_retries_only_failed_items(tmp_path, fake_openai_url):
+    input_path = tmp_path / "items.jsonl"
+    input_path.write_text(json.dumps({"id": "good", "text": "fine"}) + "\n" + json.dumps({"id": "bad", "text": "broken"}))
+    output_dir = tmp_path / "out"
+
+    assert run_batch(input_path, output_dir, fake_openai_url, "--max-retries", "1") == 1
+    assert read_manifest(output_dir)["bad"]["retries"] == 1
+    requests_after_first_run = len(FakeOpenAIHandler.requests)
+
+    run_batch(input_path, output_dir, fake_openai_url, "--max-retries", "0")
+
+    assert len(FakeOpenAIHandler.requests) == requests_after_first_run + 1
+    assert all("fine" not in prompt for prompt in FakeOpenAIHandler.requests[requests_after_first_run:])
+
+
+def test_batch_dpi_scales_png_exports(tmp_path, fake_openai_url):
+    input_path = tmp_path / "input.jsonl"
+    input_path.write_text(json.dumps({"id": "one", "text": "a process"}) + "\n")
+    sizes = {}
+    for dpi in (96, 192):
+        output_dir = tmp_path / f"out_{dpi}"
+        run_batch(input_path, output_dir, fake_openai_url, "--formats", "png", "--dpi", str(dpi))
+        sizes[dpi] = struct.unpack(">II", (output_dir / "one.png").read_bytes()[16:24])
+
+    assert abs(sizes[192][0] - 2 * sizes[96][0]) <= 1
+    assert abs(sizes[192][1] - 2 * sizes[96][1]) <= 1
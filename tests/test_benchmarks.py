@@ -0,0 +1,40 @@
+import pytest
+from unittest.mock import patch
+
+from benchmarks.stub_openai import StubOpenAI
+from benchmarks.suite import SkipCase, compare_to_baseline, run_suite
+from benchmarks.synthetic import GENERATORS
+from graph_schema import Graph
+from llm_client import GenerationStats, generate_graph_from_text
+
+
+@pytest.mark.parametrize("name", sorted(GENERATORS))
+def test_synthetic_graphs_are_valid(name):
+    graph = Graph.validate_large(GENERATORS[name](250))
+    assert len(graph.nodes) == 250
+
+
+def test_stub_client_replays_recorded_responses_through_repair():
+    client = StubOpenAI(["invalid_json", "valid"])
+    stats = GenerationStats()
+    with patch("llm_client.get_client", return_value=client):
+        graph = generate_graph_from_text("stub", "text", max_retries=1, stats=stats)
+    assert client.calls == 2
+    assert stats.attempts == 2
+    assert graph.nodes[0].id == "visit"
+
+
+def test_compare_to_baseline_flags_only_regressions_over_threshold():
+    baseline = {"fast": 1.0, "slow": 1.0, "new": 0.0}
+    results = {"fast": 1.1, "slow": 1.5, "new": 2.0, "unknown": 9.0}
+    regressions = compare_to_baseline(results, baseline, threshold=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("slow:")
+
+
+def test_run_suite_reports_skipped_cases():
+    def missing():
+        raise SkipCase("no binary")
+
+    results, skipped = run_suite({"ok": lambda: None, "missing": missing}, repeats=2)
+    assert set(results) == {"ok"}
+    assert skipped == {"missing": "no binary"}
@@ -0,0 +1,117 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from chunked_generation import generate_graph_chunked, merge_graphs, should_chunk, split_sections
+from graph_schema import Graph
+from llm_client import GenerationStats, GraphGenerationError
+
+
+def chain(*labels):
+    """A subgraph whose nodes are A, B, C... in a line with the given labels."""
+    ids = [chr(ord("A") + i) for i in range(len(labels))]
+    return Graph.model_validate({
+        "nodes": [{"id": node_id, "label": label} for node_id, label in zip(ids, labels)],
+        "edges": [{"source": a, "target": b} for a, b in zip(ids, ids[1:])],
+    })
+
+
+def test_split_sections_packs_paragraphs_under_limit():
+    paragraphs = [f"Step {i}. " + "x" * 80 for i in range(10)]
+    sections = split_sections("\n\n".join(paragraphs), max_chars=300)
+    assert len(sections) == 4
+    assert all(len(section) <= 300 for section in sections)
+    assert "\n\n".join(sections) == "\n\n".join(paragraphs)  # nothing lost or reordered
+
+
+def test_split_sections_breaks_oversized_paragraphs():
+    text = " ".join(f"Sentence number {i} is here." for i in range(100))
+    sections = split_sections(text, max_chars=200)
+    assert len(sections) > 1
+    assert all(len(section) <= 200 for section in sections)
+
+
+def test_should_chunk_uses_threshold():
+    assert not should_chunk("short", min_chars=10)
+    assert should_chunk("x" * 11, min_chars=10)
+
+
+def test_merge_namespaces_ids_and_links_sections():
+    merged = merge_graphs([chain("Start", "Check input"), chain("Save record", "Done")])
+    assert [node.id for node in merged.nodes] == ["s1_A", "s1_B", "s2_A", "s2_B"]
+    assert {(edge.source, edge.target) for edge in merged.edges} == {
+        ("s1_A", "s1_B"), ("s2_A", "s2_B"), ("s1_B", "s2_A"),
+    }
+
+
+def test_merge_resolves_repeated_steps_across_sections():
+    """A middle step that repeats an earlier section's step becomes a reference to it."""
+    first = chain("Open app", "Login page", "Enter password")
+    second = chain("Password rejected", "login page!", "Give up")
+    merged = merge_graphs([first, second])
+    ids = [node.id for node in merged.nodes]
+    assert "s2_B" not in ids
+    assert ("s2_A", "s1_B") in {(edge.source, edge.target) for edge in merged.edges}
+
+
+def test_merge_keeps_same_label_steps_within_one_section_apart():
+    branching = Graph.model_validate({
+        "nodes": [{"id": "A", "label": "Check order"}, {"id": "B", "label": "In stock?"}, {"id": "C", "label": "Notify user"},
+                  {"id": "D", "label": "Notify user"}, {"id": "E", "label": "Done"}],
+        "edges": [{"source": "A", "target": "B"}, {"source": "B", "target": "C", "label": "yes"},
+                  {"source": "B", "target": "D", "label": "no"}, {"source": "C", "target": "E"},
+                  {"source": "D", "target": "E"}],
+    })
+    merged = merge_graphs([branching, chain("Restock", "Notify user", "Close")])
+    ids = [node.id for node in merged.nodes]
+    assert {"s1_C", "s1_D"} <= set(ids)
+    assert "s2_B" not in ids  # a later section still resolves to the first match
+    edges = {(edge.source, edge.target) for edge in merged.edges}
+    assert {("s1_B", "s1_C"), ("s1_B", "s1_D"), ("s1_D", "s1_E"), ("s2_A", "s1_C")} <= edges
+
+
+def test_merged_graph_may_exceed_default_node_cap():
+    graphs = [chain(*(f"Section {s} step {i}" for i in range(30))) for s in range(5)]
+    assert len(merge_graphs(graphs).nodes) == 150
+
+
+def test_chunked_generation_runs_sections_in_parallel():
+    text = "\n\n".join(f"Part {i}: " + "do the thing. " * 20 for i in range(6))
+
+    def fake_generate(api_key, section_text, stats=None, **kwargs):
+        time.sleep(0.2)
+        stats.attempts += 1
+        stats.total_tokens += 10
+        part = section_text.split("Part ")[1].split(":")[0]
+        return chain(f"Begin part {part}", f"End part {part}")
+
+    stats = GenerationStats()
+    with patch("chunked_generation.generate_graph_from_text", side_effect=fake_generate) as generate:
+        start = time.perf_counter()
+        graph = generate_graph_chunked("key", text, stats=stats, max_chars=300)
+        elapsed = time.perf_counter() - start
+
+    assert generate.call_count == 6
+    assert elapsed < 0.2 * 6 / 2  # sections overlap instead of running one after another
+    assert len(graph.nodes) == 12
+    assert stats.attempts == 6 and stats.total_tokens == 60
+
+
+def test_chunked_generation_reports_failed_section():
+    text = "\n\n".join("Part: " + "words " * 60 for _ in range(3))
+
+    def fake_generate(api_key, section_text, **kwargs):
+        if "part 2 of 3" in section_text:
+            raise GraphGenerationError("bad json")
+        return chain("A step", "Another step")
+
+    with patch("chunked_generation.generate_graph_from_text", side_effect=fake_generate):
+        with pytest.raises(GraphGenerationError, match="Section 2 of 3 failed: bad json"):
+            generate_graph_chunked("key", text, max_chars=400)
+
+
+def test_short_text_is_generated_directly():
+    with patch("chunked_generation.generate_graph_from_text", return_value=chain("Only")) as generate:
+        generate_graph_chunked("key", "A short description.")
+    assert generate.call_args.args[1] == "A short description."
@@ -0,0 +1,54 @@
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from utils import export
+from utils.export import SvgDocument, svg_to_png
+
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" width="120" height="80"><rect x="10" y="10" width="50" height="30" fill="#97C2FC"/></svg>'
+
+
+def png_size(data: bytes) -> tuple[int, int]:
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    return struct.unpack(">II", data[16:24])
+
+
+def test_svg_document_parses_once_for_every_format():
+    with patch("utils.export.Tree", wraps=export.Tree) as tree:
+        document = SvgDocument(SVG)
+        outputs = [document.render(output_format) for output_format in ("png", "pdf", "png")]
+
+    tree.assert_called_once()
+    assert png_size(outputs[0]) == png_size(outputs[2]) == (120, 80)
+    assert outputs[1].startswith(b"%PDF")
+
+
+def test_svg_document_applies_scale_and_dpi():
+    document = SvgDocument(SVG)
+
+    assert png_size(document.render("png", scale=2)) == (240, 160)
+    assert png_size(svg_to_png(SVG.replace('width="120" height="80"', 'width="1in" height="1in"'), dpi=150)) == (150, 150)
+
+
+def test_svg_document_writes_to_a_file_object(tmp_path):
+    path = tmp_path / "out.pdf"
+    with open(path, "wb") as f:
+        SvgDocument(SVG).write("pdf", f)
+
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+def test_svg_document_reparses_documents_that_cairosvg_mutates():
+    masked = SVG.replace("<rect", '<defs><mask id="m"><rect width="10" height="10" fill="white"/></mask></defs><rect mask="url(#m)"')
+    document = SvgDocument(masked)
+    with patch("utils.export.Tree", wraps=export.Tree) as tree:
+        document.render("png")
+        document.render("png")
+
+    assert tree.call_count == 2
+
+
+def test_svg_document_rejects_unknown_format():
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        SvgDocument(SVG).render("gif")
@@ -1,5 +1,12 @@
+import json
+import struct
+import sys
+
+from benchmarks.synthetic import branching_graph
 from graph_schema import Graph
-from scripts.export_cli import render_graph_to_svg
+from scripts import export_cli
+from scripts.export_cli import main, render_graph_to_svg
+from utils.layered_layout import layered_layout
 
 
 def test_render_graph_to_svg_escapes_node_labels():
@@ -12,3 +19,54 @@ def test_render_graph_to_svg_escapes_node_labels():
 
     assert "Start &lt;now&gt; &amp; &quot;go&quot;" in svg
     assert "Start <now>" not in svg
+
+
+def test_render_graph_to_svg_uses_layered_layout_and_shapes():
+    graph = Graph.model_validate({
+        "nodes": [
+            {"id": "A", "label": "Start", "shape": "ellipse"},
+            {"id": "B", "label": "OK?", "shape": "diamond"},
+            {"id": "C", "label": "Done"},
+        ],
+        "edges": [{"source": "A", "target": "B"}, {"source": "B", "target": "C", "label": "yes"}],
+        "layout": {"direction": "LR"},
+    })
+
+    svg = render_graph_to_svg(graph)
+
+    assert svg.count("<polyline") == 2
+    assert "<ellipse" in svg and "<polygon" in svg and "<rect" in svg
+    assert ">yes</text>" in svg
+
+
+def test_dpi_scales_png_output_of_the_cli(tmp_path, monkeypatch):
+    graph_path = tmp_path / "graph.json"
+    graph_path.write_text(json.dumps({
+        "nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "End"}],
+        "edges": [{"source": "A", "target": "B"}],
+    }))
+    sizes = {}
+    for dpi in (96, 192):
+        output = tmp_path / f"graph_{dpi}.png"
+        monkeypatch.setattr(sys, "argv", ["export_cli", str(graph_path), str(output), "--dpi", str(dpi)])
+        main()
+        sizes[dpi] = struct.unpack(">II", output.read_bytes()[16:24])
+
+    assert abs(sizes[192][0] - 2 * sizes[96][0]) <= 1
+    assert abs(sizes[192][1] - 2 * sizes[96][1]) <= 1
+
+
+def test_cli_exports_graphs_beyond_the_default_node_cap(tmp_path, monkeypatch):
+    data = branching_graph(1000)
+    graph_path, output = tmp_path / "graph.json", tmp_path / "graph.svg"
+    graph_path.write_text(json.dumps(data))
+    layouts = []
+    monkeypatch.setattr(export_cli, "layered_layout", lambda graph: layouts.append(graph) or layered_layout(graph))
+    monkeypatch.setattr(sys, "argv", ["export_cli", str(graph_path), str(output)])
+
+    main()
+
+    assert len(layouts) == 1 and len(layouts[0].nodes) == 1000
+    svg = output.read_text()
+    assert svg.count("<polyline") == len(data["edges"])
+    assert svg.count('class="label"') == 1000
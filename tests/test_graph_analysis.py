@@ -0,0 +1,82 @@
+import pytest
+
+from graph_analysis import CSRAdjacency, analyze_graph, build_adjacency, find_cycles, longest_path, unreachable_nodes
+from graph_schema import Graph, ValidatedGraph
+
+
+def make_graph(node_ids, edges, shapes=None):
+    shapes = shapes or {}
+    return Graph.model_validate({
+        "nodes": [{"id": node_id, "label": node_id, "shape": shapes.get(node_id, "box")} for node_id in node_ids],
+        "edges": [{"source": source, "target": target} for source, target in edges],
+    })
+
+
+def test_csr_adjacency_packs_successors():
+    """Successors come back per node from the flat offset/target arrays."""
+    adjacency = build_adjacency(make_graph("ABC", [("A", "B"), ("A", "C"), ("B", "C")]))
+    assert isinstance(adjacency, CSRAdjacency)
+    assert list(adjacency.offsets) == [0, 2, 3, 3]
+    assert list(adjacency.successors(0)) == [1, 2]
+    assert adjacency.out_degree(2) == 0
+
+
+def test_clean_graph_has_no_issues():
+    graph = make_graph("ABCD", [("A", "B"), ("B", "C"), ("B", "D"), ("C", "D")], shapes={"B": "diamond"})
+    report = analyze_graph(graph)
+    assert report.issues() == []
+    assert report.longest_path == ["A", "B", "C", "D"]
+
+
+def test_unreachable_nodes_and_cycles():
+    """A cycle with no entry from the start node is both unreachable and reported as a cycle."""
+    adjacency = build_adjacency(make_graph("ABCD", [("A", "B"), ("C", "D"), ("D", "C")]))
+    assert unreachable_nodes(adjacency) == [2, 3]
+    assert sorted(map(sorted, find_cycles(adjacency))) == [[2, 3]]
+
+
+def test_self_loop_is_a_cycle():
+    adjacency = build_adjacency(make_graph("AB", [("A", "B"), ("B", "B")]))
+    assert find_cycles(adjacency) == [[1]]
+
+
+def test_longest_path_ignores_edges_inside_cycles():
+    adjacency = build_adjacency(make_graph("ABCD", [("A", "B"), ("B", "C"), ("C", "B"), ("C", "D")]))
+    path = longest_path(adjacency)
+    assert path[0] == 0 and path[-1] == 3
+
+
+def test_weak_decision_nodes_reported():
+    graph = make_graph("ABC", [("A", "B"), ("B", "C")], shapes={"B": "diamond"})
+    report = analyze_graph(graph)
+    assert report.weak_decisions == ["B"]
+    assert any("Decision node" in issue for issue in report.issues())
+
+
+def test_validated_graph_matches_graph():
+    graph = make_graph("ABC", [("A", "B"), ("B", "A"), ("B", "C")])
+    assert analyze_graph(ValidatedGraph.from_graph(graph)) == analyze_graph(graph)
+
+
+@pytest.mark.parametrize("size", [5000])
+def test_long_chain_does_not_recurse(size):
+    """The SCC walk is iterative, so deep graphs do not hit the recursion limit."""
+    ids = [f"n{i}" for i in range(size)]
+    graph = Graph.validate_large({
+        "nodes": [{"id": node_id, "label": node_id} for node_id in ids],
+        "edges": [{"source": ids[i], "target": ids[i + 1]} for i in range(size - 1)] + [{"source": ids[-1], "target": ids[0]}],
+    })
+    report = analyze_graph(graph)
+    assert len(report.cycles) == 1 and len(report.cycles[0]) == size
+
+
+def test_longest_path_follows_real_edges_through_cycles():
+    graph = make_graph("ABCDE", [("A", "B"), ("B", "C"), ("C", "D"), ("D", "B"), ("D", "E")])
+    adjacency = build_adjacency(graph)
+
+    path = longest_path(adjacency)
+
+    edges = {(edge.source, edge.target) for edge in graph.edges}
+    ids = [adjacency.node_ids[node] for node in path]
+    assert ids == ["A", "B", "C", "D", "E"]
+    assert all(pair in edges for pair in zip(ids, ids[1:])), ids
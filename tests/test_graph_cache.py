@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+from graph_cache import GraphCache, cache_key
+from graph_schema import Graph
+
+
+@pytest.fixture
+def graph():
+    return Graph.model_validate({
+        "nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "End"}],
+        "edges": [{"source": "A", "target": "B"}],
+    })
+
+
+def test_cache_key_ignores_insignificant_whitespace():
+    assert cache_key("Step one.\n\n  Step   two. ", "gpt-4", 0.2) == cache_key("Step one.\nStep two.", "gpt-4", 0.2)
+
+
+def test_cache_key_depends_on_model_and_temperature():
+    base = cache_key("Process", "gpt-4", 0.2)
+    assert base != cache_key("Process", "gpt-4-turbo", 0.2)
+    assert base != cache_key("Process", "gpt-4", 0.3)
+
+
+def test_get_returns_stored_graph_and_counts_hits(tmp_path, graph):
+    cache = GraphCache(str(tmp_path))
+    key = cache_key("Process", "gpt-4", 0.2)
+
+    assert cache.get(key) is None
+    cache.put(key, graph)
+    cached = cache.get(key)
+
+    assert cached == graph
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_misses(tmp_path, graph):
+    cache = GraphCache(str(tmp_path), ttl_seconds=60)
+    cache.put("key", graph)
+
+    cache.ttl_seconds = -1
+    assert cache.get("key") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, graph):
+    cache = GraphCache(str(tmp_path), max_entries=2)
+    cache.put("first", graph)
+    cache.put("second", graph)
+    old = time.time() - 100
+    os.utime(os.path.join(str(tmp_path), "first.json"), (old, old))
+    os.utime(os.path.join(str(tmp_path), "second.json"), (old + 1, old + 1))
+    cache.get("first")  # refresh "first" so "second" becomes the LRU entry
+
+    cache.put("third", graph)
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_corrupt_entries_are_discarded(tmp_path):
+    cache = GraphCache(str(tmp_path))
+    with open(os.path.join(str(tmp_path), "bad.json"), "w") as f:
+        f.write("not json")
+
+    assert cache.get("bad") is None
+    assert not os.path.exists(os.path.join(str(tmp_path), "bad.json"))
@@ -0,0 +1,85 @@
+import pytest
+
+from graph_editor import GraphEditor
+from graph_schema import ValidatedGraph
+
+
+@pytest.fixture
+def graph():
+    return ValidatedGraph.validate({
+        "nodes": [
+            {"id": "A", "label": "Start"},
+            {"id": "B", "label": "Check", "shape": "diamond"},
+            {"id": "C", "label": "End"},
+        ],
+        "edges": [
+            {"source": "A", "target": "B"},
+            {"source": "B", "target": "C", "label": "ok"},
+        ],
+    })
+
+
+def test_edits_return_a_new_validated_graph(graph):
+    editor = GraphEditor(graph)
+
+    edited = editor.add_node("D", "Retry")
+    edited = editor.add_edge("B", "D", "fail")
+
+    assert edited is editor.current
+    assert edited.is_trusted
+    assert edited.node_ids == ("A", "B", "C", "D")
+    assert edited.edge_labels == (None, "ok", "fail")
+    assert graph.node_ids == ("A", "B", "C")  # the original is untouched
+
+
+def test_undo_and_redo_replay_edits_in_order(graph):
+    editor = GraphEditor(graph)
+    editor.relabel_node("B", "Valid?")
+    editor.remove_node("B")
+    removed = editor.current
+
+    assert editor.undo_description == "Remove node B"
+    assert editor.undo() == ValidatedGraph.validate({**graph.to_dict(), "nodes": [
+        {"id": "A", "label": "Start"},
+        {"id": "B", "label": "Valid?", "shape": "diamond"},
+        {"id": "C", "label": "End"},
+    ]})
+    assert editor.undo() == graph
+    assert not editor.can_undo
+
+    editor.redo()
+    assert editor.redo() == removed
+    assert not editor.can_redo
+
+
+def test_a_new_edit_clears_the_redo_log(graph):
+    editor = GraphEditor(graph)
+    editor.remove_edge(0)
+    editor.undo()
+
+    editor.relabel_edge(1, "yes")
+
+    assert not editor.can_redo
+    assert editor.current.edge_labels == (None, "yes")
+
+
+def test_history_is_bounded(graph):
+    editor = GraphEditor(graph, history_limit=2)
+    for label in ("one", "two", "three"):
+        editor.relabel_node("A", label)
+
+    editor.undo()
+    editor.undo()
+
+    assert not editor.can_undo
+    assert editor.current.node_labels[0] == "one"
+
+
+def test_invalid_edit_is_not_recorded(graph):
+    editor = GraphEditor(graph)
+
+    with pytest.raises(ValueError):
+        editor.add_edge("A", "missing")
+
+    assert not editor.can_undo
+    assert editor.current == graph
@@ -1,9 +1,29 @@
 import pytest
+from unittest.mock import MagicMock, patch
 from graphviz import Digraph
 from pydantic import ValidationError
 
 from graph_schema import Graph
-from ui.graph_renderer import create_graphviz_chart, render_graph_export
+from ui.graph_renderer import (
+    ExportBundle,
+    RenderCache,
+    create_graphviz_chart,
+    extract_positions,
+    graph_fingerprint,
+    layout_positions,
+    pinned_positions,
+    plan_layout,
+    render_graph_export,
+    render_cache,
+    schedule_layout,
+)
+from graphviz_pool import GraphvizTimeout
+
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    render_cache.clear()
+    yield
+    render_cache.clear()
 
 @pytest.fixture
 def sample_graph_data():
@@ -72,3 +92,187 @@ def test_create_graphviz_chart_rejects_edges_with_missing_nodes(sample_graph_dat
 def test_render_graph_export_rejects_unsupported_format(sample_graph_data):
     with pytest.raises(ValueError, match="Unsupported export format"):
         render_graph_export(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", "jpg")
+
+def test_export_bundle_renders_lazily_and_once_per_format(sample_graph_data):
+    with patch("ui.graph_renderer.layout_graph", return_value=b"digraph {}") as layout_graph, \
+            patch("ui.graph_renderer.SvgDocument", None), \
+            patch("ui.graph_renderer.render_positioned", side_effect=lambda dot, fmt: fmt.encode()) as render:
+        bundle = ExportBundle(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+        download_png = bundle.downloader("png")
+        layout_graph.assert_not_called()
+
+        assert download_png() == b"png"
+        assert download_png() == b"png"
+        assert bundle.get("pdf") == b"pdf"
+
+    layout_graph.assert_called_once()
+    assert render.call_count == 2
+
+def test_export_bundle_shares_one_parsed_svg_between_raster_formats(sample_graph_data):
+    document_class = MagicMock()
+    document_class.return_value.render.side_effect = lambda fmt: fmt.encode()
+    with patch("ui.graph_renderer.layout_graph", return_value=b"digraph {}"), \
+            patch("ui.graph_renderer.SvgDocument", document_class), \
+            patch("ui.graph_renderer.render_positioned", return_value=b"<svg/>") as render:
+        bundle = ExportBundle(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+        assert bundle.get("png") == b"png"
+        assert bundle.get("pdf") == b"pdf"
+        assert bundle.get("svg") == b"<svg/>"
+
+    render.assert_called_once_with(b"digraph {}", "svg")
+    document_class.assert_called_once()
+
+def test_graph_fingerprint_changes_with_graph_and_style(sample_graph_data):
+    base = graph_fingerprint(sample_graph_data, "box", "dot")
+
+    assert base == graph_fingerprint(dict(sample_graph_data), "box", "dot")
+    assert base != graph_fingerprint(sample_graph_data, "ellipse", "dot")
+    sample_graph_data["nodes"][0]["label"] = "Renamed"
+    assert base != graph_fingerprint(sample_graph_data, "box", "dot")
+
+def test_create_graphviz_chart_reuses_cached_chart(sample_graph_data):
+    first = create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+    with patch("ui.graph_renderer._coerce_graph") as coerce_graph:
+        second = create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+
+    coerce_graph.assert_not_called()
+    assert second.source == first.source
+    assert second is not first
+
+def test_create_graphviz_chart_misses_cache_when_style_changes(sample_graph_data):
+    create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+    chart = create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "neato")
+
+    assert "layout=neato" in chart.source
+    assert render_cache.stats()["misses"] == 2
+
+def test_render_cache_evicts_least_recently_used_within_byte_budget():
+    cache = RenderCache(max_bytes=10)
+    cache.put(("a", "svg"), b"1234", 4)
+    cache.put(("b", "svg"), b"1234", 4)
+    cache.get(("a", "svg"))
+
+    cache.put(("c", "svg"), b"1234", 4)
+
+    assert cache.get(("b", "svg")) is None
+    assert cache.get(("a", "svg")) == b"1234"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 8
+
+def test_render_cache_skips_entries_larger_than_budget():
+    cache = RenderCache(max_bytes=3)
+    cache.put(("a", "png"), b"1234", 4)
+
+    assert cache.get(("a", "png")) is None
+    assert cache.stats()["entries"] == 0
+
+@pytest.fixture
+def chain_graph_data():
+    return {
+        "nodes": [{"id": f"n{i}", "label": f"Step {i}"} for i in range(100)],
+        "edges": [{"source": f"n{i}", "target": f"n{i + 1}"} for i in range(99)],
+    }
+
+def test_plan_layout_keeps_the_requested_layout_within_budget(sample_graph_data):
+    plan = plan_layout(sample_graph_data, "circo")
+
+    assert (plan.algorithm, plan.splines) == ("circo", "ortho")
+    assert not plan.fell_back
+    assert plan.describe() == "Layout: circo with orthogonal edges"
+
+def test_plan_layout_falls_back_to_a_faster_algorithm_over_budget(chain_graph_data):
+    plan = plan_layout(chain_graph_data, "circo", budget=0.1)
+
+    assert (plan.algorithm, plan.splines) == ("twopi", "polyline")
+    assert plan.fell_back
+    assert "circo with orthogonal edges would take" in plan.describe()
+
+def test_schedule_layout_tries_the_next_layout_after_a_timeout(sample_graph_data):
+    with patch("ui.graph_renderer.layout_graph", side_effect=[GraphvizTimeout("slow"), b"digraph {}"]) as layout_graph:
+        positioned_dot, plan = schedule_layout(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", budget=5)
+
+    assert positioned_dot == b"digraph {}"
+    assert (plan.algorithm, plan.splines) == ("dot", "polyline")
+    assert "did not finish within the 5s budget" in plan.reason
+    assert layout_graph.call_args_list[0].kwargs["timeout"] <= 5
+    assert layout_graph.call_args_list[1].kwargs["timeout"] is None  # last candidate: the pool's own timeout
+
+def test_create_graphviz_chart_uses_requested_splines(sample_graph_data):
+    chart = create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", splines="polyline")
+
+    assert "splines=polyline" in chart.source
+
+POSITIONED_DOT = b"""digraph {
+	graph [bb="0,0,62,108"];
+	node [label="\\N"];
+	node1	[fillcolor="#e6f7ff",
+		height=0.5,
+		label="Check [x]",
+		pos="27,90",
+		width=0.75];
+	"node \\"2\\""	[pos="27.5,-18.25!"];
+	node1 -> "node \\"2\\""	[pos="e,27,36.104 27,71.697 27,54.712"];
+}
+"""
+
+def test_extract_positions_reads_node_positions_from_dot_output():
+    assert extract_positions(POSITIONED_DOT) == {"node1": [27.0, 90.0], 'node "2"': [27.5, -18.25]}
+
+def test_pinned_positions_keeps_surviving_nodes(sample_graph_data):
+    layout = {"algorithm": "dot", "positions": {"node1": [0, 10], "node2": [0, 0], "gone": [5, 5]}}
+
+    assert pinned_positions(sample_graph_data, layout, "dot") == {"node1": [0.0, 10.0], "node2": [0.0, 0.0]}
+    assert pinned_positions(sample_graph_data, layout, "neato") is None  # computed for another algorithm
+    assert pinned_positions(sample_graph_data, layout, "dot", min_pinned=1.0) is None
+    assert pinned_positions(sample_graph_data, {}, "dot") is None
+
+def test_pinned_positions_ignores_layouts_for_another_direction(sample_graph_data):
+    layout = {"algorithm": "dot", "direction": "LR", "positions": {"node1": [0, 10], "node2": [0, 0]}}
+
+    assert pinned_positions(sample_graph_data, layout, "dot") is None  # sample graph is TB
+    sample_graph_data["layout"] = {"direction": "LR"}
+    assert pinned_positions(sample_graph_data, layout, "dot") == {"node1": [0.0, 10.0], "node2": [0.0, 0.0]}
+
+def test_create_graphviz_chart_pins_positioned_nodes(sample_graph_data):
+    chart = create_graphviz_chart(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", positions={"node1": [27.0, 90.5]})
+
+    assert "layout=neato" in chart.source
+    assert 'pos="27,90.5!"' in chart.source
+    assert chart.source.count("pos=") == 1
+
+def test_layout_positions_pins_nodes_and_caches_the_result(sample_graph_data):
+    pins = {"node1": [27.0, 90.0]}
+    with patch("ui.graph_renderer.layout_graph", return_value=POSITIONED_DOT) as layout_graph:
+        first = layout_positions(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", positions=pins)
+        second = layout_positions(sample_graph_data, "box", "#f0f0f0", "Arial", "dot", positions=pins)
+
+    assert first == second == {"node1": [27.0, 90.0], 'node "2"': [27.5, -18.25]}
+    layout_graph.assert_called_once()
+    assert layout_graph.call_args.kwargs["positions"] == pins
+
+def test_export_bundle_records_failures_from_deferred_downloads(sample_graph_data):
+    with patch("ui.graph_renderer.layout_graph", return_value=b"digraph {}"), \
+            patch("ui.graph_renderer.SvgDocument", None), \
+            patch("ui.graph_renderer.render_positioned", side_effect=GraphvizTimeout("too slow")):
+        bundle = ExportBundle(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+        bundle.prepare()
+        with pytest.raises(GraphvizTimeout):
+            bundle.downloader("png")()
+
+    assert bundle.errors == {"png": "too slow"}
+
+def test_export_bundle_prepare_raises_layout_failures(sample_graph_data):
+    with patch("ui.graph_renderer.layout_graph", side_effect=GraphvizTimeout("too slow")):
+        bundle = ExportBundle(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+        with pytest.raises(GraphvizTimeout):
+            bundle.prepare()
+
+def test_export_bundle_prepare_lays_out_once_per_graph(sample_graph_data):
+    with patch("ui.graph_renderer.layout_graph", return_value=b"digraph {}") as layout_graph:
+        bundle = ExportBundle(sample_graph_data, "box", "#f0f0f0", "Arial", "dot")
+        bundle.prepare()
+        bundle.prepare()  # the next rerun
+        ExportBundle(dict(sample_graph_data), "box", "#f0f0f0", "Arial", "dot").prepare()  # same graph, new bundle
+
+    layout_graph.assert_called_once()
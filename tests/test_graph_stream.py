@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from graph_stream import GraphStreamParser, StreamValidationError
+
+
+def feed_in_chunks(parser, text, size=7):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+
+
+def test_parser_counts_complete_elements_as_they_arrive():
+    parser = GraphStreamParser()
+
+    parser.feed('{"nodes": [{"id": "A", "label": "Start"}, {"id": "B", "lab')
+    assert parser.node_count == 1
+
+    parser.feed('el": "End"}], "edges": [{"source": "A", "target": "B"}')
+    assert parser.node_count == 2
+    assert parser.edge_count == 1
+
+
+def test_parser_accepts_valid_graph_and_keeps_full_text():
+    graph = {
+        "nodes": [{"id": "A", "label": "Say \"hi\" {now}"}, {"id": "B", "label": "End", "shape": "ellipse"}],
+        "edges": [{"source": "A", "target": "B", "label": "next ]"}],
+        "layout": {"direction": "LR"},
+    }
+    text = json.dumps(graph)
+    parser = GraphStreamParser()
+
+    feed_in_chunks(parser, text)
+
+    assert parser.text == text
+    assert parser.node_ids == {"A", "B"}
+    assert parser.edge_count == 1
+
+
+def test_parser_rejects_invalid_node_before_stream_ends():
+    parser = GraphStreamParser()
+
+    with pytest.raises(StreamValidationError, match="Invalid node") as excinfo:
+        parser.feed('{"nodes": [{"id": "A", "label": "Start", "shape": "hexagon"}, {"id": "B"')
+
+    assert excinfo.value.partial_text.startswith('{"nodes"')
+
+
+def test_parser_rejects_duplicate_node_ids():
+    parser = GraphStreamParser()
+
+    with pytest.raises(StreamValidationError, match="Duplicate node ID"):
+        parser.feed('{"nodes": [{"id": "A", "label": "Start"}, {"id": "A", "label": "Again"}')
+
+
+def test_parser_rejects_dangling_edge_once_nodes_are_known():
+    parser = GraphStreamParser()
+    parser.feed('{"nodes": [{"id": "A", "label": "Start"}], ')
+
+    with pytest.raises(StreamValidationError, match="Edge target 'Z' does not match any node ID"):
+        parser.feed('"edges": [{"source": "A", "target": "Z"}')
+
+
+def test_parser_defers_edge_checks_until_nodes_are_closed():
+    parser = GraphStreamParser()
+    parser.feed('{"edges": [{"source": "A", "target": "B"}], "nodes": [{"id": "A", "label": "Start"}')
+
+    with pytest.raises(StreamValidationError, match="Edge target 'B'"):
+        parser.feed(']}')
@@ -0,0 +1,158 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from graphviz_pool import GraphvizBusy, GraphvizClosed, GraphvizPool, GraphvizTimeout
+
+# Stands in for a Graphviz engine: answers each graph read from stdin with an SVG naming its process.
+PERSISTENT_ENGINE = '''
+import os, sys, time
+buffer = b""
+for line in sys.stdin.buffer:
+    buffer += line
+    if buffer.count(b"{") != buffer.count(b"}") or b"}" not in buffer:
+        continue
+    graph, buffer = buffer, b""
+    if b"slow" in graph:
+        time.sleep(60)
+    if b"sluggish" in graph:
+        time.sleep(0.5)
+    if b"broken" in graph:
+        sys.stderr.write("Error: <stdin>: syntax error\\n")
+        sys.stderr.flush()
+        continue
+    sys.stdout.write(f"<svg>{os.getpid()}</svg>\\n")
+    sys.stdout.flush()
+'''
+
+# Like an engine that only answers once stdin is closed.
+BATCH_ENGINE = '''
+import os, sys
+sys.stdin.buffer.read()
+sys.stdout.write(f"<svg>{os.getpid()}</svg>\\n")
+'''
+
+
+def _engine(tmp_path, name, body):
+    path = tmp_path / name
+    path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def persistent(tmp_path):
+    return _engine(tmp_path, "fake_dot", PERSISTENT_ENGINE)
+
+
+@pytest.fixture
+def pool():
+    pool = GraphvizPool(workers_per_command=1, max_pending=4, timeout=5, health_check_interval=60,
+                        health_check_timeout=5)
+    yield pool
+    pool.close()
+
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="fake engines are run as scripts")
+
+
+def test_reuses_one_process_across_renders(pool, persistent):
+    first = pool.render(persistent, "svg", b"digraph { a }")
+    second = pool.render(persistent, "svg", b"digraph { b }")
+
+    assert first == second  # same PID
+    assert pool.stats()["spawned"] == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_timeout_kills_the_worker_and_the_next_render_gets_a_new_one(pool, persistent):
+    before = pool.render(persistent, "svg", b"digraph { a }")
+
+    with pytest.raises(GraphvizTimeout):
+        pool.render(persistent, "svg", b"digraph { slow }", timeout=0.5)
+    after = pool.render(persistent, "svg", b"digraph { a }")
+
+    assert after != before
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["workers"] == 1
+
+
+def test_graphviz_errors_raise_and_replace_the_worker(pool, persistent):
+    with pytest.raises(subprocess.CalledProcessError):
+        pool.render(persistent, "svg", b"digraph { broken }")
+
+    assert pool.render(persistent, "svg", b"digraph { a }").startswith(b"<svg>")
+    assert pool.stats()["spawned"] == 2
+
+
+def test_rejects_renders_beyond_the_queue_bound(persistent):
+    pool = GraphvizPool(workers_per_command=1, max_pending=1, timeout=5, health_check_timeout=5)
+    pool.render(persistent, "svg", b"digraph { a }")  # spawn the worker up front
+
+    def slow_render():
+        with pytest.raises(GraphvizTimeout):
+            pool.render(persistent, "svg", b"digraph { slow }", timeout=2)
+
+    thread = threading.Thread(target=slow_render)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while pool.stats()["renders"] != 2:
+            assert time.monotonic() < deadline, "slow render did not start"
+            time.sleep(0.01)
+        with pytest.raises(GraphvizBusy):
+            pool.render(persistent, "svg", b"digraph { a }")
+    finally:
+        thread.join()
+        pool.close()
+
+
+def test_closing_during_a_render_stops_the_worker_when_it_is_returned(persistent):
+    pool = GraphvizPool(workers_per_command=1, timeout=5, health_check_timeout=5)
+    pool.render(persistent, "svg", b"digraph { a }")  # spawn the worker up front
+    outputs = []
+    thread = threading.Thread(target=lambda: outputs.append(pool.render(persistent, "svg", b"digraph { sluggish }")))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while pool.stats()["idle"]:
+        assert time.monotonic() < deadline, "sluggish render did not start"
+        time.sleep(0.01)
+
+    pool.close()
+    thread.join()
+
+    assert pool.stats()["workers"] == 0 and pool.stats()["idle"] == 0
+    pid = int(outputs[0][len(b"<svg>"):-len(b"</svg>\n")])
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+    with pytest.raises(GraphvizClosed):
+        pool.render(persistent, "svg", b"digraph { a }")
+
+
+def test_idle_workers_are_health_checked_before_reuse(persistent):
+    pool = GraphvizPool(workers_per_command=1, health_check_interval=0, health_check_timeout=5)
+    try:
+        first = pool.render(persistent, "svg", b"digraph { a }")
+        pool._idle[(persistent, "-Tsvg")][0].process.kill()
+
+        assert pool.render(persistent, "svg", b"digraph { a }") != first
+        assert pool.stats()["failed_health_checks"] == 1
+    finally:
+        pool.close()
+
+
+def test_falls_back_to_one_process_per_render_when_the_engine_does_not_answer(tmp_path):
+    batch = _engine(tmp_path, "batch_dot", BATCH_ENGINE)
+    pool = GraphvizPool(health_check_timeout=0.5)
+
+    first = pool.render(batch, "svg", b"digraph { a }")
+    second = pool.render(batch, "svg", b"digraph { a }")
+
+    assert first.startswith(b"<svg>") and first != second
+    assert pool.stats()["one_shot_commands"] == 1
+    assert pool.stats()["workers"] == 0
@@ -0,0 +1,87 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from graph_schema import Graph
+from jobs import CANCELLED, DONE, FAILED, GenerationExecutor
+from llm_client import GenerationCancelled, GraphGenerationError, close_clients
+
+GRAPH = Graph.model_validate({"nodes": [{"id": "A", "label": "Start"}], "edges": []})
+
+
+@pytest.fixture
+def executor():
+    executor = GenerationExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_job_reports_progress_and_returns_graph(executor):
+    release = threading.Event()
+
+    def fake_generate(**kwargs):
+        kwargs["status_callback"]("🧠 Attempt 1: Contacting LLM...")
+        release.wait(5)
+        return GRAPH
+
+    with patch("jobs.generate_graph_from_text", side_effect=fake_generate) as generate:
+        job = executor.submit("key", "text", model="m", stream=True)
+        deadline = time.time() + 5
+        while job.progress.startswith("⏳") and time.time() < deadline:
+            time.sleep(0.01)
+        assert not job.done()
+        assert job.progress == "🧠 Attempt 1: Contacting LLM..."
+        release.set()
+        assert job.result(timeout=5) is GRAPH
+
+    assert job.status == DONE
+    kwargs = generate.call_args.kwargs
+    assert kwargs["model"] == "m" and kwargs["stream"] is True
+    assert kwargs["cancel_event"] is job.cancel_event
+
+
+def test_failed_job_exposes_error(executor):
+    with patch("jobs.generate_graph_from_text", side_effect=GraphGenerationError("boom")):
+        job = executor.submit("key", "text")
+        with pytest.raises(GraphGenerationError):
+            job.result(timeout=5)
+    assert job.status == FAILED
+    assert str(job.error) == "boom"
+
+
+def test_cancelling_a_queued_job_means_it_never_runs(executor):
+    release = threading.Event()
+    with patch("jobs.generate_graph_from_text", side_effect=lambda **kwargs: release.wait(5) and GRAPH) as generate:
+        running = executor.submit("key", "first")
+        queued = executor.submit("key", "second")
+        queued.cancel()
+        release.set()
+        running.result(timeout=5)
+        with pytest.raises(GenerationCancelled):
+            queued.result(timeout=5)
+    assert queued.status == CANCELLED
+    assert generate.call_count == 1
+
+
+def test_cancel_interrupts_retry_backoff(executor):
+    """A real generation waiting out its backoff stops as soon as the job is cancelled."""
+    from openai import APIError
+
+    started = threading.Event()
+
+    def failing_create(**kwargs):
+        started.set()
+        raise APIError("server error", request=None, body=None)
+
+    close_clients()
+    with patch("llm_client.OpenAI") as mock_openai:
+        mock_openai.return_value.chat.completions.create.side_effect = failing_create
+        job = executor.submit("cancel-test-key", "text", max_retries=5)
+        assert started.wait(5)
+        job.cancel()
+        with pytest.raises(GenerationCancelled):
+            job.result(timeout=2)  # backoff would otherwise sleep 1 + 2 + 4 + ... seconds
+    close_clients()
+    assert job.status == CANCELLED
@@ -0,0 +1,104 @@
+from graph_schema import Graph
+from benchmarks.synthetic import branching_graph
+from utils.layered_layout import LANE_SEPARATION, MARGIN, _count_crossings, layered_layout
+
+
+def make_graph(edges, direction="TB", shapes=None):
+    ids = sorted({node for edge in edges for node in edge})
+    return Graph.model_validate({
+        "nodes": [{"id": node_id, "label": f"Step {node_id}", "shape": (shapes or {}).get(node_id, "box")} for node_id in ids],
+        "edges": [{"source": source, "target": target} for source, target in edges],
+        "layout": {"direction": direction},
+    })
+
+
+def assert_no_overlaps(layout):
+    boxes = list(layout.nodes.values())
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            separated_x = abs(a.x - b.x) >= (a.width + b.width) / 2
+            separated_y = abs(a.y - b.y) >= (a.height + b.height) / 2
+            assert separated_x or separated_y, (a, b)
+
+
+def test_edges_point_down_in_tb_and_right_in_lr():
+    edges = [("A", "B"), ("A", "C"), ("B", "D"), ("C", "D")]
+
+    top_down = layered_layout(make_graph(edges))
+    left_right = layered_layout(make_graph(edges, direction="LR"))
+
+    for source, target in edges:
+        assert top_down.nodes[source].y < top_down.nodes[target].y
+        assert left_right.nodes[source].x < left_right.nodes[target].x
+    assert top_down.nodes["B"].y == top_down.nodes["C"].y
+    assert_no_overlaps(top_down)
+    assert_no_overlaps(left_right)
+
+
+def test_cycles_are_laid_out_and_routed_from_source_to_target():
+    graph = make_graph([("A", "B"), ("B", "C"), ("C", "A"), ("C", "C")])
+
+    layout = layered_layout(graph)
+
+    assert set(layout.nodes) == {"A", "B", "C"}
+    back_edge = layout.edges[2]  # C -> A, drawn upwards
+    assert back_edge[0][1] > back_edge[-1][1]
+    assert len(layout.edges[3]) == 4  # self-loop
+    assert_no_overlaps(layout)
+
+
+def test_long_edges_bend_around_intermediate_layers():
+    graph = make_graph([("A", "B"), ("B", "C"), ("C", "D"), ("A", "D")])
+
+    layout = layered_layout(graph)
+
+    assert len(layout.edges[3]) == 4  # two dummy bends between A and D
+    start, end = layout.edges[3][0], layout.edges[3][-1]
+    assert start[1] == layout.nodes["A"].y + layout.nodes["A"].height / 2
+    assert end[1] == layout.nodes["D"].y - layout.nodes["D"].height / 2
+
+
+def test_crossing_minimization_untangles_a_twisted_bipartite_graph():
+    graph = make_graph([("A", "Y"), ("B", "X"), ("A", "Z"), ("C", "X")])
+
+    layout = layered_layout(graph)
+
+    def crossing(a, b):
+        (a1, a2), (b1, b2) = a, b
+        return (layout.nodes[a1].x - layout.nodes[b1].x) * (layout.nodes[a2].x - layout.nodes[b2].x) < 0
+    edges = [("A", "Y"), ("B", "X"), ("A", "Z"), ("C", "X")]
+    assert not any(crossing(a, b) for i, a in enumerate(edges) for b in edges[i + 1:] if a[0] != b[0] and a[1] != b[1])
+
+
+def test_count_crossings():
+    position = {0: 0, 1: 1, 2: 0, 3: 1}
+    assert _count_crossings(position, position, [(0, 3), (1, 2)], 2) == 1
+    assert _count_crossings(position, position, [(0, 2), (1, 3)], 2) == 0
+
+
+def test_large_graph_layout_has_no_overlaps():
+    graph = Graph.validate_large(branching_graph(2000))
+
+    layout = layered_layout(graph)
+
+    assert len(layout.nodes) == 2000
+    boxes = sorted(layout.nodes.values(), key=lambda box: (box.y, box.x))
+    for a, b in zip(boxes, boxes[1:]):
+        if a.y == b.y:
+            assert b.x - a.x >= (a.width + b.width) / 2
+
+
+def test_edges_spanning_many_layers_are_routed_in_lanes_beside_the_drawing():
+    chain = [(f"n{i:02}", f"n{i + 1:02}") for i in range(29)]
+    graph = make_graph(chain + [("n29", "n00"), ("n00", "n10"), ("n15", "n29")])
+
+    layout = layered_layout(graph)
+
+    back_edge, first_long_edge, second_long_edge = layout.edges[29:]
+    assert len(back_edge) == len(first_long_edge) == 4  # no dummy bend per crossed layer
+    assert back_edge[0][1] > back_edge[-1][1]
+    rightmost = max(box.x + box.width / 2 for box in layout.nodes.values())
+    assert min(back_edge[1][0], first_long_edge[1][0]) > rightmost
+    assert back_edge[1][0] != first_long_edge[1][0]  # overlapping spans get their own lanes
+    assert first_long_edge[1][0] == second_long_edge[1][0]  # disjoint spans share one
+    assert layout.width <= back_edge[1][0] + 2 * LANE_SEPARATION + MARGIN
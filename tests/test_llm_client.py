@@ -1,16 +1,46 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from openai import APIError, AuthenticationError, RateLimitError
 from pydantic import ValidationError
 import json
-
-from llm_client import generate_graph_from_text, GraphGenerationError
+import time
+
+from graph_cache import GraphCache
+from llm_client import (
+    agenerate_graph_from_text,
+    close_clients,
+    generate_graph_from_text,
+    generate_many,
+    get_client,
+    GenerationStats,
+    GraphGenerationError,
+)
 from graph_schema import Graph
+from rate_limiter import get_rate_limiter
 
 @pytest.fixture
 def mock_openai_client():
+    close_clients()
+    get_rate_limiter.cache_clear()
     with patch("llm_client.OpenAI") as mock_openai:
         yield mock_openai
+    close_clients()
+
+@pytest.fixture
+def mock_async_openai_client():
+    with patch("llm_client.AsyncOpenAI") as mock_async_openai:
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock()
+        mock_async_openai.return_value.__aenter__ = AsyncMock(return_value=mock_client)
+        mock_async_openai.return_value.__aexit__ = AsyncMock(return_value=False)
+        yield mock_client
+
+def _response(content):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    response.usage.total_tokens = 100
+    return response
 
 def test_generate_graph_from_text_success(mock_openai_client):
     # Arrange
@@ -159,3 +189,406 @@ def test_generate_graph_from_text_fails_after_max_retries(mock_openai_client):
         generate_graph_from_text("test_api_key", "test prompt", max_retries=2)
     
     assert mock_client.chat.completions.create.call_count == 3
+
+def test_generate_graph_from_text_uses_cache(mock_openai_client, tmp_path):
+    # Arrange
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})
+    mock_response.usage.total_tokens = 100
+    mock_client.chat.completions.create.return_value = mock_response
+    cache = GraphCache(str(tmp_path))
+
+    # Act
+    first = generate_graph_from_text("test_api_key", "test prompt", cache=cache)
+    second = generate_graph_from_text("test_api_key", "  test prompt  ", cache=cache)
+
+    # Assert
+    assert first == second
+    mock_client.chat.completions.create.assert_called_once()
+    assert cache.stats()["hits"] == 1
+
+def test_get_client_reuses_one_client_per_key(mock_openai_client):
+    mock_openai_client.side_effect = lambda **kwargs: MagicMock()
+
+    first = get_client("key-1")
+    second = get_client("key-1")
+    other = get_client("key-2")
+
+    assert first is second
+    assert first is not other
+    assert mock_openai_client.call_count == 2
+
+def test_close_clients_closes_and_forgets_pooled_clients(mock_openai_client):
+    client = MagicMock()
+    mock_openai_client.return_value = client
+    get_client("key-1")
+
+    close_clients()
+    get_client("key-1")
+
+    client.close.assert_called_once()
+    assert mock_openai_client.call_count == 2
+
+def test_generate_graph_from_text_reuses_pooled_client(mock_openai_client):
+    # Arrange
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})
+    mock_response.usage.total_tokens = 100
+    mock_client.chat.completions.create.return_value = mock_response
+
+    # Act
+    generate_graph_from_text("test_api_key", "first prompt")
+    generate_graph_from_text("test_api_key", "second prompt")
+
+    # Assert
+    assert mock_openai_client.call_count == 1
+    assert mock_client.chat.completions.create.call_count == 2
+
+def test_agenerate_graph_from_text_repairs_invalid_json(mock_async_openai_client):
+    # Arrange
+    valid_graph_data = {"nodes": [{"id": "A", "label": "Start"}], "edges": []}
+    mock_async_openai_client.chat.completions.create.side_effect = [
+        _response("this is not json"),
+        _response(json.dumps(valid_graph_data)),
+    ]
+
+    # Act
+    graph = asyncio.run(agenerate_graph_from_text("test_api_key", "test prompt"))
+
+    # Assert
+    assert graph.nodes[0].id == "A"
+    assert mock_async_openai_client.chat.completions.create.call_count == 2
+    repair_prompt = mock_async_openai_client.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+    assert "this is not json" in repair_prompt
+
+def test_generate_many_returns_results_in_order_and_isolates_failures(mock_async_openai_client):
+    # Arrange
+    async def create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        if "broken" in prompt:
+            return _response("invalid")
+        node_id = "first" if "first" in prompt else "second"
+        await asyncio.sleep(0.01 if node_id == "first" else 0)
+        return _response(json.dumps({"nodes": [{"id": node_id, "label": node_id}], "edges": []}))
+
+    mock_async_openai_client.chat.completions.create.side_effect = create
+
+    # Act
+    results = asyncio.run(generate_many("test_api_key", ["first", "broken", "second"], max_retries=0, concurrency=2))
+
+    # Assert
+    assert results[0].nodes[0].id == "first"
+    assert isinstance(results[1], GraphGenerationError)
+    assert results[2].nodes[0].id == "second"
+
+def test_generate_many_bounds_concurrency(mock_async_openai_client):
+    # Arrange
+    in_flight = 0
+    peak = 0
+
+    async def create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _response(json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []}))
+
+    mock_async_openai_client.chat.completions.create.side_effect = create
+
+    # Act
+    results = asyncio.run(generate_many("test_api_key", [f"text {i}" for i in range(10)], concurrency=3))
+
+    # Assert
+    assert len(results) == 10
+    assert peak == 3
+
+def _stream_chunk(content=None, total_tokens=None):
+    chunk = MagicMock()
+    chunk.choices = []
+    if content is not None:
+        choice = MagicMock()
+        choice.delta.content = content
+        chunk.choices = [choice]
+    chunk.usage = MagicMock(total_tokens=total_tokens) if total_tokens else None
+    return chunk
+
+class _FakeStream:
+    def __init__(self, contents):
+        self.chunks = [_stream_chunk(content) for content in contents] + [_stream_chunk(total_tokens=42)]
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def test_stream_is_closed_when_consuming_it_fails(mock_openai_client):
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    stream = _FakeStream(['{"nodes": [{"id": "A", "label": "Start"}', '], "edges": []}'])
+    mock_client.chat.completions.create.return_value = stream
+
+    def failing_status(message):
+        if message.startswith("📥"):
+            raise RuntimeError("UI went away")
+
+    with pytest.raises(GraphGenerationError):
+        generate_graph_from_text("test_api_key", "test prompt", stream=True, status_callback=failing_status)
+
+    assert stream.closed
+    assert stream.consumed == 1
+
+@pytest.mark.parametrize("usage", [None, {}, {"total_tokens": None}, {"total_tokens": "12"}])
+def test_stream_tolerates_missing_or_malformed_usage(mock_openai_client, usage):
+    from types import SimpleNamespace
+
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    stream = _FakeStream(['{"nodes": [{"id": "A", "label": "Start"}], "edges": []}'])
+    stream.chunks[-1].usage = None if usage is None else SimpleNamespace(**usage)
+    mock_client.chat.completions.create.return_value = stream
+    stats = GenerationStats()
+
+    graph = generate_graph_from_text("test_api_key", "test prompt", stream=True, stats=stats)
+
+    assert graph.nodes[0].id == "A"
+    assert stats.total_tokens == 0
+
+def test_generate_graph_from_text_streams_and_reports_progress(mock_openai_client):
+    # Arrange
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _FakeStream(
+        ['{"nodes": [{"id": "A", "label": "Start"}', ', {"id": "B", "label": "End"}],', ' "edges": []}']
+    )
+    statuses = []
+
+    # Act
+    graph = generate_graph_from_text("test_api_key", "test prompt", stream=True, status_callback=statuses.append)
+
+    # Assert
+    assert [node.id for node in graph.nodes] == ["A", "B"]
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+    assert any("Received 2 nodes" in status for status in statuses)
+
+def test_generate_graph_from_text_stream_aborts_early_on_invalid_element(mock_openai_client):
+    # Arrange
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    doomed = _FakeStream(['{"nodes": [{"id": "A", "group": "unlabelled"}', ', {"id": "B"', ', "label": "More"}]}'])
+    valid = _FakeStream(['{"nodes": [{"id": "A", "label": "Start"}], "edges": []}'])
+    mock_client.chat.completions.create.side_effect = [doomed, valid]
+
+    # Act
+    graph = generate_graph_from_text("test_api_key", "test prompt", stream=True)
+
+    # Assert
+    assert graph.nodes[0].label == "Start"
+    assert doomed.closed
+    assert doomed.consumed == 1
+    repair_prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+    assert "unlabelled" in repair_prompt
+
+def test_stream_with_locally_repairable_problems_needs_no_retry(mock_openai_client):
+    """Unknown shapes, duplicate IDs and mis-cased endpoints no longer abort the stream or cost a retry."""
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _FakeStream([
+        '{"nodes": [{"id": "A", "label": "Start", "shape": "hexagon"}, {"id": "A", "label": "Again"}],',
+        ' "edges": [{"source": "a", "target": "Again"}]}',
+    ])
+    stats = GenerationStats()
+
+    graph = generate_graph_from_text("test_api_key", "test prompt", stream=True, stats=stats)
+
+    assert [(node.id, node.shape) for node in graph.nodes] == [("A", "box"), ("A_2", "box")]
+    assert [(edge.source, edge.target) for edge in graph.edges] == [("A", "A_2")]
+    assert mock_client.chat.completions.create.call_count == 1
+    assert stats.attempts == 1
+    assert stats.retries_avoided == 1
+    assert stats.local_repairs == 4
+
+def test_generate_graph_from_text_records_stats(mock_openai_client):
+    # Arrange
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    invalid = _response("this is not json")
+    invalid.usage.total_tokens = 50
+    mock_client.chat.completions.create.side_effect = [
+        invalid,
+        _response(json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})),
+    ]
+    stats = GenerationStats()
+
+    # Act
+    generate_graph_from_text("test_api_key", "test prompt", stats=stats)
+
+    # Assert
+    assert stats.attempts == 2
+    assert stats.retries == 1
+    assert stats.total_tokens == 150
+    assert not stats.cache_hit
+
+def test_generation_emits_stage_spans(mock_openai_client):
+    """A repaired generation records parse, validation, repair and request spans under one root."""
+    from tracing import InMemoryExporter, set_exporter
+
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [
+        _response("not json"),
+        _response(json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})),
+    ]
+    exporter = InMemoryExporter()
+    previous = set_exporter(exporter)
+    try:
+        generate_graph_from_text("test_api_key", "test prompt", max_retries=1)
+    finally:
+        set_exporter(previous)
+
+    names = exporter.names()
+    assert names.count("llm.attempt") == 2
+    assert names.count("llm.request") == 2
+    assert names.count("json.parse") == 2
+    assert {"prompt.format", "prompt.repair", "schema.validate"} <= set(names)
+    root = exporter.find("generate_graph")[0]
+    assert root.parent_id is None and root.attributes["attempts"] == 2
+    assert all(s.trace_id == root.trace_id for s in exporter.spans)
+    assert [s.attributes["repair"] for s in exporter.find("llm.attempt")] == [False, True]
+
+def test_identical_concurrent_generations_share_one_call(mock_openai_client):
+    """Concurrent identical requests make one LLM call and all get the same graph."""
+    import threading
+
+    release = threading.Event()
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+
+    def slow_create(**kwargs):
+        release.wait(5)
+        return _response(json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []}))
+
+    mock_client.chat.completions.create.side_effect = slow_create
+    results, all_stats = [], []
+
+    def generate():
+        stats = GenerationStats()
+        all_stats.append(stats)
+        results.append(generate_graph_from_text("test_api_key", "same prompt", stats=stats))
+
+    from llm_client import in_flight_generations
+    coalesced_before = in_flight_generations.stats()["coalesced"]
+    threads = [threading.Thread(target=generate) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    try:
+        while in_flight_generations.stats()["coalesced"] - coalesced_before < 2:
+            assert time.monotonic() < deadline, "callers were not coalesced"
+            time.sleep(0.001)
+    finally:
+        release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert mock_client.chat.completions.create.call_count == 1
+    assert len(results) == 3 and all(graph is results[0] for graph in results)
+    assert sorted(stats.coalesced for stats in all_stats) == [False, True, True]
+
+def test_rate_limit_retry_honours_retry_after(mock_openai_client):
+    """A 429 with a Retry-After hint waits that long (plus jitter) instead of the fixed backoff."""
+    import httpx
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    rate_limited = RateLimitError(
+        "Rate limit exceeded", response=httpx.Response(429, headers={"retry-after": "7"}, request=request), body=None
+    )
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [
+        rate_limited, _response(json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})),
+    ]
+
+    with patch("llm_client.time.sleep") as sleep, patch("rate_limiter.time.monotonic", side_effect=lambda: time_now[0]):
+        time_now = [1000.0]
+        sleep.side_effect = lambda seconds: time_now.__setitem__(0, time_now[0] + seconds)
+        generate_graph_from_text("test_api_key", "test prompt", max_retries=1)
+
+    assert 7.0 <= sleep.call_args.args[0] <= 7.7
+    assert get_rate_limiter().stats()["rate_limited"] == 1
+
+def test_a_429_from_the_server_reaches_the_rate_limiter():
+    """The SDK does not retry a 429 itself, so the limiter sees it and the retry is counted."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class RateLimitedOnceHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        statuses = [429, 200]
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            status = self.statuses.pop(0)
+            content = json.dumps({"nodes": [{"id": "A", "label": "Start"}], "edges": []})
+            body = json.dumps({"error": {"message": "Rate limit exceeded"}} if status == 429 else {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 7, "total_tokens": 12},
+            }).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    close_clients()
+    get_rate_limiter.cache_clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedOnceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stats = GenerationStats()
+    try:
+        with patch("llm_client.time.sleep"):
+            generate_graph_from_text("test_api_key", "test prompt", max_retries=1, stats=stats,
+                                     base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    finally:
+        close_clients()
+        server.shutdown()
+
+    assert stats.attempts == 2
+    assert get_rate_limiter().stats()["rate_limited"] == 1
+
+def test_schema_failure_is_repaired_with_a_local_patch(mock_openai_client):
+    """The repair prompt omits the user's text and valid elements; the patch reply is applied locally."""
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    nodes = [{"id": f"N{i}", "label": f"Step {i}"} for i in range(20)]
+    edges = [{"source": f"N{i}", "target": f"N{i + 1}"} for i in range(19)]
+    del nodes[5]["label"]  # cannot be fixed locally
+    patch_reply = {"replace_nodes": {"5": {"id": "N5", "label": "Step 5"}}}
+    mock_client.chat.completions.create.side_effect = [
+        _response(json.dumps({"nodes": nodes, "edges": edges})),
+        _response(json.dumps(patch_reply)),
+    ]
+
+    graph = generate_graph_from_text("test_api_key", "a long process description", max_retries=1)
+
+    assert len(graph.nodes) == 20
+    assert graph.nodes[5].label == "Step 5"
+    repair_prompt = mock_client.chat.completions.create.call_args_list[1].kwargs["messages"][-1]["content"]
+    assert "a long process description" not in repair_prompt
+    assert '"Step 1"' not in repair_prompt
+    assert "nodes[5].label" in repair_prompt
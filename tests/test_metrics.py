@@ -0,0 +1,89 @@
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from llm_client import GenerationStats
+from ui.metrics import MetricsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(path=str(tmp_path / "metrics.db"), legacy_json_path=None, latency_buckets=(1, 5))
+    yield store
+    store.close()
+
+
+def test_increment_is_visible_after_flush(store):
+    store.increment("run_count")
+    store.increment("run_count", 2)
+    assert store.flush(timeout=5)
+    assert store.counters() == {"run_count": 3}
+
+
+def test_concurrent_increments_are_not_lost(store):
+    """Many threads incrementing at once must add up exactly."""
+    def worker():
+        for _ in range(100):
+            store.increment("run_count")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.flush(timeout=5)
+    assert store.counters()["run_count"] == 800
+
+
+def _increment_in_process(path, count):
+    store = MetricsStore(path=path, legacy_json_path=None)
+    for _ in range(count):
+        store.increment("run_count")
+    store.close()
+
+
+def test_increments_from_separate_processes_are_not_lost(tmp_path):
+    path = str(tmp_path / "metrics.db")
+    MetricsStore(path=path, legacy_json_path=None).close()
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_increment_in_process, args=(path, 50)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+    store = MetricsStore(path=path, legacy_json_path=None)
+    assert store.counters()["run_count"] == 150
+    store.close()
+
+
+def test_record_generation_tracks_latency_tokens_and_retries(store):
+    store.record_generation(0.5, GenerationStats(attempts=2, total_tokens=120))
+    store.record_generation(3.0, GenerationStats(attempts=1, total_tokens=80, cache_hit=True))
+    store.record_generation(4.0, GenerationStats(coalesced=True, retries_avoided=1))
+    store.record_generation(90.0)
+    store.flush(timeout=5)
+
+    counters = store.counters()
+    assert counters["run_count"] == 4
+    assert counters["total_tokens"] == 200
+    assert counters["retries"] == 1
+    assert counters["retries_avoided"] == 1
+    assert counters["cache_hits"] == 1
+    assert counters["coalesced"] == 1
+    assert counters["latency_seconds_total"] == pytest.approx(97.5)
+    assert store.latency_histogram() == [(1, 1), (5, 2), (float("inf"), 1)]
+
+
+def test_legacy_json_run_count_is_imported_once(tmp_path):
+    legacy_path = tmp_path / "metrics.json"
+    legacy_path.write_text(json.dumps({"run_count": 7}))
+    db_path = str(tmp_path / "metrics.db")
+
+    for _ in range(2):
+        store = MetricsStore(path=db_path, legacy_json_path=str(legacy_path))
+        store.close()
+    store = MetricsStore(path=db_path, legacy_json_path=str(legacy_path))
+    assert store.counters() == {"run_count": 7}
+    store.close()
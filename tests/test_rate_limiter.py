@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from rate_limiter import RateLimiter, TokenBucket, backoff_delay, retry_after_seconds
+
+
+def _rate_limit_error(headers: dict) -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)  # one unit per second
+    now = time.monotonic()
+    assert bucket.wait_time(2, now) == 0
+    bucket.take(2)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0, abs=0.01)
+    assert bucket.wait_time(1, now + 1.0) == pytest.approx(0, abs=0.01)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "3"}, 3.0),
+    ({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}, 360.0),
+    ({"x-ratelimit-reset-tokens": "20ms"}, 0.02),
+    ({}, None),
+])
+def test_retry_after_seconds_reads_server_hints(headers, expected):
+    hint = retry_after_seconds(_rate_limit_error(headers))
+    assert hint is None if expected is None else hint == pytest.approx(expected)
+
+
+def test_retry_after_seconds_accepts_http_dates():
+    hint = retry_after_seconds(_rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+    assert hint == 0.0  # already in the past
+
+
+def test_retry_after_seconds_ignores_mock_headers():
+    assert retry_after_seconds(RateLimitError("limited", response=MagicMock(), body=None)) is None
+
+
+def test_backoff_delay_is_jittered_and_respects_hints():
+    delays = {backoff_delay(2) for _ in range(50)}
+    assert all(2.0 <= delay <= 4.0 for delay in delays)
+    assert len(delays) > 1  # not every client retries at the same instant
+    assert all(5.0 <= backoff_delay(0, retry_after=5.0) <= 5.5 for _ in range(20))
+    assert backoff_delay(20, base=1.0, cap=30.0) <= 30.0
+
+
+def test_concurrency_limit_blocks_until_release():
+    limiter = RateLimiter(initial_concurrency=1, max_concurrency=1)
+    first = limiter.acquire(10)
+    acquired = threading.Event()
+
+    def second():
+        with limiter.acquire(10):
+            acquired.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not acquired.wait(0.2)
+    with first:
+        pass
+    assert acquired.wait(2)
+    thread.join()
+
+
+def test_acquire_returns_none_when_cancelled():
+    limiter = RateLimiter(initial_concurrency=1, max_concurrency=1)
+    limiter.acquire(10)
+    cancel_event = threading.Event()
+    cancel_event.set()
+    assert limiter.acquire(10, cancel_event) is None
+
+
+def test_token_estimates_are_corrected_on_release():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    with limiter.acquire(800) as permit:
+        permit.tokens_used = 100
+    assert limiter.tokens.available == pytest.approx(900, abs=5)
+
+
+def test_aimd_halves_on_429_and_recovers_on_success():
+    limiter = RateLimiter(min_concurrency=1, initial_concurrency=8, max_concurrency=8)
+    with pytest.raises(RateLimitError):
+        with limiter.acquire(10):
+            raise _rate_limit_error({"retry-after-ms": "100"})
+    stats = limiter.stats()
+    assert stats["concurrency_limit"] == 4
+    assert stats["rate_limited"] == 1
+    assert 0 < stats["paused_for"] <= 0.1
+
+    for _ in range(20):
+        with limiter.acquire(10):
+            pass
+    assert limiter.stats()["concurrency_limit"] > 4
+
+
+def test_retry_hint_pauses_every_caller():
+    limiter = RateLimiter()
+    with pytest.raises(RateLimitError):
+        with limiter.acquire(10):
+            raise _rate_limit_error({"retry-after-ms": "200"})
+    start = time.monotonic()
+    with limiter.acquire(10):
+        pass
+    assert time.monotonic() - start >= 0.15
+
+
+def test_async_acquire_waits_without_blocking_the_loop():
+    limiter = RateLimiter(initial_concurrency=1, max_concurrency=1)
+
+    async def main():
+        order = []
+
+        async def call(name):
+            with await limiter.aacquire(10):
+                order.append(name)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(call("a"), call("b"))
+        return order
+
+    assert sorted(asyncio.run(main())) == ["a", "b"]
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from graph_schema import Graph
+from repair import apply_patch, can_patch, collect_errors, patch_repair_request, repair_locally
+
+
+def validation_error(data):
+    with pytest.raises(ValidationError) as excinfo:
+        Graph.model_validate(data)
+    return excinfo.value
+
+
+def large_graph_with_one_bad_edge():
+    nodes = [{"id": f"N{i}", "label": f"Step number {i} of the long process"} for i in range(60)]
+    edges = [{"source": f"N{i}", "target": f"N{i + 1}"} for i in range(59)]
+    edges[30] = {"source": "N30", "target": "missing"}
+    return {"nodes": nodes, "edges": edges}
+
+
+def test_collect_errors_locates_field_and_integrity_errors():
+    data = {
+        "nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "x" * 101}, {"id": "A", "label": "Again"}],
+        "edges": [{"source": "A", "target": "B"}, {"source": "B", "target": "Z"}],
+    }
+    errors, bad_nodes, bad_edges = collect_errors(data, validation_error(data))
+
+    assert bad_nodes == [0, 1, 2]
+    assert bad_edges == [1]
+    locations = {error["loc"] for error in errors}
+    assert "nodes[1].label" in locations
+    assert "nodes[0].id, nodes[2].id" in locations
+    assert "edges[1].target" in locations
+
+
+def test_patch_repair_prompt_sends_only_offending_elements():
+    data = large_graph_with_one_bad_edge()
+    request = patch_repair_request(data, validation_error(data))
+
+    assert request.base_data is data
+    assert '"30":{"source":"N30","target":"missing"}' in request.prompt
+    assert "Step number 5 of" not in request.prompt  # valid nodes are not resent
+    assert '"loc":"edges[30].target"' in request.prompt
+    assert len(request.prompt) < len(json.dumps(data))
+
+
+def test_apply_patch_replaces_deletes_and_adds_by_original_index():
+    data = {
+        "nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "Bad", "shape": "hexagon"}, {"id": "C", "label": "End"}],
+        "edges": [{"source": "A", "target": "X"}, {"source": "A", "target": "C"}],
+    }
+    patch = {
+        "replace_nodes": {"1": None, "2": {"id": "C", "label": "Done", "shape": "ellipse"}},
+        "replace_edges": {"0": None},
+        "add_nodes": [{"id": "D", "label": "Extra"}],
+        "add_edges": [{"source": "C", "target": "D"}],
+        "layout": {"direction": "LR"},
+    }
+
+    patched = apply_patch(data, patch)
+
+    assert [node["id"] for node in patched["nodes"]] == ["A", "C", "D"]
+    assert patched["nodes"][1]["label"] == "Done"
+    assert patched["edges"] == [{"source": "A", "target": "C"}, {"source": "C", "target": "D"}]
+    assert patched["layout"] == {"direction": "LR"}
+    assert len(data["nodes"]) == 3  # the original is untouched
+    Graph.model_validate(patched)
+
+
+def test_apply_patch_accepts_a_complete_graph_and_rejects_garbage():
+    data = {"nodes": [{"id": "A", "label": "Start"}], "edges": []}
+    full = {"nodes": [{"id": "B", "label": "Other"}]}
+
+    assert apply_patch(data, full) is full
+    with pytest.raises(ValueError):
+        apply_patch(data, {"something": "else"})
+    with pytest.raises(ValueError):
+        apply_patch(data, {"replace_nodes": {"5": None}})
+    with pytest.raises(ValueError):
+        apply_patch(data, [1, 2])
+
+
+def test_can_patch_requires_node_and_edge_lists():
+    assert can_patch({"nodes": [], "edges": []})
+    assert can_patch({"nodes": [{"id": "A"}]})
+    assert not can_patch({"nodes": "A"})
+    assert not can_patch(["not", "a", "graph"])
+
+
+def test_repair_locally_fixes_mechanical_problems():
+    data = {
+        "nodes": [
+            {"id": "start", "label": "Start", "shape": "Oval"},
+            {"id": "ask", "label": "x" * 150, "shape": "rhombus"},
+            {"id": "start", "label": "Retry", "shape": "hexagon"},
+        ],
+        "edges": [
+            {"source": "start", "target": "ASK", "label": "y" * 80},
+            {"source": "ask", "target": "Retry"},
+        ],
+        "layout": {"direction": "td"},
+    }
+
+    repaired, changes = repair_locally(data)
+    graph = Graph.model_validate(repaired)
+
+    assert [(node.id, node.shape) for node in graph.nodes] == [("start", "ellipse"), ("ask", "diamond"), ("start_2", "box")]
+    assert len(graph.nodes[1].label) == 100 and graph.nodes[1].label.endswith("…")
+    assert [(edge.source, edge.target) for edge in graph.edges] == [("start", "ask"), ("ask", "start_2")]
+    assert len(graph.edges[0].label) == 50
+    assert graph.layout.direction == "TB"
+    assert len(changes) == 9
+    assert data["nodes"][2]["id"] == "start"  # the input is not modified
+
+
+def test_repair_locally_leaves_valid_and_unfixable_data_alone():
+    valid = {"nodes": [{"id": "A", "label": "Start"}], "edges": [], "layout": {"direction": "LR"}}
+    assert repair_locally(valid) == (valid, [])
+
+    missing_label = {"nodes": [{"id": "A"}], "edges": []}
+    repaired, changes = repair_locally(missing_label)
+    assert changes == []
+    with pytest.raises(ValidationError):
+        Graph.model_validate(repaired)
+
+    assert repair_locally("not a graph") == ("not a graph", [])
+
+
+def test_repair_locally_keeps_unresolvable_edges_for_the_patch_repair():
+    data = {
+        "nodes": [{"id": "A", "label": "Start"}, {"id": "B", "label": "End"}],
+        "edges": [{"source": "a", "target": "B"}, {"source": "A", "target": "nowhere"}],
+    }
+
+    repaired, changes = repair_locally(data)
+
+    assert repaired["edges"] == [{"source": "A", "target": "B"}, {"source": "A", "target": "nowhere"}]
+    assert changes == ["edges[0]: source 'a' resolved to node 'A'"]
+    with pytest.raises(ValidationError) as error:
+        Graph.model_validate(repaired)
+    assert "nowhere" in patch_repair_request(repaired, error.value).prompt
@@ -2,7 +2,9 @@ import pytest
 import json
 from pydantic import ValidationError
 
-from graph_schema import Graph, Node
+from unittest.mock import patch
+
+from graph_schema import MAX_NODES, Graph, GraphEditError, GraphIndex, Node, ValidatedGraph
 
 
 @pytest.fixture
@@ -94,3 +96,169 @@ def test_sample_file_is_valid(sample_json_path):
         Graph.model_validate(data)
     except ValidationError as e:
         pytest.fail(f"sample.json failed validation: {e}")
+
+
+def test_validated_graph_round_trips_model_dump(valid_graph_data):
+    """Checks that the compact form preserves every field of the validated model."""
+    graph = Graph.model_validate(valid_graph_data)
+    compact = ValidatedGraph.from_graph(graph)
+
+    assert compact.to_dict() == graph.model_dump()
+    assert compact.to_graph() == graph
+    assert len(compact) == 2
+
+
+def test_validated_graph_skips_revalidation(valid_graph_data):
+    """Checks that a trusted ValidatedGraph passes through validate() without pydantic."""
+    compact = ValidatedGraph.validate(valid_graph_data)
+
+    with patch.object(Graph, "model_validate") as model_validate:
+        assert ValidatedGraph.validate(compact) is compact
+
+    model_validate.assert_not_called()
+
+
+def test_validated_graph_requires_validation_token():
+    """Checks that a ValidatedGraph cannot be built around unvalidated data."""
+    with pytest.raises(TypeError):
+        ValidatedGraph((("A",), ("Start",), ("default",), ("box",)), ((), (), ()), "TB", token=object())
+
+
+def test_validated_graph_rejects_invalid_data(valid_graph_data):
+    """Checks that raw data still goes through full schema validation."""
+    valid_graph_data["edges"][0]["target"] = "Z"
+    with pytest.raises(ValidationError):
+        ValidatedGraph.validate(valid_graph_data)
+
+
+def test_validated_graph_fingerprint_tracks_content(valid_graph_data):
+    """Checks that equal content gives equal fingerprints and edits change them."""
+    first = ValidatedGraph.validate(valid_graph_data)
+    second = ValidatedGraph.validate(valid_graph_data)
+    valid_graph_data["nodes"][0]["label"] = "Begin"
+
+    assert first == second
+    assert first.fingerprint != ValidatedGraph.validate(valid_graph_data).fingerprint
+
+
+def chain_graph_data(node_count):
+    return {
+        "nodes": [{"id": f"n{i}", "label": f"Step {i}"} for i in range(node_count)],
+        "edges": [{"source": f"n{i}", "target": f"n{i + 1}"} for i in range(node_count - 1)],
+    }
+
+
+def test_default_node_limit_applies():
+    """Checks that graphs over the default cap are rejected unless large-graph mode is used."""
+    with pytest.raises(ValidationError, match="more than the limit"):
+        Graph.model_validate(chain_graph_data(MAX_NODES + 1))
+
+
+def test_large_graph_mode_accepts_configured_limit():
+    """Checks that the node limit can be raised (or lowered) through the validation context."""
+    graph = Graph.validate_large(chain_graph_data(5000))
+    assert len(graph.nodes) == 5000
+
+    with pytest.raises(ValidationError, match="more than the limit of 10"):
+        Graph.model_validate(chain_graph_data(11), context={"max_nodes": 10})
+
+
+def test_all_integrity_problems_are_reported_together(valid_graph_data):
+    """Checks that duplicates and every dangling edge appear in a single error."""
+    valid_graph_data["nodes"].append({"id": "A", "label": "Duplicate"})
+    valid_graph_data["edges"] += [{"source": "X", "target": "B"}, {"source": "A", "target": "Y"}]
+
+    with pytest.raises(ValidationError) as excinfo:
+        Graph.model_validate(valid_graph_data)
+
+    message = str(excinfo.value)
+    assert "Duplicate node ID(s): A" in message
+    assert "Edge source 'X' does not match any node ID." in message
+    assert "Edge target 'Y' does not match any node ID." in message
+
+
+def test_graph_index_precomputes_adjacency_and_degrees(valid_graph_data):
+    """Checks that a validated graph exposes adjacency and degree counts."""
+    valid_graph_data["nodes"].append({"id": "C", "label": "Other"})
+    valid_graph_data["edges"] += [{"source": "A", "target": "C"}, {"source": "C", "target": "B"}]
+
+    index = Graph.model_validate(valid_graph_data).index
+
+    assert index.position == {"A": 0, "B": 1, "C": 2}
+    assert sorted(index.successors[0]) == [1, 2]
+    assert index.out_degree == [2, 0, 1]
+    assert index.in_degree == [0, 2, 1]
+
+
+def test_graph_index_collects_issues_without_failing():
+    """Checks that the index can be built over raw IDs to inspect problems directly."""
+    index = GraphIndex(["A", "B", "B"], [("A", "B"), ("B", "Z"), ("Q", "A")])
+
+    assert not index.is_valid
+    assert index.duplicate_ids == ["B"]
+    assert index.dangling_edges == [(1, "target", "Z"), (2, "source", "Q")]
+    assert index.out_degree == [1, 0, 0]
+
+
+def test_large_graph_validation_handles_50k_edges():
+    """Checks that a 50k-edge graph validates in large-graph mode and is fully indexed."""
+    graph = Graph.validate_large(chain_graph_data(50_001))
+
+    assert len(graph.edges) == 50_000
+    assert graph.index.in_degree[-1] == 1
+
+
+def test_edits_validate_only_the_touched_elements(valid_graph_data):
+    graph = Graph.model_validate(valid_graph_data)
+
+    with patch.object(Graph, "model_validate") as model_validate:
+        graph.add_node("C", "Review", shape="diamond")
+        graph.add_edge("B", "C", "next")
+        graph.relabel_node("A", "Begin")
+
+    model_validate.assert_not_called()
+    assert [node.id for node in graph.nodes] == ["A", "B", "C"]
+    assert graph.nodes[0].label == "Begin"
+    assert graph.index.position["C"] == 2
+    assert graph.index.successors[1] == [2]  # appends update the index in place
+
+
+def test_invalid_edits_raise_and_leave_the_graph_unchanged(valid_graph_data):
+    graph = Graph.model_validate(valid_graph_data)
+    before = graph.model_dump()
+
+    with pytest.raises(GraphEditError, match="already exists"):
+        graph.add_node("A", "Again")
+    with pytest.raises(GraphEditError, match="No node with ID 'Z'"):
+        graph.add_edge("A", "Z")
+    with pytest.raises(ValidationError):
+        graph.add_node("C", "Bad shape", shape="hexagon")
+    with pytest.raises(ValidationError):
+        graph.relabel_edge(0, "x" * 51)
+    with pytest.raises(GraphEditError, match="No edge at index 3"):
+        graph.remove_edge(3)
+
+    assert graph.model_dump() == before
+
+
+def test_remove_node_removes_its_edges_and_undo_steps_restore_them(valid_graph_data):
+    graph = Graph.model_validate(valid_graph_data)
+    graph.add_node("C", "Middle")
+    graph.add_edge("C", "B")
+    before = graph.model_dump()
+
+    undo = graph.remove_node("B")
+
+    assert [node.id for node in graph.nodes] == ["A", "C"]
+    assert graph.edges == []
+    assert graph.index.is_valid
+    graph.apply_steps(undo)
+    assert graph.model_dump() == before
+    assert graph.index.position == {"A": 0, "B": 1, "C": 2}
+
+
+def test_cannot_remove_the_last_node():
+    graph = Graph.model_validate({"nodes": [{"id": "A", "label": "Only"}]})
+
+    with pytest.raises(GraphEditError, match="at least one node"):
+        graph.remove_node("A")
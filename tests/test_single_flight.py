@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll `condition` until it holds; fail instead of hanging if it never does."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for condition"
+        time.sleep(0.001)
+
+
+def _run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "graph"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+    leader.start()
+    wait_until(lambda: flight.stats()["in_flight"] > 0)
+    followers = _run_concurrently(4, lambda: results.append(flight.do("key", work)))
+    wait_until(lambda: flight.stats()["coalesced"] >= 4)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results, key=lambda r: r[1]) == [("graph", False)] + [("graph", True)] * 4
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_propagates_to_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = _run_concurrently(1, call)
+    wait_until(lambda: flight.stats()["in_flight"] > 0)
+    threads += _run_concurrently(2, call)
+    wait_until(lambda: flight.stats()["coalesced"] >= 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["boom"] * 3
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+    assert flight.stats()["executed"] == 2
+
+
+def test_on_wait_can_abandon_waiting():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", lambda: release.wait(5)))
+    leader.start()
+    wait_until(lambda: flight.stats()["in_flight"] > 0)
+
+    def give_up():
+        raise TimeoutError
+
+    with pytest.raises(TimeoutError):
+        flight.do("key", lambda: None, on_wait=give_up)
+    release.set()
+    leader.join(5)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from tracing import InMemoryExporter, JsonlFileExporter, current_span, set_exporter, span
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemoryExporter()
+    previous = set_exporter(exporter)
+    yield exporter
+    set_exporter(previous)
+
+
+def test_nested_spans_share_a_trace_and_link_to_parent(exporter):
+    with span("outer", size=3) as outer:
+        with span("inner") as inner:
+            assert current_span() is inner
+        assert current_span() is outer
+    assert current_span() is None
+
+    assert exporter.names() == ["inner", "outer"]  # exported as each one finishes
+    assert inner.parent_id == outer.span_id
+    assert inner.trace_id == outer.trace_id
+    assert outer.parent_id is None
+    assert outer.attributes == {"size": 3}
+    assert outer.duration_s >= inner.duration_s >= 0
+
+
+def test_span_records_errors_and_reraises(exporter):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    failed = exporter.find("failing")[0]
+    assert failed.status == "error"
+    assert failed.error == "ValueError: boom"
+
+
+def test_spans_are_dropped_without_exporter():
+    previous = set_exporter(None)
+    try:
+        with span("untraced") as untraced:
+            untraced.set_attribute("ok", True)
+    finally:
+        set_exporter(previous)
+    assert untraced.duration_s >= 0
+
+
+def test_jsonl_file_exporter_appends_one_line_per_span(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    previous = set_exporter(JsonlFileExporter(str(path)))
+    try:
+        with span("outer"):
+            with span("inner", attempt=1):
+                pass
+    finally:
+        set_exporter(previous)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["inner", "outer"]
+    assert records[0]["attributes"] == {"attempt": 1}
+    assert records[0]["parent_id"] == records[1]["span_id"]
@@ -1,22 +1,255 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
 import graphviz
 
-from graph_schema import Graph
+from graph_schema import Graph, ValidatedGraph
+from config import (
+    INCREMENTAL_LAYOUT_MIN_PINNED,
+    LAYOUT_FALLBACKS,
+    LAYOUT_TIME_BUDGET_SECONDS,
+    RENDER_CACHE_MAX_BYTES,
+)
+from graphviz_pool import GraphvizTimeout, get_graphviz_pool
+from tracing import span
+
+try:
+    from utils.export import SvgDocument
+except (ImportError, OSError):  # cairosvg raises OSError when libcairo is missing
+    SvgDocument = None
 
 EXPORT_FORMATS = {"svg", "png", "pdf"}
+DEFAULT_SPLINES = "ortho"
+
+# Rough cost models: seconds ~ coefficient * (nodes + edges) ** exponent. Only the order
+# of magnitude matters; they decide when to go straight to a cheaper layout.
+LAYOUT_COST_MODELS = {
+    "dot": (2e-4, 1.3),
+    "neato": (2e-5, 2.0),
+    "fdp": (3e-5, 2.0),
+    "sfdp": (1e-4, 1.1),
+    "twopi": (5e-5, 1.2),
+    "circo": (1e-6, 2.5),
+}
+ORTHO_SECONDS_PER_EDGE_SQUARED = 5e-6  # orthogonal routing grows with the square of the edge count
+
+# A node statement in Graphviz DOT output: an ID (quoted or bare), then its attribute list.
+_QUOTED = r'"(?:[^"\\]|\\.)*"'
+_NODE_STATEMENT = re.compile(rf'^\s*({_QUOTED}|[^\s\[\]"{{}};=-][^\s\[\];=]*)\s*\[((?:{_QUOTED}|[^\]"])*)\]', re.M)
+_POS_ATTRIBUTE = re.compile(r'\bpos="(-?[\d.e+-]+),(-?[\d.e+-]+)!?"')
+
 
+def _coerce_graph(graph_data) -> ValidatedGraph:
+    # Trusted ValidatedGraph instances pass straight through without touching pydantic.
+    return ValidatedGraph.validate(graph_data)
 
-def _coerce_graph(graph_data) -> Graph:
+
+def _content_hash(graph_data) -> str:
+    if isinstance(graph_data, ValidatedGraph):
+        return graph_data.fingerprint
     if isinstance(graph_data, Graph):
-        return graph_data
-    return Graph.model_validate(graph_data)
+        graph_data = graph_data.model_dump()
+    payload = json.dumps(graph_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def graph_fingerprint(graph_data, *style) -> str:
+    """Return a stable hash of the graph content plus any styling arguments."""
+    payload = json.dumps([_content_hash(graph_data), style], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    In-memory LRU cache for charts and rendered output, bounded by total size.
+
+    Keys are (fingerprint, kind) tuples, where kind is "chart", "positioned" or
+    an export format. Charts are accounted at the size of their DOT source.
+    """
+
+    def __init__(self, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
 
+render_cache = RenderCache()
 
-def create_graphviz_chart(graph_data, node_shape, node_color, font, layout_algorithm):
+
+def _cached_bytes(key, render) -> bytes:
+    output = render_cache.get(key)
+    if output is None:
+        output = render()
+        render_cache.put(key, output, len(output))
+    return output
+
+
+@dataclass(frozen=True)
+class LayoutPlan:
+    """The algorithm and edge routing a layout actually uses, and why it differs from the request."""
+
+    algorithm: str
+    splines: str
+    requested: str
+    estimated_seconds: float
+    reason: str = ""
+
+    @property
+    def fell_back(self) -> bool:
+        return self.algorithm != self.requested or self.splines != DEFAULT_SPLINES
+
+    def describe(self) -> str:
+        edges = "orthogonal" if self.splines == "ortho" else "polyline"
+        text = f"Layout: {self.algorithm} with {edges} edges"
+        return f"{text} ({self.reason})" if self.reason else text
+
+
+def estimate_layout_seconds(node_count, edge_count, layout_algorithm, splines=DEFAULT_SPLINES) -> float:
+    coefficient, exponent = LAYOUT_COST_MODELS.get(layout_algorithm, LAYOUT_COST_MODELS["neato"])
+    seconds = coefficient * (node_count + edge_count) ** exponent
+    if splines == "ortho":
+        seconds += ORTHO_SECONDS_PER_EDGE_SQUARED * edge_count ** 2
+    return seconds
+
+
+def layout_candidates(layout_algorithm) -> list[tuple[str, str]]:
+    """The requested layout, then the same algorithm with polyline edges, then each fallback algorithm."""
+    candidates = [(layout_algorithm, DEFAULT_SPLINES), (layout_algorithm, "polyline")]
+    seen = {layout_algorithm}
+    algorithm = LAYOUT_FALLBACKS.get(layout_algorithm)
+    while algorithm and algorithm not in seen:
+        seen.add(algorithm)
+        candidates.append((algorithm, "polyline"))
+        algorithm = LAYOUT_FALLBACKS.get(algorithm)
+    return candidates
+
+
+def plan_layout(graph_data, layout_algorithm, budget=LAYOUT_TIME_BUDGET_SECONDS) -> LayoutPlan:
+    """Pick the first candidate layout estimated to finish within `budget` seconds, or else the cheapest."""
+    graph = _coerce_graph(graph_data)
+    nodes, edges = len(graph.node_ids), len(graph.edge_sources)
+    estimates = [
+        (candidate, estimate_layout_seconds(nodes, edges, *candidate)) for candidate in layout_candidates(layout_algorithm)
+    ]
+    within_budget = [estimate for estimate in estimates if estimate[1] <= budget]
+    (algorithm, splines), seconds = within_budget[0] if within_budget else min(estimates, key=lambda e: e[1])
+    reason = ""
+    if (algorithm, splines) != estimates[0][0]:
+        reason = (f"{layout_algorithm} with orthogonal edges would take about {estimates[0][1]:.0f}s "
+                  f"for {nodes} nodes, over the {budget:g}s budget")
+    return LayoutPlan(algorithm, splines, layout_algorithm, seconds, reason)
+
+
+def extract_positions(positioned_dot: bytes) -> dict[str, list[float]]:
+    """Return each node's `pos` (in points) from Graphviz DOT output."""
+    positions = {}
+    for node_id, attributes in _NODE_STATEMENT.findall(positioned_dot.decode("utf-8")):
+        if node_id in ("graph", "node", "edge"):
+            continue
+        match = _POS_ATTRIBUTE.search(attributes)
+        if match is None:
+            continue
+        if node_id.startswith('"'):
+            node_id = re.sub(r'\\(.)', r'\1', node_id[1:-1].replace("\\\n", ""))
+        positions[node_id] = [float(match.group(1)), float(match.group(2))]
+    return positions
+
+
+def pinned_positions(graph_data, graph_layout, layout_algorithm, min_pinned=INCREMENTAL_LAYOUT_MIN_PINNED):
+    """
+    Return the stored positions of the graph's current nodes, for pinning.
+
+    `graph_layout` is the session's layout
+    (`{"algorithm": ..., "direction": ..., "positions": {id: [x, y]}}`). Returns
+    None when it was computed for another algorithm or layout direction, or too
+    few of the nodes still have a position; the graph is then laid out afresh.
+    """
+    if not isinstance(graph_layout, dict) or graph_layout.get("algorithm", layout_algorithm) != layout_algorithm:
+        return None
+    graph = _coerce_graph(graph_data)
+    if graph_layout.get("direction", graph.direction) != graph.direction:
+        return None
+    stored = graph_layout.get("positions")
+    if not isinstance(stored, dict):
+        return None
+    positions = {}
+    for node_id in graph.node_ids:
+        point = stored.get(node_id)
+        if isinstance(point, (list, tuple)) and len(point) == 2 and all(isinstance(c, (int, float)) for c in point):
+            positions[node_id] = [float(point[0]), float(point[1])]
+    if not positions or len(positions) < min_pinned * len(graph.node_ids):
+        return None
+    return positions
+
+
+def _build_chart(graph_data, node_shape, node_color, font, layout_algorithm, embed_layout=True, splines=DEFAULT_SPLINES,
+                 positions=None):
     graph = _coerce_graph(graph_data)
     dot = graphviz.Digraph()
-    rankdir = graph.layout.direction
+    rankdir = graph.direction
+    # Pinned nodes keep their coordinates (in points) and neato places only the rest.
+    engine = "neato" if positions else layout_algorithm
 
-    dot.attr('graph', layout=layout_algorithm, rankdir=rankdir, splines='ortho', nodesep='0.8', ranksep='0.8')
+    if embed_layout:
+        dot.attr('graph', layout=engine)
+    else:
+        # Leave the algorithm out of the source so positioned output can be re-rendered with neato -n2.
+        dot.engine = engine
+    if positions:
+        dot.attr('graph', inputscale='72', notranslate='true')
+    dot.attr('graph', rankdir=rankdir, splines=splines, nodesep='0.8', ranksep='0.8')
     dot.attr('node', shape=node_shape, style='rounded,filled', fillcolor=node_color, fontname=font, fontsize='12')
     dot.attr('edge', color='#808080', fontname=font, fontsize='10')
 
@@ -28,17 +261,183 @@ def create_graphviz_chart(graph_data, node_shape, node_color, font, layout_algor
         "system": "#f0f0f0",
     }
 
-    for node in graph.nodes:
-        color = node_colors.get(node.group, node_color)
-        dot.node(node.id, node.label, fillcolor=color)
+    positions = positions or {}
+    for node_id, label, group in zip(graph.node_ids, graph.node_labels, graph.node_groups):
+        pin = {"pos": "{:.10g},{:.10g}!".format(*positions[node_id])} if node_id in positions else {}
+        dot.node(node_id, label, fillcolor=node_colors.get(group, node_color), **pin)
 
-    for edge in graph.edges:
-        dot.edge(edge.source, edge.target, edge.label)
+    for source, target, label in zip(graph.edge_sources, graph.edge_targets, graph.edge_labels):
+        dot.edge(source, target, label)
     return dot
 
+
+def create_graphviz_chart(graph_data, node_shape, node_color, font, layout_algorithm, splines=DEFAULT_SPLINES,
+                          positions=None):
+    key = (graph_fingerprint(graph_data, node_shape, node_color, font, layout_algorithm, splines, positions), "chart")
+    chart = render_cache.get(key)
+    if chart is None:
+        chart = _build_chart(graph_data, node_shape, node_color, font, layout_algorithm, splines=splines,
+                             positions=positions)
+        render_cache.put(key, chart, len(chart.source))
+    return chart.copy()  # callers may add to the chart; keep the cached one pristine
+
+
+def layout_graph(graph_data, node_shape, node_color, font, layout_algorithm, splines=DEFAULT_SPLINES,
+                 timeout=None, positions=None) -> bytes:
+    """Run the Graphviz layout once and return DOT annotated with node and edge positions."""
+    chart = _build_chart(graph_data, node_shape, node_color, font, layout_algorithm, embed_layout=False, splines=splines,
+                         positions=positions)
+    with span("graphviz.layout", algorithm=chart.engine, splines=splines, pinned=len(positions or ())):
+        return get_graphviz_pool().render(chart.engine, "dot", chart.source.encode("utf-8"), timeout=timeout)
+
+
+def layout_positions(graph_data, node_shape, node_color, font, layout_algorithm, splines=DEFAULT_SPLINES,
+                     positions=None, timeout=LAYOUT_TIME_BUDGET_SECONDS) -> dict[str, list[float]]:
+    """
+    Lay the graph out server-side and return every node's position in points.
+
+    With `positions`, only the unpinned nodes are placed, which is what keeps a
+    small edit from moving the rest of the graph. Cached per graph, style and pins.
+    """
+    key = (graph_fingerprint(graph_data, node_shape, node_color, font, layout_algorithm, splines, positions), "positions")
+    computed = render_cache.get(key)
+    if computed is None:
+        positioned_dot = layout_graph(graph_data, node_shape, node_color, font, layout_algorithm, splines=splines,
+                                      timeout=timeout, positions=positions)
+        computed = extract_positions(positioned_dot)
+        render_cache.put(key, computed, len(positioned_dot))
+    return computed
+
+
+def schedule_layout(graph_data, node_shape, node_color, font, layout_algorithm,
+                    budget=LAYOUT_TIME_BUDGET_SECONDS, positions=None) -> tuple[bytes, LayoutPlan]:
+    """
+    Lay the graph out within `budget` seconds, falling back to cheaper layouts.
+
+    Starts from the `plan_layout` choice. A layout that overruns the remaining
+    budget is killed by the Graphviz pool and the next candidate is tried; the
+    last candidate gets the pool's own timeout so a layout is always produced.
+    `positions` pins nodes as in `layout_positions`. Returns the positioned DOT
+    and the plan that produced it.
+    """
+    plan = plan_layout(graph_data, layout_algorithm, budget)
+    candidates = layout_candidates(layout_algorithm)
+    candidates = candidates[candidates.index((plan.algorithm, plan.splines)):]
+    graph = _coerce_graph(graph_data)
+    deadline = time.monotonic() + budget
+    reason = plan.reason
+    for position, (algorithm, splines) in enumerate(candidates):
+        last = position == len(candidates) - 1
+        remaining = deadline - time.monotonic()
+        if not last and remaining <= 0:
+            continue
+        try:
+            positioned_dot = layout_graph(graph, node_shape, node_color, font, algorithm, splines=splines,
+                                          timeout=None if last else remaining, positions=positions)
+        except GraphvizTimeout:
+            if last:
+                raise
+            logging.warning("%s layout with %s edges exceeded the %gs budget; trying a faster layout.",
+                            algorithm, splines, budget)
+            reason = f"{algorithm} with {splines} edges did not finish within the {budget:g}s budget"
+            continue
+        estimate = estimate_layout_seconds(len(graph.node_ids), len(graph.edge_sources), algorithm, splines)
+        return positioned_dot, LayoutPlan(algorithm, splines, layout_algorithm, estimate, reason)
+
+
+def render_positioned(positioned_dot: bytes, output_format) -> bytes:
+    """Render already-positioned DOT without running a layout again."""
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {output_format}")
+    with span("graphviz.render", format=output_format):
+        return get_graphviz_pool().render("neato", output_format, positioned_dot, args=("-n2",))
+
+
 def render_graph_export(graph_data, node_shape, node_color, font, layout_algorithm, output_format):
     if output_format not in EXPORT_FORMATS:
         raise ValueError(f"Unsupported export format: {output_format}")
 
-    chart = create_graphviz_chart(graph_data, node_shape, node_color, font, layout_algorithm)
-    return chart.pipe(format=output_format)
+    fingerprint = graph_fingerprint(graph_data, node_shape, node_color, font, layout_algorithm)
+    return _cached_bytes(
+        (fingerprint, output_format),
+        lambda: _render_chart(create_graphviz_chart(graph_data, node_shape, node_color, font, layout_algorithm), output_format),
+    )
+
+
+def _render_chart(chart, output_format) -> bytes:
+    with span("graphviz.render", format=output_format):
+        return get_graphviz_pool().render(chart.engine, output_format, chart.source.encode("utf-8"))
+
+
+class ExportBundle:
+    """
+    Renders the export formats for one graph and style, each only when requested.
+
+    The layout is computed once, by `prepare()` or the first request, within the
+    layout time budget (see `schedule_layout`), and shared by every format;
+    `plan` then records the layout actually used. Each format is rendered at
+    most once. With CairoSVG available, PNG and PDF are rasterized in-process
+    from one parsed copy of the SVG export; otherwise each is a Graphviz render
+    of the shared layout. Safe to call from Streamlit's download threads.
+    """
+
+    def __init__(self, graph_data, node_shape, node_color, font, layout_algorithm, positions=None):
+        self.fingerprint = graph_fingerprint(graph_data, node_shape, node_color, font, layout_algorithm, positions)
+        self._args = (graph_data, node_shape, node_color, font, layout_algorithm)
+        self._positions = positions
+        self._positioned_dot = None
+        self.plan: LayoutPlan | None = None
+        self._document = None
+        self._outputs: dict[str, bytes] = {}
+        self.errors: dict[str, str] = {}  # failures from deferred downloads, by format
+        self._lock = threading.Lock()
+
+    def _layout(self) -> bytes:
+        with self._lock:
+            if self._positioned_dot is None:
+                key = (self.fingerprint, "positioned")
+                scheduled = render_cache.get(key)
+                if scheduled is None:
+                    scheduled = schedule_layout(*self._args, positions=self._positions)
+                    render_cache.put(key, scheduled, len(scheduled[0]))
+                self._positioned_dot, self.plan = scheduled
+            return self._positioned_dot
+
+    def _svg_document(self):
+        svg = self.get("svg")
+        with self._lock:
+            if self._document is None:
+                self._document = SvgDocument(svg.decode("utf-8"))
+            return self._document
+
+    def _render(self, output_format) -> bytes:
+        if output_format != "svg" and SvgDocument is not None:
+            return self._svg_document().render(output_format)
+        return render_positioned(self._layout(), output_format)
+
+    def get(self, output_format) -> bytes:
+        if output_format not in self._outputs:
+            self._outputs[output_format] = _cached_bytes(
+                (self.fingerprint, output_format), lambda: self._render(output_format)
+            )
+        return self._outputs[output_format]
+
+    def prepare(self) -> None:
+        """Compute the shared layout now, so a layout failure is raised in the caller instead of in a download."""
+        self._layout()
+
+    def downloader(self, output_format):
+        """
+        Return a zero-argument callable suitable for `st.download_button(data=...)`.
+
+        Streamlit calls it outside the script run, where an exception only fails
+        the download, so the failure is also recorded in `errors` for the next
+        run to show.
+        """
+        def download() -> bytes:
+            try:
+                return self.get(output_format)
+            except Exception as e:
+                self.errors[output_format] = str(e)
+                raise
+        return download
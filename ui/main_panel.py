@@ -1,9 +1,88 @@
 import streamlit as st
 import logging
-import time
-from llm_client import generate_graph_from_text, GraphGenerationError
-from .metrics import load_metrics, save_metrics
-from .graph_renderer import create_graphviz_chart
+import subprocess
+import graphviz
+from config import GENERATION_POLL_INTERVAL_SECONDS
+from graph_analysis import analyze_graph
+from graph_cache import get_default_cache
+from graph_schema import ValidatedGraph
+from jobs import submit_generation
+from llm_client import GenerationCancelled, GraphGenerationError
+from .metrics import get_metrics_store
+from graphviz_pool import GraphvizBusy, GraphvizTimeout
+from .graph_renderer import create_graphviz_chart, layout_positions, pinned_positions, plan_layout
+
+def update_graph_layout(plan, style):
+    """Lay the graph out server-side around its pinned nodes and save the positions in `graph_layout`.
+
+    Returns the positions to pin in the chart; without a server-side Graphviz the browser lays it out."""
+    graph_data = st.session_state.graph_data
+    pinned = pinned_positions(graph_data, st.session_state.graph_layout, plan.requested)
+    try:
+        positions = layout_positions(graph_data, *style, plan.algorithm, splines=plan.splines, positions=pinned)
+    except (graphviz.ExecutableNotFound, subprocess.CalledProcessError, GraphvizTimeout, GraphvizBusy) as e:
+        logging.info("Server-side layout unavailable, the browser will lay the chart out: %s", e)
+        return pinned
+    st.session_state.graph_layout = {
+        "algorithm": plan.requested,
+        "direction": graph_data.direction,
+        "positions": positions,
+    }
+    return positions
+
+def render_graph_report(graph_data):
+    """Show structural problems found in the graph next to the chart."""
+    cached = st.session_state.get("graph_report")
+    if cached is None or cached[0] != graph_data.fingerprint:
+        cached = (graph_data.fingerprint, analyze_graph(graph_data))
+        st.session_state.graph_report = cached
+    report = cached[1]
+    issues = report.issues()
+
+    with st.expander(f"🩺 Structure check ({len(issues)} issue(s))" if issues else "🩺 Structure check: no issues", expanded=bool(issues)):
+        for issue in issues:
+            st.warning(issue, icon="⚠️")
+        st.caption(f"Longest path: {len(report.longest_path)} step(s) — {' → '.join(report.longest_path)}")
+
+def apply_generation_result(job):
+    """Move a finished job's graph or error into session state."""
+    try:
+        graph = job.result()
+    except GenerationCancelled:
+        st.toast("Generation cancelled.", icon="✋")
+        return
+    except GraphGenerationError as e:
+        get_metrics_store().increment("error_count")
+        st.session_state.graph_data = None
+        st.session_state.generation_error = str(e)
+        return
+    except Exception as e:
+        st.session_state.graph_data = None
+        st.session_state.generation_error = f"An unexpected error occurred: {e}"
+        return
+
+    st.session_state.graph_data = ValidatedGraph.from_graph(graph)
+    st.session_state.last_generated_text = job.text
+    st.session_state.generation_error = None
+    st.session_state.graph_layout = {} # Reset layout on new generation
+    get_metrics_store().record_generation(job.elapsed, job.stats)
+    st.toast(f"✅ Graph generated in {job.elapsed:.2f}s!", icon="🎉")
+
+@st.fragment(run_every=GENERATION_POLL_INTERVAL_SECONDS)
+def render_generation_progress():
+    """Poll the background job; only this fragment reruns until the job finishes."""
+    job = st.session_state.get("generation_job")
+    if job is None:
+        return
+    if not job.done():
+        st.info(f"{job.progress} ({job.elapsed:.0f}s)", icon="⏳")
+        if st.button("✋ Cancel", use_container_width=True):
+            job.cancel()
+        return
+
+    st.session_state.generation_job = None
+    apply_generation_result(job)
+    st.rerun()
 
 def render_main_panel(model, temperature):
     st.title("✨ Natural Language to Flowchart")
@@ -21,75 +100,58 @@ def render_main_panel(model, temperature):
 
         status_placeholder = st.empty()
 
+        job = st.session_state.get("generation_job")
         button_col1, button_col2 = st.columns(2)
-        if button_col1.button("🚀 Generate Draft", type="primary", use_container_width=True):
+        if button_col1.button("🚀 Generate Draft", type="primary", use_container_width=True, disabled=job is not None):
             if not st.session_state.api_key:
                 st.error("Please enter your OpenAI API key in the sidebar.")
             elif not user_prompt.strip():
                 st.warning("Please enter a description.")
             else:
-                try:
-                    with st.spinner("✨ Kicking off the magic..."):
-                        status_placeholder.info("✨ Kicking off the magic...", icon="⏳")
-                        
-                        def status_callback(message):
-                            status_placeholder.info(message, icon="⏳")
-
-                        start_time = time.time()
-                        graph = generate_graph_from_text(
-                            api_key=st.session_state.api_key,
-                            text=user_prompt,
-                            model=model,
-                            temperature=temperature,
-                            status_callback=status_callback,
-                        )
-                        st.session_state.graph_data = graph.model_dump()
-                        st.session_state.last_generated_text = user_prompt
-                        st.session_state.generation_error = None
-                        st.session_state.graph_layout = {} # Reset layout on new generation
-
-                        metrics = load_metrics()
-                        metrics["run_count"] = metrics.get("run_count", 0) + 1
-                        save_metrics(metrics)
-                        
-                        end_time = time.time()
-                        status_placeholder.success(f"✅ Graph generated in {end_time - start_time:.2f}s!", icon="🎉")
-                        st.rerun()
-
-                except GraphGenerationError as e:
-                    st.session_state.graph_data = None
-                    st.session_state.generation_error = str(e)
-                    status_placeholder.empty()
-                    if "401" in str(e):
-                        st.error("Invalid OpenAI API key. Please check your key in the sidebar.", icon="🔥")
-                    else:
-                        st.error(f"Failed to generate graph: {e}", icon="🔥")
-                except Exception as e:
-                    st.session_state.graph_data = None
-                    st.session_state.generation_error = f"An unexpected error occurred: {e}"
-                    status_placeholder.empty()
-                    st.error(f"An unexpected error occurred: {e}", icon="🔥")
-        
+                st.session_state.generation_job = submit_generation(
+                    st.session_state.api_key,
+                    user_prompt,
+                    model=model,
+                    temperature=temperature,
+                    cache=get_default_cache(),
+                    stream=True,
+                )
+                st.rerun()
+
         if button_col2.button("🧹 Clear", use_container_width=True):
+            if job is not None:
+                job.cancel()
+                st.session_state.generation_job = None
             st.session_state.graph_data = None
             st.session_state.graph_layout = {}
             st.session_state.generation_error = None
             st.session_state.last_generated_text = ""
             st.rerun()
 
+        if job is not None:
+            render_generation_progress()
+
     with col2:
         if st.session_state.graph_data:
             logging.info(f"Rendering graph with data: {st.session_state.graph_data}")
             status_placeholder.info("🎨 Rendering graph...", icon="🖌️")
-            # Create a graphviz chart
+            # Large graphs get a cheaper layout up front, since the browser may have to lay them out.
+            plan = plan_layout(st.session_state.graph_data, st.session_state.layout_algorithm)
+            style = (st.session_state.node_shape, st.session_state.node_color, st.session_state.font)
+            positions = update_graph_layout(plan, style)
             dot = create_graphviz_chart(
                 st.session_state.graph_data,
-                st.session_state.node_shape,
-                st.session_state.node_color,
-                st.session_state.font,
-                st.session_state.layout_algorithm
+                *style,
+                plan.algorithm,
+                splines=plan.splines,
+                positions=positions,
             )
             st.graphviz_chart(dot)
+            if plan.fell_back:
+                st.info(plan.describe(), icon="⏱️")
+            else:
+                st.caption(plan.describe())
+            render_graph_report(st.session_state.graph_data)
             status_placeholder.empty()
 
         elif st.session_state.generation_error:
@@ -1,12 +1,176 @@
+"""
+Usage metrics shared by every Streamlit session and process.
+
+Counters live in a SQLite database in WAL mode, and every increment is a single
+upsert, so concurrent sessions never lose updates. Writes are queued and applied
+in batches by a background thread, so recording a metric never blocks a request
+on disk I/O.
+"""
+import atexit
 import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+from functools import lru_cache
+
+from config import METRICS_DB_PATH, METRICS_LATENCY_BUCKETS_SECONDS, METRICS_LEGACY_JSON_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS latency_histogram (upper_bound REAL PRIMARY KEY, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_INCREMENT = (
+    "INSERT INTO counters (name, value) VALUES (?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value"
+)
+_OBSERVE = (
+    "INSERT INTO latency_histogram (upper_bound, count) VALUES (?, 1) "
+    "ON CONFLICT(upper_bound) DO UPDATE SET count = count + 1"
+)
+_STOP = object()
+
+
+class MetricsStore:
+    """
+    Counters and a latency histogram backed by SQLite.
+
+    `increment` and `observe_latency` only enqueue; call `flush` to wait until
+    everything queued so far is committed.
+    """
+
+    def __init__(
+        self,
+        path: str = METRICS_DB_PATH,
+        legacy_json_path: str | None = METRICS_LEGACY_JSON_PATH,
+        latency_buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS_SECONDS,
+    ):
+        self.path = path
+        self.latency_buckets = tuple(sorted(latency_buckets)) + (float("inf"),)
+        self._queue: queue.Queue = queue.Queue()
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+            self._import_legacy_json(connection, legacy_json_path)
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @staticmethod
+    def _import_legacy_json(connection: sqlite3.Connection, legacy_json_path: str | None) -> None:
+        """Carry the run count over from metrics.json exactly once."""
+        if not legacy_json_path or not os.path.exists(legacy_json_path):
+            return
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_imported'").fetchone() is None:
+                try:
+                    with open(legacy_json_path, "r") as f:
+                        run_count = int(json.load(f).get("run_count", 0))
+                except (OSError, ValueError, AttributeError) as e:
+                    logging.warning("Could not import legacy metrics from %s: %s", legacy_json_path, e)
+                    run_count = 0
+                if run_count:
+                    connection.execute(_INCREMENT, ("run_count", run_count))
+                connection.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_imported', ?)", (legacy_json_path,))
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+    # --- Recording ---
+    def increment(self, name: str, amount: float = 1) -> None:
+        self._queue.put((_INCREMENT, (name, amount)))
+
+    def observe_latency(self, seconds: float) -> None:
+        bucket = next(bound for bound in self.latency_buckets if seconds <= bound)
+        self._queue.put((_OBSERVE, (bucket,)))
+        self._queue.put((_INCREMENT, ("latency_seconds_total", seconds)))
+
+    def record_generation(self, latency_seconds: float, stats=None) -> None:
+        """Record one successful generation and, if given, its GenerationStats."""
+        self.increment("run_count")
+        self.observe_latency(latency_seconds)
+        if stats is not None:
+            self.increment("total_tokens", stats.total_tokens)
+            self.increment("retries", stats.retries)
+            self.increment("retries_avoided", stats.retries_avoided)
+            if stats.cache_hit:
+                self.increment("cache_hits")
+            if stats.coalesced:
+                self.increment("coalesced")
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every queued write is committed; return False on timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _write_loop(self) -> None:
+        connection = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                writes = [item for item in batch if isinstance(item, tuple)]
+                if writes:
+                    try:
+                        connection.execute("BEGIN IMMEDIATE")
+                        for statement, params in writes:
+                            connection.execute(statement, params)
+                        connection.execute("COMMIT")
+                    except sqlite3.Error as e:
+                        logging.error("Dropping %d metric update(s): %s", len(writes), e)
+                        if connection.in_transaction:
+                            connection.execute("ROLLBACK")
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if any(item is _STOP for item in batch):
+                    return
+        finally:
+            connection.close()
+
+    # --- Reading ---
+    def counters(self) -> dict[str, float]:
+        with closing(self._connect()) as connection:
+            return dict(connection.execute("SELECT name, value FROM counters").fetchall())
+
+    def latency_histogram(self) -> list[tuple[float, int]]:
+        """Return (upper_bound_seconds, count) for every bucket, including empty ones."""
+        with closing(self._connect()) as connection:
+            counts = dict(connection.execute("SELECT upper_bound, count FROM latency_histogram").fetchall())
+        return [(bound, int(counts.get(bound, 0))) for bound in self.latency_buckets]
+
+
+@lru_cache(maxsize=1)
+def get_metrics_store() -> MetricsStore:
+    """Return the process-wide store configured from `config`."""
+    store = MetricsStore()
+    atexit.register(store.close)
+    return store
 
-def load_metrics():
-    try:
-        with open("metrics.json", "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {"run_count": 0}
 
-def save_metrics(metrics):
-    with open("metrics.json", "w") as f:
-        json.dump(metrics, f)
+def load_metrics() -> dict:
+    """Return the counters, with `run_count` as an int, in the shape metrics.json used to have."""
+    store = get_metrics_store()
+    store.flush(timeout=1.0)  # include this process's own recent updates
+    metrics = store.counters()
+    metrics["run_count"] = int(metrics.get("run_count", 0))
+    return metrics
@@ -2,7 +2,8 @@ import streamlit as st
 import json
 from pydantic import ValidationError
 
-from graph_schema import Graph
+from graph_editor import GraphEditor
+from graph_schema import LARGE_GRAPH_MAX_NODES, ValidatedGraph
 from config import (
     DEFAULT_MODEL,
     DEFAULT_TEMPERATURE,
@@ -15,7 +16,7 @@ from config import (
     LAYOUT_ALGORITHM_OPTIONS,
     DEFAULT_LAYOUT_ALGORITHM,
 )
-from .graph_renderer import render_graph_export
+from .graph_renderer import ExportBundle, graph_fingerprint, pinned_positions
 from .metrics import load_metrics
 
 EXPORT_MIME_TYPES = {
@@ -40,7 +41,7 @@ def display_metrics():
     """, unsafe_allow_html=True)
 
     metrics = load_metrics()
-    run_count = metrics.get("run_count", 0)
+    run_count = metrics["run_count"]
     time_saved = run_count * 30
     money_saved = run_count * 25
 
@@ -48,6 +49,11 @@ def display_metrics():
     st.metric(label="Usage", value=f"{run_count} times")
     st.metric(label="Time Saved", value=f"{time_saved} mins")
     st.metric(label="Money Saved", value=f"${money_saved}")
+    if run_count:
+        average_latency = metrics.get("latency_seconds_total", 0) / run_count
+        st.caption(f"Avg. generation time {average_latency:.1f}s · {int(metrics.get('total_tokens', 0))} tokens · "
+                   f"{int(metrics.get('retries', 0))} retries · "
+                   f"{int(metrics.get('retries_avoided', 0))} avoided by local repair")
 
 
 def render_config_controls():
@@ -81,10 +87,13 @@ def render_style_controls():
 def render_import_controls():
     st.header("📥 Import")
     uploaded_graph = st.file_uploader("Load GRAPH JSON", type=["json"])
-    if uploaded_graph:
+    # The uploader keeps its file across reruns; load it once so later edits are not overwritten.
+    if uploaded_graph and uploaded_graph.file_id != st.session_state.get("imported_graph_file_id"):
+        st.session_state.imported_graph_file_id = uploaded_graph.file_id
         try:
             graph_json = json.load(uploaded_graph)
-            st.session_state.graph_data = Graph.model_validate(graph_json).model_dump()
+            st.session_state.graph_data = ValidatedGraph.validate(graph_json, max_nodes=LARGE_GRAPH_MAX_NODES)
+            st.session_state.graph_layout = {}  # positions of the previous graph must not pin this one
             st.toast("✅ Graph JSON loaded successfully!", icon="🎉")
         except json.JSONDecodeError as e:
             st.error(f"Invalid JSON file: {e}")
@@ -92,7 +101,8 @@ def render_import_controls():
             st.error(f"Invalid graph file: {e}")
 
     uploaded_layout = st.file_uploader("Load Layout JSON", type=["json"])
-    if uploaded_layout:
+    if uploaded_layout and uploaded_layout.file_id != st.session_state.get("imported_layout_file_id"):
+        st.session_state.imported_layout_file_id = uploaded_layout.file_id
         try:
             st.session_state.graph_layout = json.load(uploaded_layout)
             st.toast("✅ Layout loaded successfully!", icon="🗺️")
@@ -100,10 +110,87 @@ def render_import_controls():
             st.error("Invalid layout JSON file.")
 
 
+def _graph_editor():
+    """Return the editor for the current graph; a graph replaced by generation or import starts a new history."""
+    editor = st.session_state.get("graph_editor")
+    if editor is None or editor.current is not st.session_state.graph_data:
+        editor = GraphEditor(st.session_state.graph_data)
+        st.session_state.graph_editor = editor
+    return editor
+
+
+def _apply_edit(edit, *args, **kwargs):
+    # Only the touched elements are validated; the stored layout is kept so the chart re-lays out incrementally.
+    try:
+        st.session_state.graph_data = edit(*args, **kwargs)
+    except ValueError as e:
+        st.error(f"Could not apply edit: {e}")
+        return
+    st.rerun()
+
+
+def render_node_edit_controls(editor):
+    with st.form("add_node_form", clear_on_submit=True):
+        node_id = st.text_input("New node ID")
+        label = st.text_input("New node label")
+        shape = st.selectbox("New node shape", NODE_SHAPE_OPTIONS)
+        if st.form_submit_button("Add node"):
+            _apply_edit(editor.add_node, node_id.strip(), label.strip(), shape=shape)
+
+    node_id = st.selectbox("Node", editor.current.node_ids, key="edit_node_id")
+    label = st.text_input("Label", key="edit_node_label")
+    relabel_col, remove_col = st.columns(2)
+    if relabel_col.button("Relabel node", use_container_width=True):
+        _apply_edit(editor.relabel_node, node_id, label.strip())
+    if remove_col.button("Remove node", use_container_width=True):
+        _apply_edit(editor.remove_node, node_id)
+
+
+def render_edge_edit_controls(editor):
+    graph = editor.current
+    with st.form("add_edge_form", clear_on_submit=True):
+        source = st.selectbox("From", graph.node_ids)
+        target = st.selectbox("To", graph.node_ids)
+        label = st.text_input("New edge label (optional)")
+        if st.form_submit_button("Add edge"):
+            _apply_edit(editor.add_edge, source, target, label.strip() or None)
+
+    edge_names = [
+        f"{source} → {target}" + (f" ({label})" if label else "")
+        for source, target, label in zip(graph.edge_sources, graph.edge_targets, graph.edge_labels)
+    ]
+    edge_index = st.selectbox("Edge", range(len(edge_names)), format_func=edge_names.__getitem__, key="edit_edge_index")
+    label = st.text_input("Edge label", key="edit_edge_label")
+    relabel_col, remove_col = st.columns(2)
+    if relabel_col.button("Relabel edge", disabled=edge_index is None, use_container_width=True):
+        _apply_edit(editor.relabel_edge, edge_index, label.strip() or None)
+    if remove_col.button("Remove edge", disabled=edge_index is None, use_container_width=True):
+        _apply_edit(editor.remove_edge, edge_index)
+
+
+def render_edit_controls():
+    st.header("✏️ Edit")
+
+    if not st.session_state.graph_data:
+        return
+
+    editor = _graph_editor()
+    undo_col, redo_col = st.columns(2)
+    if undo_col.button("↩️ Undo", disabled=not editor.can_undo, help=editor.undo_description, use_container_width=True):
+        _apply_edit(editor.undo)
+    if redo_col.button("↪️ Redo", disabled=not editor.can_redo, help=editor.redo_description, use_container_width=True):
+        _apply_edit(editor.redo)
+
+    with st.expander("Nodes"):
+        render_node_edit_controls(editor)
+    with st.expander("Edges"):
+        render_edge_edit_controls(editor)
+
+
 def render_graph_json_downloads():
     st.download_button(
         label="Save GRAPH JSON",
-        data=json.dumps(st.session_state.graph_data, indent=2),
+        data=json.dumps(st.session_state.graph_data.to_dict(), indent=2),
         file_name="graph.json",
         mime="application/json",
     )
@@ -116,7 +203,30 @@ def render_graph_json_downloads():
         )
 
 
+def _export_bundle():
+    """Return the export bundle for the current graph and style, reusing it across reruns."""
+    style = (
+        st.session_state.node_shape,
+        st.session_state.node_color,
+        st.session_state.font,
+        st.session_state.layout_algorithm,
+    )
+    # Exports use the same pinned positions as the chart, so they match what is on screen.
+    positions = pinned_positions(st.session_state.graph_data, st.session_state.graph_layout, style[-1])
+    bundle = st.session_state.get("export_bundle")
+    if bundle is None or bundle.fingerprint != graph_fingerprint(st.session_state.graph_data, *style, positions):
+        bundle = ExportBundle(st.session_state.graph_data, *style, positions=positions)
+        st.session_state.export_bundle = bundle
+    return bundle
+
+
 def render_image_export_downloads():
+    # Files are rendered only when a button is clicked, from one shared layout computed here.
+    bundle = _export_bundle()
+    bundle.prepare()
+    for export_format, error in list(bundle.errors.items()):
+        st.error(f"Could not render the {export_format.upper()} export: {error}")
+        del bundle.errors[export_format]
     for export_format, label in [
         ("svg", "Save SVG"),
         ("png", "Save PNG"),
@@ -124,17 +234,12 @@ def render_image_export_downloads():
     ]:
         st.download_button(
             label=label,
-            data=render_graph_export(
-                st.session_state.graph_data,
-                st.session_state.node_shape,
-                st.session_state.node_color,
-                st.session_state.font,
-                st.session_state.layout_algorithm,
-                export_format,
-            ),
+            data=bundle.downloader(export_format),
             file_name=f"flowchart.{export_format}",
             mime=EXPORT_MIME_TYPES[export_format],
         )
+    if bundle.plan is not None and bundle.plan.fell_back:
+        st.caption(f"Exports use a faster layout. {bundle.plan.describe()}")
 
 
 def render_export_controls():
@@ -162,6 +267,9 @@ def render_sidebar():
         st.markdown("---")
         render_import_controls()
 
+        st.markdown("---")
+        render_edit_controls()
+
         st.markdown("---")
         render_export_controls()
 
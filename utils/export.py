@@ -1,10 +1,70 @@
-import cairosvg
+"""
+SVG to PNG/PDF export with CairoSVG.
+
+`SvgDocument` parses an SVG once and renders any number of formats from the
+parsed tree, so exporting one graph as PNG and PDF costs one parse instead of
+one per format. Rendered bytes go through a per-thread buffer that is reused
+from one render to the next.
+"""
+import threading
 from io import BytesIO
 
-def svg_to_pdf(svg_string: str) -> bytes:
+from cairosvg.parser import Tree
+from cairosvg.surface import PDFSurface, PNGSurface
+
+from config import EXPORT_DPI, EXPORT_SCALE
+from tracing import span
+
+SURFACES = {"png": PNGSurface, "pdf": PDFSurface}
+# CairoSVG rewrites mask and pattern nodes while drawing them, so a tree that has any is parsed per render.
+_MUTATED_TAGS = ("<mask", "<pattern")
+
+_buffers = threading.local()
+
+
+def _reusable_buffer() -> BytesIO:
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _buffers.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate()
+    return buffer
+
+
+class SvgDocument:
+    """An SVG parsed once and rendered to PNG or PDF from memory. Safe to share between threads."""
+
+    def __init__(self, svg_string: str, dpi: float = EXPORT_DPI, scale: float = EXPORT_SCALE):
+        self.dpi = dpi
+        self.scale = scale
+        self._bytestring = svg_string.encode("utf-8")
+        self._reuse_tree = not any(tag in svg_string for tag in _MUTATED_TAGS)
+        with span("export.parse", svg_chars=len(svg_string)):
+            self._tree = Tree(bytestring=self._bytestring)
+        self._lock = threading.Lock()
+
+    def write(self, output_format: str, destination, dpi: float | None = None, scale: float | None = None) -> None:
+        """Render `output_format` ("png" or "pdf") into a writable binary file object."""
+        surface_class = SURFACES.get(output_format)
+        if surface_class is None:
+            raise ValueError(f"Unsupported export format: {output_format}")
+        with self._lock, span("export.rasterize", format=output_format, reparsed=not self._reuse_tree):
+            tree = self._tree if self._reuse_tree else Tree(bytestring=self._bytestring)
+            surface = surface_class(tree, destination, dpi or self.dpi, scale=scale or self.scale)
+            surface.finish()
+
+    def render(self, output_format: str, dpi: float | None = None, scale: float | None = None) -> bytes:
+        """Render `output_format` and return the bytes."""
+        buffer = _reusable_buffer()
+        self.write(output_format, buffer, dpi, scale)
+        return buffer.getvalue()
+
+
+def svg_to_pdf(svg_string: str, dpi: float = EXPORT_DPI, scale: float = EXPORT_SCALE) -> bytes:
     """Converts an SVG string to PDF bytes using CairoSVG."""
-    return cairosvg.svg2pdf(bytestring=svg_string.encode('utf-8'))
+    return SvgDocument(svg_string, dpi, scale).render("pdf")
+
 
-def svg_to_png(svg_string: str) -> bytes:
+def svg_to_png(svg_string: str, dpi: float = EXPORT_DPI, scale: float = EXPORT_SCALE) -> bytes:
     """Converts an SVG string to PNG bytes using CairoSVG."""
-    return cairosvg.svg2png(bytestring=svg_string.encode('utf-8'))
+    return SvgDocument(svg_string, dpi, scale).render("png")
@@ -0,0 +1,364 @@
+"""
+Sugiyama-style layered layout in pure Python, for exports without Graphviz.
+
+The classic four phases, each linear or near-linear in nodes plus edges:
+  1. cycle breaking   - edges that close a cycle in a DFS are reversed;
+  2. layering         - longest path from the sources, with sources pulled down
+                        next to their first successor; edges spanning up to
+                        LONG_EDGE_SPAN layers are split by dummy nodes so every
+                        edge spans one layer, and longer ones are routed along
+                        lanes beside the drawing, which keeps a long back edge
+                        from adding one dummy node per layer it crosses;
+  3. crossing minimization - barycenter sweeps down and up, keeping the
+                        ordering with the fewest crossings (counted with a
+                        Fenwick tree, O(E log V) per sweep);
+  4. coordinates      - each node moves toward the mean of its neighbours in the
+                        adjacent layer, then overlaps are resolved in one
+                        left-to-right and one right-to-left pass.
+
+`direction` "TB" stacks layers top to bottom; "LR" stacks them left to right.
+"""
+import heapq
+from dataclasses import dataclass
+from math import sqrt
+
+from graph_schema import Graph
+
+NODE_HEIGHT = 40
+MIN_NODE_WIDTH = 80
+CHAR_WIDTH = 8  # approximate advance of one 14px sans-serif character
+NODE_SEPARATION = 30
+LAYER_SEPARATION = 60
+MARGIN = 20
+CROSSING_SWEEPS = 4
+COORDINATE_PASSES = 4
+SELF_LOOP_SIZE = 20
+LONG_EDGE_SPAN = 8  # edges spanning more layers than this are routed in a lane instead of through dummy nodes
+LANE_SEPARATION = 10
+
+
+@dataclass
+class NodeBox:
+    """A laid-out node: center point and size."""
+    x: float
+    y: float
+    width: float
+    height: float
+    shape: str = "box"
+
+
+@dataclass
+class LayeredLayout:
+    nodes: dict[str, NodeBox]  # by node ID
+    edges: list[list[tuple[float, float]]]  # polyline per graph edge, in graph.edges order, clipped to the node outlines
+    width: float
+    height: float
+
+
+def node_size(label: str, shape: str) -> tuple[float, float]:
+    """Width and height that fit `label` inside a node of `shape`."""
+    width = max(MIN_NODE_WIDTH, len(label) * CHAR_WIDTH + 24)
+    if shape == "ellipse":
+        return width * 1.2, NODE_HEIGHT + 4
+    if shape == "diamond":
+        return width * 1.5, NODE_HEIGHT * 1.5
+    if shape == "circle":
+        return width, width
+    return width, NODE_HEIGHT
+
+
+def _break_cycles(node_count: int, out_edges: list[list[tuple[int, int]]], sources: list[int]) -> set[int]:
+    """Return the indexes of edges to reverse so the graph becomes acyclic (iterative DFS)."""
+    state = bytearray(node_count)  # 0 unvisited, 1 on the DFS stack, 2 finished
+    reversed_edges = set()
+    for root in sources + list(range(node_count)):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(out_edges[root]))]
+        while stack:
+            node, successors = stack[-1]
+            for edge_index, successor in successors:
+                if state[successor] == 1:
+                    reversed_edges.add(edge_index)
+                elif state[successor] == 0:
+                    state[successor] = 1
+                    stack.append((successor, iter(out_edges[successor])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return reversed_edges
+
+
+def _assign_layers(node_count: int, dag_edges: list[tuple[int, int]]) -> list[int]:
+    """Longest-path layering, then each source moved down to just above its nearest successor."""
+    successors = [[] for _ in range(node_count)]
+    in_degree = [0] * node_count
+    for source, target in dag_edges:
+        successors[source].append(target)
+        in_degree[target] += 1
+
+    layer = [0] * node_count
+    remaining = in_degree[:]
+    order = [node for node in range(node_count) if not remaining[node]]
+    for node in order:  # grows while iterating: Kahn's algorithm
+        for successor in successors[node]:
+            layer[successor] = max(layer[successor], layer[node] + 1)
+            remaining[successor] -= 1
+            if not remaining[successor]:
+                order.append(successor)
+
+    for node in reversed(order):
+        if not in_degree[node] and successors[node]:
+            layer[node] = min(layer[successor] for successor in successors[node]) - 1
+    return layer
+
+
+def _count_crossings(upper_position: list[int], lower_position: list[int], segments: list[tuple[int, int]],
+                     lower_size: int) -> int:
+    """Crossings between two adjacent layers, by counting inversions with a Fenwick tree."""
+    tree = [0] * (lower_size + 1)
+    crossings = 0
+    placed = 0
+    for _, lower in sorted((upper_position[u], lower_position[v]) for u, v in segments):
+        # Segments already placed that end to the right of this one cross it.
+        position = lower + 1
+        not_greater = 0
+        while position > 0:
+            not_greater += tree[position]
+            position -= position & -position
+        crossings += placed - not_greater
+        position = lower + 1
+        while position <= lower_size:
+            tree[position] += 1
+            position += position & -position
+        placed += 1
+    return crossings
+
+
+def _total_crossings(layers: list[list[int]], position: list[int], down: list[list[int]]) -> int:
+    total = 0
+    for upper, lower in zip(layers, layers[1:]):
+        segments = [(u, v) for u in upper for v in down[u]]
+        total += _count_crossings(position, position, segments, len(lower))
+    return total
+
+
+def _order_layers(layers: list[list[int]], up: list[list[int]], down: list[list[int]], vertex_count: int,
+                  sweeps: int) -> list[list[int]]:
+    """Barycenter heuristic, alternating down and up sweeps; returns the best ordering seen."""
+    position = [0] * vertex_count
+
+    def renumber(layer):
+        for index, vertex in enumerate(layer):
+            position[vertex] = index
+
+    def reorder(layer, neighbours):
+        def key(vertex):
+            adjacent = neighbours[vertex]
+            return sum(position[other] for other in adjacent) / len(adjacent) if adjacent else position[vertex]
+        layer.sort(key=key)
+        renumber(layer)
+
+    for layer in layers:
+        renumber(layer)
+    best = [layer[:] for layer in layers]
+    best_crossings = _total_crossings(layers, position, down)
+
+    for _ in range(sweeps):
+        if not best_crossings:
+            break
+        for layer in layers[1:]:
+            reorder(layer, up)
+        for layer in reversed(layers[:-1]):
+            reorder(layer, down)
+        crossings = _total_crossings(layers, position, down)
+        if crossings < best_crossings:
+            best, best_crossings = [layer[:] for layer in layers], crossings
+    return best
+
+
+def _place_layer(layer: list[int], desired: list[float], extent: list[float], separation: float) -> list[float]:
+    """
+    Positions close to `desired` (one per vertex of `layer`) that keep the
+    layer's order and spacing: the mean of a push-right and a push-left pass,
+    which both satisfy the spacing constraints, so their mean does too.
+    """
+    gaps = [(extent[left] + extent[right]) / 2 + separation for left, right in zip(layer, layer[1:])]
+    pushed_right = desired[:]
+    for index, gap in enumerate(gaps):
+        pushed_right[index + 1] = max(pushed_right[index + 1], pushed_right[index] + gap)
+    pushed_left = desired[:]
+    for index in range(len(gaps) - 1, -1, -1):
+        pushed_left[index] = min(pushed_left[index], pushed_left[index + 1] - gaps[index])
+    return [(right + left) / 2 for right, left in zip(pushed_right, pushed_left)]
+
+
+def _assign_coordinates(layers: list[list[int]], up: list[list[int]], down: list[list[int]],
+                        extent: list[float], separation: float, passes: int) -> list[float]:
+    coordinate = [0.0] * len(extent)
+    for layer in layers:
+        x = 0.0
+        for vertex in layer:
+            coordinate[vertex] = x + extent[vertex] / 2
+            x += extent[vertex] + separation
+
+    for sweep in range(passes):
+        downward = sweep % 2 == 0
+        neighbours = up if downward else down
+        for layer in (layers[1:] if downward else reversed(layers[:-1])):
+            desired = [
+                sum(coordinate[other] for other in neighbours[vertex]) / len(neighbours[vertex])
+                if neighbours[vertex] else coordinate[vertex]
+                for vertex in layer
+            ]
+            for vertex, x in zip(layer, _place_layer(layer, desired, extent, separation)):
+                coordinate[vertex] = x
+    return coordinate
+
+
+def _assign_lanes(spans: dict[int, tuple[int, int]]) -> dict[int, int]:
+    """Lane per edge, given its (first, last) layer; edges whose spans do not overlap share a lane."""
+    lanes = {}
+    free_from = []  # heap of (last layer, lane) for lanes in use
+    for edge_index, (first, last) in sorted(spans.items(), key=lambda item: item[1]):
+        if free_from and free_from[0][0] <= first:
+            _, lane = heapq.heappop(free_from)
+        else:
+            lane = len(free_from)
+        lanes[edge_index] = lane
+        heapq.heappush(free_from, (last, lane))
+    return lanes
+
+
+def _clip(box: NodeBox, toward: tuple[float, float]) -> tuple[float, float]:
+    """Point where the segment from the center of `box` to `toward` leaves the node outline."""
+    dx, dy = toward[0] - box.x, toward[1] - box.y
+    if not dx and not dy:
+        return box.x, box.y
+    half_width, half_height = box.width / 2, box.height / 2
+    if box.shape in ("ellipse", "circle"):
+        scale = 1 / sqrt((dx / half_width) ** 2 + (dy / half_height) ** 2)
+    elif box.shape == "diamond":
+        scale = 1 / (abs(dx) / half_width + abs(dy) / half_height)
+    else:
+        scale = 1 / max(abs(dx) / half_width, abs(dy) / half_height)
+    scale = min(scale, 1.0)
+    return box.x + dx * scale, box.y + dy * scale
+
+
+def layered_layout(graph: Graph, direction: str | None = None, node_separation: float = NODE_SEPARATION,
+                   layer_separation: float = LAYER_SEPARATION, sweeps: int = CROSSING_SWEEPS) -> LayeredLayout:
+    """Lay out `graph` in layers along `direction` (default: the graph's own layout direction)."""
+    horizontal = (direction or graph.layout.direction) == "LR"
+    index = graph.index
+    node_count = len(graph.nodes)
+    sizes = [node_size(node.label, node.shape) for node in graph.nodes]
+    edge_pairs = [(index.position[edge.source], index.position[edge.target]) for edge in graph.edges]
+
+    # 1. Cycle breaking
+    out_edges = [[] for _ in range(node_count)]
+    for edge_index, (source, target) in enumerate(edge_pairs):
+        if source != target:
+            out_edges[source].append((edge_index, target))
+    sources = [node for node in range(node_count) if not index.in_degree[node]]
+    reversed_edges = _break_cycles(node_count, out_edges, sources)
+    dag_edges = {
+        edge_index: (target, source) if edge_index in reversed_edges else (source, target)
+        for edge_index, (source, target) in enumerate(edge_pairs) if source != target
+    }
+
+    # 2. Layering, with dummy vertices (numbered from node_count) on long edges and lanes for the longest
+    layer_of = _assign_layers(node_count, list(dag_edges.values()))
+    up = [[] for _ in range(node_count)]
+    down = [[] for _ in range(node_count)]
+    chains = {}
+    lane_spans = {}
+    for edge_index, (source, target) in dag_edges.items():
+        if layer_of[target] - layer_of[source] > LONG_EDGE_SPAN:
+            lane_spans[edge_index] = (layer_of[source], layer_of[target])
+            continue
+        chain = [source]
+        for layer in range(layer_of[source] + 1, layer_of[target]):
+            dummy = len(layer_of)
+            layer_of.append(layer)
+            up.append([])
+            down.append([])
+            chain.append(dummy)
+        chain.append(target)
+        for upper, lower in zip(chain, chain[1:]):
+            down[upper].append(lower)
+            up[lower].append(upper)
+        chains[edge_index] = chain
+
+    vertex_count = len(layer_of)
+    layers = [[] for _ in range(max(layer_of, default=0) + 1)]
+    for vertex in range(vertex_count):
+        layers[layer_of[vertex]].append(vertex)
+
+    # 3. Crossing minimization
+    layers = _order_layers(layers, up, down, vertex_count, sweeps)
+
+    # 4. Coordinates: `extent` is a vertex's size along its layer, `thickness` the layer's depth.
+    along, across = (1, 0) if horizontal else (0, 1)
+    extent = [sizes[vertex][along] if vertex < node_count else 0.0 for vertex in range(vertex_count)]
+    coordinate = _assign_coordinates(layers, up, down, extent, node_separation, COORDINATE_PASSES)
+    offset = MARGIN - min((coordinate[v] - extent[v] / 2 for v in range(vertex_count)), default=0.0)
+
+    layer_depth, layer_thickness, depth = [], [], MARGIN
+    for layer in layers:
+        thickness = max((sizes[v][across] for v in layer if v < node_count), default=0.0)
+        layer_depth.append(depth + thickness / 2)
+        layer_thickness.append(thickness)
+        depth += thickness + layer_separation
+
+    def point(vertex):
+        along_axis, across_axis = coordinate[vertex] + offset, layer_depth[layer_of[vertex]]
+        return (across_axis, along_axis) if horizontal else (along_axis, across_axis)
+
+    # Lanes run beside the drawing, past any self-loops; an edge enters and leaves its lane in the gaps between layers.
+    extent_along = max((coordinate[v] + offset + extent[v] / 2 for v in range(vertex_count)), default=0.0)
+    lanes = _assign_lanes(lane_spans)
+    lane_count = max(lanes.values(), default=-1) + 1
+
+    def lane_point(edge_index, layer, below):
+        along_axis = extent_along + SELF_LOOP_SIZE + (lanes[edge_index] + 1) * LANE_SEPARATION
+        gap = (layer_thickness[layer] + layer_separation) / 2
+        across_axis = layer_depth[layer] + (gap if below else -gap)
+        return (across_axis, along_axis) if horizontal else (along_axis, across_axis)
+
+    boxes = {}
+    for position, node in enumerate(graph.nodes):
+        x, y = point(position)
+        boxes[node.id] = NodeBox(x, y, sizes[position][0], sizes[position][1], node.shape)
+
+    routes = []
+    for edge_index, (source, target) in enumerate(edge_pairs):
+        box = boxes[graph.nodes[source].id]
+        if source == target:
+            right, top, bottom = box.x + box.width / 2, box.y - SELF_LOOP_SIZE / 2, box.y + SELF_LOOP_SIZE / 2
+            routes.append([(right, top), (right + SELF_LOOP_SIZE, top), (right + SELF_LOOP_SIZE, bottom), (right, bottom)])
+            continue
+        if edge_index in lanes:
+            first, last = lane_spans[edge_index]
+            upper, lower = dag_edges[edge_index]
+            points = [point(upper), lane_point(edge_index, first, True), lane_point(edge_index, last, False),
+                      point(lower)]
+        else:
+            points = [point(vertex) for vertex in chains[edge_index]]
+        if edge_index in reversed_edges:
+            points.reverse()
+        points[0] = _clip(box, points[1])
+        points[-1] = _clip(boxes[graph.nodes[target].id], points[-2])
+        routes.append(points)
+
+    extent_across = depth - layer_separation + MARGIN
+    if lane_count:
+        extent_along += SELF_LOOP_SIZE + lane_count * LANE_SEPARATION
+    elif any(source == target for source, target in edge_pairs):
+        extent_across += SELF_LOOP_SIZE if horizontal else 0
+        extent_along += 0 if horizontal else SELF_LOOP_SIZE
+    extent_along += MARGIN
+    width, height = (extent_across, extent_along) if horizontal else (extent_along, extent_across)
+    return LayeredLayout(boxes, routes, width, height)